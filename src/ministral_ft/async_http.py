@@ -0,0 +1,198 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from typing import Any, Callable
+
+DEFAULT_MAX_BODY_BYTES = 1_048_576
+DEFAULT_MAX_HEADER_BYTES = 16_384
+DEFAULT_KEEP_ALIVE_TIMEOUT_S = 75.0
+# Time allowed to receive a declared body once the headers are in.
+DEFAULT_BODY_TIMEOUT_S = 30.0
+JSON_CONTENT_TYPE = "application/json; charset=utf-8"
+
+# (method, raw path with query, body, request headers with lower-cased names)
+# -> (status, body bytes, response headers)
+RequestHandler = Callable[[str, str, bytes, dict[str, str]], tuple[HTTPStatus, bytes, dict[str, str]]]
+
+
+class _BadRequest(Exception):
+    def __init__(self, status: HTTPStatus, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+class AsyncHTTPServer:
+    # Minimal HTTP/1.1 front-end: one coroutine per connection, keep-alive by default,
+    # bounded headers and bodies, each read under a timeout. The handler runs on a
+    # bounded thread pool, so idle connections cost a coroutine rather than a thread.
+
+    def __init__(
+        self,
+        handle: RequestHandler,
+        *,
+        workers: int,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        max_header_bytes: int = DEFAULT_MAX_HEADER_BYTES,
+        keep_alive_timeout_s: float = DEFAULT_KEEP_ALIVE_TIMEOUT_S,
+        body_timeout_s: float = DEFAULT_BODY_TIMEOUT_S,
+    ) -> None:
+        self.handle = handle
+        self.max_body_bytes = max_body_bytes
+        self.max_header_bytes = max_header_bytes
+        self.keep_alive_timeout_s = keep_alive_timeout_s
+        self.body_timeout_s = body_timeout_s
+        self.executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="http-worker")
+        self.open_connections = 0
+        self.requests = 0
+
+    def stats(self) -> dict[str, Any]:
+        return {"open_connections": self.open_connections, "requests": self.requests}
+
+    async def serve(self, host: str, port: int) -> None:
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(signum, stop.set)
+            except (NotImplementedError, RuntimeError):  # pragma: no cover - non-Unix loops
+                pass
+        server = await asyncio.start_server(
+            self._serve_connection,
+            host,
+            port,
+            limit=self.max_header_bytes,
+            reuse_address=True,
+        )
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            self.executor.shutdown(wait=True)
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.open_connections += 1
+        try:
+            keep_alive = True
+            while keep_alive:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"),
+                        timeout=self.keep_alive_timeout_s,
+                    )
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+                    return
+                except asyncio.LimitOverrunError:
+                    await self._write_response(
+                        writer,
+                        HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                        json.dumps({"error": "headers_too_large"}).encode("utf-8"),
+                        keep_alive=False,
+                    )
+                    return
+                try:
+                    method, target, headers, keep_alive, content_length = self._parse_head(head)
+                    if content_length > self.max_body_bytes:
+                        raise _BadRequest(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "body_too_large")
+                except _BadRequest as exc:
+                    error_body = json.dumps({"error": str(exc)}).encode("utf-8")
+                    await self._write_response(writer, exc.status, error_body, keep_alive=False)
+                    return
+                try:
+                    body = (
+                        await asyncio.wait_for(reader.readexactly(content_length), timeout=self.body_timeout_s)
+                        if content_length
+                        else b""
+                    )
+                except asyncio.TimeoutError:
+                    await self._write_response(
+                        writer,
+                        HTTPStatus.REQUEST_TIMEOUT,
+                        json.dumps({"error": "body_timeout"}).encode("utf-8"),
+                        keep_alive=False,
+                    )
+                    return
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                loop = asyncio.get_running_loop()
+                try:
+                    status, payload, response_headers = await loop.run_in_executor(
+                        self.executor, self.handle, method, target, body, headers
+                    )
+                except Exception:
+                    await self._write_response(
+                        writer,
+                        HTTPStatus.INTERNAL_SERVER_ERROR,
+                        json.dumps({"error": "internal_error"}).encode("utf-8"),
+                        keep_alive=False,
+                    )
+                    return
+                self.requests += 1
+                await self._write_response(writer, status, payload, keep_alive=keep_alive, headers=response_headers)
+        finally:
+            self.open_connections -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    def _parse_head(self, head: bytes) -> tuple[str, str, dict[str, str], bool, int]:
+        try:
+            lines = head.decode("latin-1").split("\r\n")
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "bad_request_line") from None
+        if version not in {"HTTP/1.0", "HTTP/1.1"}:
+            raise _BadRequest(HTTPStatus.HTTP_VERSION_NOT_SUPPORTED, "http_version_not_supported")
+        headers: dict[str, str] = {}
+        for line in lines[1:]:
+            if not line:
+                continue
+            name, sep, value = line.partition(":")
+            if not sep:
+                raise _BadRequest(HTTPStatus.BAD_REQUEST, "bad_header")
+            headers[name.strip().lower()] = value.strip()
+        if "transfer-encoding" in headers:
+            raise _BadRequest(HTTPStatus.LENGTH_REQUIRED, "content_length_required")
+        try:
+            content_length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "bad_content_length") from None
+        if content_length < 0:
+            raise _BadRequest(HTTPStatus.BAD_REQUEST, "bad_content_length")
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+        return method.upper(), target, headers, keep_alive, content_length
+
+    async def _write_response(
+        self,
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        body: bytes,
+        *,
+        keep_alive: bool,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        extra = "".join(
+            f"{name}: {value}\r\n"
+            for name, value in (headers or {"Content-Type": JSON_CONTENT_TYPE}).items()
+        )
+        head = (
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"{extra}"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        writer.write(head + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
@@ -0,0 +1,455 @@
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any
+
+from ministral_ft.case_instruction_server import (
+    COUNTED_DIMENSIONS,
+    DEFAULT_CORPUS_FILE,
+    DEFAULT_MASTER_SCHEMA_FILE,
+    DEFAULT_SEED,
+    ISSUED_FILENAME,
+    SPARSE_COVERAGE_PREFIXES,
+    InstructionServerApp,
+    _collect_named_values,
+    _generate_target_in_worker,
+    _init_target_worker,
+    _normalize_target_toon,
+    _validate_business_coherence,
+    _validate_sparse_payload,
+    _validate_target_candidate,
+    _validate_target_payload_against_schema,
+    _validate_topic_alignment,
+)
+from ministral_ft.state_snapshot import SNAPSHOT_FILENAME
+from ministral_ft.state_store import STATE_BACKEND_JSONL, STATE_BACKEND_SQLITE, import_jsonl
+
+
+def _percentile(values: list[float], share: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, int(round(share * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _latency_summary(samples_ms: list[float]) -> dict[str, float]:
+    return {
+        "median_ms": round(statistics.median(samples_ms), 3) if samples_ms else 0.0,
+        "p95_ms": round(_percentile(samples_ms, 0.95), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+    }
+
+
+def _build_app(state_dir: Path, args: argparse.Namespace) -> InstructionServerApp:
+    return InstructionServerApp(
+        state_dir=state_dir,
+        corpus_file=Path(args.corpus_file),
+        master_schema_file=Path(args.master_schema_file),
+        target_total_cases=10**9,
+        generation_target=None,
+        seed=args.seed,
+        prefill_depth=0,
+        state_backend=args.state_backend,
+    )
+
+
+def _case_text_for(instruction: dict[str, Any], index: int) -> str:
+    _, decoded = _normalize_target_toon(str(instruction.get("server_target_toon") or ""))
+    names = ", ".join(_collect_named_values(decoded))
+    return (
+        f"Dossier de test {index} : le défunt laisse plusieurs proches ({names}) "
+        "et une maison familiale dont le partage n'est pas encore réglé."
+    )
+
+
+def _write_issued_journal(state_dir: Path, args: argparse.Namespace, size: int) -> None:
+    # N copies of one real instruction. The template app's snapshot is dropped, so the
+    # next start is a full scan.
+    template_app = _build_app(state_dir, args)
+    template_app.next_instruction({"agent_id": "bench"})
+    template = dict(template_app.issued[-1])
+    template_app.close()
+    (state_dir / SNAPSHOT_FILENAME).unlink(missing_ok=True)
+    template["instruction_id"] = "__INSTRUCTION_ID__"
+    template_line = json.dumps(template, ensure_ascii=False)
+    with (state_dir / ISSUED_FILENAME).open("w", encoding="utf-8") as handle:
+        for sequence in range(1, size + 1):
+            handle.write(template_line.replace("__INSTRUCTION_ID__", f"INS-{sequence:04d}") + "\n")
+    if args.state_backend == STATE_BACKEND_SQLITE:
+        import_jsonl(state_dir, counted_dimensions=COUNTED_DIMENSIONS)
+
+
+def bench_submit(args: argparse.Namespace) -> dict[str, Any]:
+    # Submit latency against a journal of N issued instructions. Only the tail of the
+    # journal is submitted, which was the worst case for the former linear scans.
+    results: list[dict[str, Any]] = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="instruction-bench-") as tmp:
+            state_dir = Path(tmp)
+            _write_issued_journal(state_dir, args, size)
+
+            started = time.perf_counter()
+            app = _build_app(state_dir, args)
+            startup_ms = (time.perf_counter() - started) * 1000
+
+            samples_ms: list[float] = []
+            for offset in range(args.submissions):
+                instruction_id = f"INS-{size - offset:04d}"
+                instruction = app._find_instruction(instruction_id)
+                payload = {
+                    "instruction_id": instruction_id,
+                    "agent_id": "bench",
+                    "case_text": _case_text_for(instruction, offset),
+                }
+                started = time.perf_counter()
+                app.submit_case(payload)
+                samples_ms.append((time.perf_counter() - started) * 1000)
+            app.close()
+
+            results.append(
+                {
+                    "issued": size,
+                    "submissions": len(samples_ms),
+                    "startup_ms": round(startup_ms, 1),
+                    "submit": _latency_summary(samples_ms),
+                }
+            )
+    return {"benchmark": "submit", "results": results}
+
+
+def bench_startup(args: argparse.Namespace) -> dict[str, Any]:
+    # Cold start (full journal scan, writes the first snapshot) against a restart from
+    # that snapshot, for journals of N issued instructions.
+    results: list[dict[str, Any]] = []
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="instruction-bench-") as tmp:
+            state_dir = Path(tmp)
+            _write_issued_journal(state_dir, args, size)
+            runs: dict[str, Any] = {}
+            for label in ("cold", "restart"):
+                started = time.perf_counter()
+                app = _build_app(state_dir, args)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                runs[label] = {"mode": app.startup["mode"], "startup_ms": round(elapsed_ms, 1)}
+                app.close()
+            results.append({"issued": size, **runs})
+    return {"benchmark": "startup", "results": results}
+
+
+def bench_targets(args: argparse.Namespace) -> dict[str, Any]:
+    # Target generation throughput for a fixed chain of instructions, inline (0) and
+    # with N worker processes. Every run must produce the same targets.
+    with tempfile.TemporaryDirectory(prefix="instruction-bench-") as tmp:
+        app = _build_app(Path(tmp), args)
+        cursor = app._prefill_cursor()
+        chain: list[tuple[dict[str, Any], int]] = []
+        for _ in range(args.targets):
+            instruction = app._build_instruction(agent_id=None, force_topic=None, cursor=cursor)
+            chain.append((instruction, cursor.sequence))
+            cursor = cursor.advanced(instruction)
+        app.close()
+
+        results: list[dict[str, Any]] = []
+        reference: list[str] | None = None
+        for workers in args.workers:
+            started = time.perf_counter()
+            if workers == 0:
+                targets = [app._generate_target(instruction, sequence)[0] for instruction, sequence in chain]
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_target_worker,
+                    initargs=(app.master_schema_file, int(app.config["seed"]), app.toon_backend),
+                ) as executor:
+                    # Warm the workers so schema compilation is not counted.
+                    list(executor.map(_generate_target_in_worker, *zip(*chain[:workers])))
+                    started = time.perf_counter()
+                    targets = [
+                        target for target, *_ in executor.map(
+                            _generate_target_in_worker,
+                            [instruction for instruction, _ in chain],
+                            [sequence for _, sequence in chain],
+                            chunksize=max(1, len(chain) // (workers * 8)),
+                        )
+                    ]
+            elapsed = time.perf_counter() - started
+            if reference is None:
+                reference = targets
+            results.append(
+                {
+                    "workers": workers,
+                    "targets": len(targets),
+                    "targets_per_s": round(len(targets) / elapsed, 1) if elapsed else 0.0,
+                    "identical": targets == reference,
+                }
+            )
+    return {"benchmark": "targets", "cpu_count": os.cpu_count(), "results": results}
+
+
+def _validate_with_reference(candidate: dict[str, Any], app: InstructionServerApp, dimensions: Any) -> None:
+    # The four separate validators, in the order _generate_target used to call them.
+    _validate_sparse_payload(candidate)
+    _validate_business_coherence(candidate, dimensions=dimensions)
+    _validate_target_payload_against_schema(candidate, app.master_schema_index)
+    if isinstance(dimensions, dict):
+        secondary_topic = dimensions.get("secondary_topic")
+        _validate_topic_alignment(
+            candidate,
+            primary_topic=str(dimensions.get("primary_topic") or "ordre_heritiers"),
+            secondary_topic=str(secondary_topic) if isinstance(secondary_topic, str) and secondary_topic else None,
+        )
+
+
+def _mutated_candidate(candidate: dict[str, Any], rng: random.Random) -> dict[str, Any]:
+    # Breaks one random spot so the error paths (and their messages) are compared too.
+    mutated = copy.deepcopy(candidate)
+    parent: Any = mutated
+    key: Any = None
+    while True:
+        if isinstance(parent, dict) and parent:
+            key = rng.choice(list(parent))
+        elif isinstance(parent, list) and parent:
+            key = rng.randrange(len(parent))
+        else:
+            break
+        if not isinstance(parent[key], (dict, list)) or rng.random() < 0.2:
+            break
+        parent = parent[key]
+    if key is None:
+        return mutated
+    parent[key] = rng.choice([None, "", "  ", "HORS_ENUM", 0, -3.5, True, [], {}, {"inconnu": "x"}, ["x"]])
+    if isinstance(parent, dict) and rng.random() < 0.2:
+        parent["cle_inconnue"] = "x"
+    return mutated
+
+
+def bench_validation(args: argparse.Namespace) -> dict[str, Any]:
+    # Per-candidate validation cost, reference validators against the compiled
+    # single-pass one, on generated targets and on randomly broken copies. Both must
+    # accept the same candidates and raise the same messages.
+    with tempfile.TemporaryDirectory(prefix="instruction-bench-") as tmp:
+        app = _build_app(Path(tmp), args)
+        cursor = app._prefill_cursor()
+        rng = random.Random(args.seed)
+        cases: list[tuple[dict[str, Any], Any]] = []
+        for sequence in range(args.targets):
+            instruction = app._build_instruction(agent_id=None, force_topic=None, cursor=cursor)
+            cursor = cursor.advanced(instruction)
+            candidate = app._build_target_payload_for_instruction(instruction, random.Random(sequence))
+            dimensions = instruction.get("dimensions", {})
+            cases.append((candidate, dimensions))
+            cases.append((_mutated_candidate(candidate, rng), dimensions))
+        app.close()
+
+        def outcomes(validate: Any) -> tuple[list[str | None], float]:
+            results: list[str | None] = []
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                results = []
+                for candidate, dimensions in cases:
+                    try:
+                        validate(candidate, dimensions)
+                        results.append(None)
+                    except Exception as exc:
+                        results.append(f"{type(exc).__name__}: {exc}")
+            return results, (time.perf_counter() - started) / (args.repeat * len(cases))
+
+        reference, reference_s = outcomes(lambda candidate, dims: _validate_with_reference(candidate, app, dims))
+        compiled, compiled_s = outcomes(
+            lambda candidate, dims: _validate_target_candidate(candidate, app.master_schema_index, dimensions=dims)
+        )
+    return {
+        "benchmark": "validation",
+        "candidates": len(cases),
+        "rejected": sum(1 for outcome in reference if outcome is not None),
+        "reference_us": round(reference_s * 1e6, 1),
+        "compiled_us": round(compiled_s * 1e6, 1),
+        "speedup": round(reference_s / compiled_s, 2) if compiled_s else 0.0,
+        "identical": compiled == reference,
+    }
+
+
+def _scan_leaves_under(leaf_specs: dict[tuple[str, ...], Any], prefixes: list[tuple[str, ...]]) -> list[tuple[str, ...]]:
+    # The former selection: every leaf path against every prefix.
+    return [path for path in leaf_specs if any(path[: len(prefix)] == prefix for prefix in prefixes)]
+
+
+def bench_paths(args: argparse.Namespace) -> dict[str, Any]:
+    # Per-attempt leaf path selection (topic prefixes, then each sparse coverage
+    # prefix), full scan of leaf_specs against the prefix map of MasterSchemaIndex.
+    with tempfile.TemporaryDirectory(prefix="instruction-bench-") as tmp:
+        app = _build_app(Path(tmp), args)
+        cursor = app._prefill_cursor()
+        attempts: list[list[tuple[str, ...]]] = []
+        for _ in range(args.targets):
+            instruction = app._build_instruction(agent_id=None, force_topic=None, cursor=cursor)
+            cursor = cursor.advanced(instruction)
+            attempts.append(app._topic_prefixes_for_dimensions(instruction.get("dimensions", {})))
+        app.close()
+        schema_index = app.master_schema_index
+
+        def run(select: Any) -> tuple[list[list[tuple[str, ...]]], float]:
+            selected: list[list[tuple[str, ...]]] = []
+            started = time.perf_counter()
+            for _ in range(args.repeat):
+                selected = []
+                for prefixes in attempts:
+                    selected.append(select(prefixes))
+                    for extra_prefix in SPARSE_COVERAGE_PREFIXES:
+                        selected.append(select([extra_prefix]))
+            return selected, (time.perf_counter() - started) / (args.repeat * len(attempts))
+
+        scanned, scan_s = run(lambda prefixes: _scan_leaves_under(schema_index.leaf_specs, prefixes))
+        indexed, indexed_s = run(schema_index.leaves_under)
+    return {
+        "benchmark": "paths",
+        "leaves": len(schema_index.leaf_specs),
+        "attempts": len(attempts),
+        "selected_per_attempt": round(sum(map(len, indexed)) / len(attempts), 1) if attempts else 0.0,
+        "scan_us": round(scan_s * 1e6, 1),
+        "indexed_us": round(indexed_s * 1e6, 1),
+        "speedup": round(scan_s / indexed_s, 2) if indexed_s else 0.0,
+        "identical": indexed == scanned,
+    }
+
+
+def bench_concurrent(args: argparse.Namespace) -> dict[str, Any]:
+    # Agent loops (next-instruction then submit-case, or the batch endpoints with
+    # --batch-size > 1) on N threads against one app.
+    # Issued ids must stay unique and gap-free whatever the interleaving.
+    results: list[dict[str, Any]] = []
+    for agents in args.agents:
+        with tempfile.TemporaryDirectory(prefix="instruction-bench-") as tmp:
+            app = _build_app(Path(tmp), args)
+
+            def agent_loop(agent_index: int) -> list[float]:
+                samples_ms: list[float] = []
+                agent_id = f"bench-{agent_index}"
+                for round_index in range(args.rounds):
+                    started = time.perf_counter()
+                    if args.batch_size > 1:
+                        response = app.next_instructions({"agent_id": agent_id, "count": args.batch_size})
+                        instruction_ids = [item["instruction_id"] for item in response["instructions"]]
+                    else:
+                        response = app.next_instruction({"agent_id": agent_id})
+                        instruction_ids = [response["instruction"]["instruction_id"]]
+                    cases = [
+                        {
+                            "instruction_id": instruction_id,
+                            "agent_id": agent_id,
+                            "case_text": _case_text_for(
+                                app._find_instruction(instruction_id),
+                                (agent_index * args.rounds + round_index) * args.batch_size + offset,
+                            ),
+                        }
+                        for offset, instruction_id in enumerate(instruction_ids)
+                    ]
+                    if args.batch_size > 1:
+                        app.submit_cases({"cases": cases})
+                    else:
+                        app.submit_case(cases[0])
+                    elapsed_ms = (time.perf_counter() - started) * 1000
+                    samples_ms.extend([elapsed_ms / len(cases)] * len(cases))
+                return samples_ms
+
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=agents) as executor:
+                per_agent = list(executor.map(agent_loop, range(agents)))
+            elapsed = time.perf_counter() - started
+            issued_ids = [str(row.get("instruction_id")) for row in app.issued]
+            app.close()
+
+            samples_ms = [sample for samples in per_agent for sample in samples]
+            results.append(
+                {
+                    "agents": agents,
+                    "batch_size": args.batch_size,
+                    "cases": len(samples_ms),
+                    "cases_per_s": round(len(samples_ms) / elapsed, 1) if elapsed else 0.0,
+                    "per_case": _latency_summary(samples_ms),
+                    "ids_sequential": issued_ids == [f"INS-{index:04d}" for index in range(1, len(issued_ids) + 1)],
+                }
+            )
+    return {"benchmark": "concurrent", "results": results}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Micro-benchmarks du serveur de consignes (latence de soumission, etc.)."
+    )
+    parser.add_argument(
+        "benchmark",
+        choices=["submit", "startup", "targets", "validation", "paths", "concurrent"],
+    )
+    parser.add_argument("--corpus-file", default=str(DEFAULT_CORPUS_FILE))
+    parser.add_argument("--master-schema-file", default=str(DEFAULT_MASTER_SCHEMA_FILE))
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--state-backend",
+        choices=[STATE_BACKEND_JSONL, STATE_BACKEND_SQLITE],
+        default=STATE_BACKEND_JSONL,
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda raw: [int(item) for item in raw.split(",") if item.strip()],
+        default=[1_000, 10_000, 100_000],
+        help="Tailles de journal d'instructions émises, séparées par des virgules.",
+    )
+    parser.add_argument("--submissions", type=int, default=50)
+    parser.add_argument(
+        "--targets",
+        type=int,
+        default=400,
+        help="Nombre de targets (ou de tentatives) pour les benchmarks `targets`, `validation` et `paths`.",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Passes pour les benchmarks `validation` et `paths`.")
+    parser.add_argument(
+        "--workers",
+        type=lambda raw: [int(item) for item in raw.split(",") if item.strip()],
+        default=[0, 1, 2, 4, 8, 16],
+        help="Nombres de processus à comparer (0 = génération dans le processus courant).",
+    )
+    parser.add_argument(
+        "--agents",
+        type=lambda raw: [int(item) for item in raw.split(",") if item.strip()],
+        default=[1, 8, 32],
+        help="Nombres d'agents concurrents pour le benchmark `concurrent`.",
+    )
+    parser.add_argument("--rounds", type=int, default=5, help="Cycles consigne + soumission par agent.")
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        help="Consignes/cas par cycle (> 1 : endpoints /next-instructions et /submit-cases).",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    benchmarks = {
+        "submit": bench_submit,
+        "startup": bench_startup,
+        "targets": bench_targets,
+        "validation": bench_validation,
+        "paths": bench_paths,
+        "concurrent": bench_concurrent,
+    }
+    report = benchmarks[args.benchmark](args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,138 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import gzip
+import hashlib
 import json
+import multiprocessing
 import random
 import re
-import subprocess
+import signal
 import threading
-import tempfile
+import time
 import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import UTC, date, datetime
+from functools import partial, wraps
 from http import HTTPStatus
 from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Any
-from urllib.parse import parse_qs, urlparse
+from typing import Any, Callable
+from urllib.parse import parse_qs, unquote, urlparse
 
 try:
     from faker import Faker
 except Exception:  # pragma: no cover - optional dependency during bootstrap
     Faker = None  # type: ignore[assignment]
 
+from ministral_ft.async_http import DEFAULT_MAX_BODY_BYTES, JSON_CONTENT_TYPE, AsyncHTTPServer
+from ministral_ft.instruction_pool import DEFAULT_LANE, InstructionPool, PrefillSlot
+from ministral_ft.metrics import (
+    LOCK_WAIT_BUCKETS,
+    PROMETHEUS_CONTENT_TYPE,
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsRegistry,
+    StageTimings,
+    TimedLock,
+)
+from ministral_ft.near_duplicate_index import NearDuplicateIndex
+from ministral_ft.profiler import (
+    DEFAULT_PROFILE_TOP,
+    DEFAULT_SAMPLE_INTERVAL_MS,
+    MAX_PROFILE_WAIT_SECONDS,
+    PROFILE_MODE_CPROFILE,
+    PROFILE_MODES,
+    PROFILES_DIRNAME,
+    RequestProfiler,
+)
+from ministral_ft.state_migrations import STATE_VERSION, migrate_state
+from ministral_ft.state_snapshot import (
+    DEFAULT_SNAPSHOT_INTERVAL_S,
+    SNAPSHOT_FILENAME,
+    JournalRows,
+    read_snapshot,
+    write_snapshot,
+)
+from ministral_ft.state_store import (
+    ISSUED_FILENAME,
+    JOURNAL_ISSUED,
+    JOURNAL_SUBMITTED,
+    STATE_BACKEND_JSONL,
+    STATE_BACKEND_SQLITE,
+    file_fingerprint,
+    instruction_record,
+    load_jsonl,
+    open_state_store,
+)
+from ministral_ft.toon_codec import (
+    decode_toon,
+    decode_toon_with_cli,
+    encode_toon,
+    encode_toon_with_cli,
+    normalize_toon,
+)
+from ministral_ft.tracing import TRACE_FILENAME, Tracer, current_trace, span
+from ministral_ft.write_behind import WriteBehindWorker
+
 DEFAULT_TARGET_TOTAL_CASES = 5000
 DEFAULT_SEED = 42
 DEFAULT_CORPUS_FILE = Path("data/succession_e2e/e2e_cases.jsonl")
 DEFAULT_MASTER_SCHEMA_FILE = Path("../w5/glinerExtract/schema/schema.full.json")
 CONFIG_FILENAME = "config.json"
-ISSUED_FILENAME = "issued_instructions.jsonl"
-SUBMITTED_FILENAME = "generated_cases.jsonl"
 SUMMARY_JSON_FILENAME = "summary.json"
 SUMMARY_MD_FILENAME = "summary.md"
 GENERATED_TRAIN_FILENAME = "generated_cases_train_mistral.jsonl"
 FULL_TRAIN_FILENAME = "full_training_cases_mistral.jsonl"
+NEAR_DUPLICATE_THRESHOLD = 0.72
+TOON_BACKEND_PYTHON = "python"
+TOON_BACKEND_CLI = "cli"
+DECODED_TARGET_CACHE_SIZE = 4096
+DEFAULT_SUMMARY_INTERVAL_MS = 500
+DEFAULT_PREFILL_DEPTH = 4
+DEFAULT_PREFILL_TOPIC_DEPTH = 2
+DEFAULT_PREFILL_WORKERS = 1
+DEFAULT_HTTP_WORKERS = 16
+MAX_BATCH_SIZE = 100
+# Smaller bodies are sent as is: the gzip header and trailer would eat the gain.
+GZIP_MIN_BYTES = 1024
+# JSON already shrinks 3-5x at the fastest level; higher levels mostly cost CPU.
+GZIP_COMPRESSLEVEL = 1
+SERVER_THREADING = "threading"
+SERVER_ASYNCIO = "asyncio"
+RECENT_SIGNATURE_WINDOW = 12
+MAX_TARGET_ATTEMPTS = 50
+MAX_REJECTION_REASONS = 40
+TARGET_REJECTION_PREFIXES = (
+    ("target généré non sparse: ", "sparse"),
+    ("target généré incohérent métier: ", "metier"),
+    ("target généré non conforme au schema.full: ", "schema"),
+    ("alignment topic/TOON invalide: ", "topic"),
+)
 FORBIDDEN_CAPS_UNDERSCORE_RE = re.compile(r"\b[A-Z]{2,}(?:_[A-Z0-9]{2,})+\b")
 FORBIDDEN_PYTHON_BOOL_RE = re.compile(r"\b(?:True|False)\b")
 FORBIDDEN_PATH_DUMP_RE = re.compile(r"\s>\s")
 FORBIDDEN_ENUM_BASIC_RE = re.compile(
     r"\b(?:CELIBATAIRE|MARIE|PACSE|DIVORCE|VEUF|JOURS|MOIS|ANNEES)\b"
 )
+LIST_INDEX_RE = re.compile(r"\[\d+\]")
+# Route label of /metrics series; anything else is counted as "autre" so that
+# unknown paths cannot grow the label set.
+METRIC_ROUTES = {
+    "/admin/profile",
+    "/health",
+    "/dashboard",
+    "/metrics",
+    "/debug/leaf-generators",
+    "/next-instruction",
+    "/next-instructions",
+    "/submit-case",
+    "/submit-cases",
+}
 FORBIDDEN_SCHEMAISH_PHRASES_RE = re.compile(
     r"\b(?:famille\s+defunt|contexte\s+procedure|patrimoine\s+actifs?|liberalites?\s+donations?)\b",
     re.IGNORECASE,
@@ -135,6 +230,19 @@ HARD_NEGATIVE_INTENSITY_TARGETS = {
     "soft": 0.80,
     "hard": 0.20,
 }
+COUNTED_DIMENSIONS = (
+    "persona",
+    "voice",
+    "format",
+    "length_band",
+    "noise",
+    "numeric_density",
+    "date_precision",
+    "complexity",
+    "primary_topic",
+    "hard_negative_mode",
+    "hard_negative_intensity",
+)
 
 PERSONA_LABELS = {
     "enfant": "un enfant du défunt",
@@ -665,10 +773,260 @@ class CorpusSeed:
     text: str
 
 
+@dataclass(slots=True)
+class SeedIndex:
+    source_file: Path
+    source_stamp: tuple[int, int] | None
+    seeds: list[CorpusSeed]
+    normalized_texts: list[str]
+    seeds_by_topic: dict[str, tuple[int, ...]]
+
+
+@dataclass(slots=True)
+class SchemaNodeValidator:
+    # One node of the compiled master schema: children by key ("*" for list items)
+    # and, for leaves, the type check and enum resolved once at compile time.
+    label: str
+    prefix: str
+    children: dict[str, SchemaNodeValidator]
+    is_leaf: bool
+    expected_type: str
+    accepts: Callable[[Any], bool]
+    enum_values: frozenset[str]
+    enum_listing: list[str]
+
+
 @dataclass(slots=True)
 class MasterSchemaIndex:
     allowed_nodes: set[tuple[str, ...]]
     leaf_specs: dict[tuple[str, ...], dict[str, Any]]
+    validator: SchemaNodeValidator
+    topic_predicates: dict[str, Callable[[dict[str, Any]], bool]]
+    # Every prefix of every leaf path -> positions (in leaf_specs order) of the leaves below it.
+    leaf_paths: tuple[tuple[str, ...], ...]
+    leaves_by_prefix: dict[tuple[str, ...], tuple[int, ...]]
+
+    def leaves_under(self, prefixes: list[tuple[str, ...]]) -> list[tuple[str, ...]]:
+        # Leaves matching any of `prefixes`, once each, in leaf_specs order (the order
+        # the former full scans drew their random numbers in).
+        if len(prefixes) == 1:
+            positions: Any = self.leaves_by_prefix.get(prefixes[0], ())
+        else:
+            positions = sorted(
+                {position for prefix in prefixes for position in self.leaves_by_prefix.get(prefix, ())}
+            )
+        return [self.leaf_paths[position] for position in positions]
+
+
+@dataclass(slots=True)
+class LeafGenerator:
+    # Value generator resolved once per schema leaf (see _compile_leaf_generator);
+    # `name` is what /debug/leaf-generators reports.
+    name: str
+    generate: Callable[[random.Random, dict[str, Any]], Any]
+
+
+@dataclass(slots=True)
+class DimensionCounters:
+    counts: dict[str, dict[str, int]]
+
+    @classmethod
+    def from_rows(cls, rows: list[dict[str, Any]]) -> "DimensionCounters":
+        counters = cls(counts={key: {} for key in COUNTED_DIMENSIONS})
+        for row in rows:
+            counters.add(row.get("dimensions", {}))
+        return counters
+
+    def add(self, dimensions: Any) -> None:
+        if not isinstance(dimensions, dict):
+            return
+        for key, bucket in self.counts.items():
+            value = dimensions.get(key)
+            if isinstance(value, str) and value:
+                bucket[value] = bucket.get(value, 0) + 1
+
+    def __getitem__(self, key: str) -> dict[str, int]:
+        return self.counts[key]
+
+    def copy(self) -> "DimensionCounters":
+        return DimensionCounters(counts={key: dict(bucket) for key, bucket in self.counts.items()})
+
+
+@dataclass(slots=True)
+class ReferenceTexts:
+    # Texts behind the near-duplicate index entries: seeds in memory, submissions read
+    # back from the journal on demand (only LSH candidates are ever looked up).
+    seeds: dict[str, str]
+    submitted_positions: dict[str, int]
+    submitted: JournalRows
+
+    def __contains__(self, ref_id: object) -> bool:
+        return ref_id in self.seeds or ref_id in self.submitted_positions
+
+    def __getitem__(self, ref_id: str) -> str:
+        text = self.seeds.get(ref_id)
+        if text is not None:
+            return text
+        return str(self.submitted[self.submitted_positions[ref_id]]["case_text"])
+
+
+@dataclass(slots=True)
+class IssueCursor:
+    # Everything _build_instruction reads from the issued journal, so the next
+    # instructions can be built ahead of time (see InstructionPool).
+    sequence: int
+    counters: DimensionCounters
+    recent_signatures: tuple[Any, ...]
+    seed_index: SeedIndex
+
+    @property
+    def token(self) -> tuple[int, tuple[int, int] | None]:
+        return (self.sequence, self.seed_index.source_stamp)
+
+    def advanced(self, instruction: dict[str, Any]) -> "IssueCursor":
+        counters = self.counters.copy()
+        counters.add(instruction.get("dimensions", {}))
+        return IssueCursor(
+            sequence=self.sequence + 1,
+            counters=counters,
+            recent_signatures=(*self.recent_signatures, instruction.get("signature"))[-RECENT_SIGNATURE_WINDOW:],
+            seed_index=self.seed_index,
+        )
+
+
+@dataclass(slots=True)
+class TargetGeneration:
+    # Rejection reasons and (stage, offset, seconds) laps of one target, offsets from
+    # `started`. Kept with prefilled targets so the request issuing them can trace them.
+    started: float
+    rejections: list[str]
+    laps: list[tuple[str, float, float]]
+
+
+class TargetGenerationError(ValueError):
+    # Raised when every attempt was rejected; carries the rejection reasons and stage
+    # laps back from --target-workers processes (hence __reduce__). `generation` is
+    # filled in by the caller, on this side of the process boundary.
+
+    def __init__(self, message: str, rejections: list[str], laps: list[tuple[str, float, float]]) -> None:
+        super().__init__(message)
+        self.rejections = rejections
+        self.laps = laps
+        self.generation: TargetGeneration | None = None
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return (type(self), (str(self), self.rejections, self.laps))
+
+
+def _rejection_reason(exc: Exception) -> str:
+    # First error of the message, with list indexes and received values stripped so
+    # reasons aggregate across targets.
+    message = str(exc)
+    for prefix, label in TARGET_REJECTION_PREFIXES:
+        if message.startswith(prefix):
+            first = message[len(prefix):].split("; ", 1)[0].split(" (reçu=", 1)[0]
+            return f"{label}: {LIST_INDEX_RE.sub('[]', first)}"
+    return type(exc).__name__
+
+
+class TargetGenerationStats:
+    # Attempts per generated target and rejection reasons, by primary topic and by
+    # complexity, since the process started (prefilled targets included).
+
+    def __init__(self, axes: tuple[str, ...] = ("primary_topic", "complexity")) -> None:
+        self.lock = threading.Lock()
+        self.by_axis: dict[str, dict[str, dict[str, Any]]] = {axis: {} for axis in axes}
+
+    def record(self, dimensions: Any, rejections: list[str], *, failed: bool = False) -> None:
+        attempts = len(rejections) + (0 if failed else 1)
+        with self.lock:
+            for axis, buckets in self.by_axis.items():
+                value = dimensions.get(axis) if isinstance(dimensions, dict) else None
+                bucket = buckets.setdefault(
+                    str(value or "inconnu"),
+                    {"targets": 0, "failed": 0, "attempts": {}, "rejections": {}},
+                )
+                bucket["targets"] += 1
+                bucket["failed"] += int(failed)
+                bucket["attempts"][attempts] = bucket["attempts"].get(attempts, 0) + 1
+                reasons = bucket["rejections"]
+                for reason in rejections:
+                    if reason not in reasons and len(reasons) >= MAX_REJECTION_REASONS:
+                        reason = "autres"
+                    reasons[reason] = reasons.get(reason, 0) + 1
+
+    def snapshot(self) -> dict[str, Any]:
+        with self.lock:
+            report: dict[str, Any] = {}
+            for axis, buckets in self.by_axis.items():
+                report[axis] = {}
+                for value, bucket in sorted(buckets.items()):
+                    total_attempts = sum(attempts * count for attempts, count in bucket["attempts"].items())
+                    report[axis][value] = {
+                        "targets": bucket["targets"],
+                        "failed": bucket["failed"],
+                        "first_attempt_share": round(bucket["attempts"].get(1, 0) / bucket["targets"], 4),
+                        "attempts_per_target": round(total_attempts / bucket["targets"], 3),
+                        "attempts": {str(attempts): count for attempts, count in sorted(bucket["attempts"].items())},
+                        "rejections": dict(sorted(bucket["rejections"].items(), key=lambda item: -item[1])),
+                    }
+            return report
+
+
+@dataclass
+class ServerMetrics:
+    registry: MetricsRegistry
+    requests: Counter
+    request_seconds: Histogram
+    in_flight: Gauge
+    stage_seconds: Histogram
+    lock_wait_seconds: Histogram
+
+
+def _build_server_metrics() -> ServerMetrics:
+    registry = MetricsRegistry()
+    return ServerMetrics(
+        registry=registry,
+        requests=registry.counter(
+            "instruction_server_requests_total",
+            "HTTP requests handled, by method, route and status.",
+            ("method", "route", "status"),
+        ),
+        request_seconds=registry.histogram(
+            "instruction_server_request_duration_seconds",
+            "Time to handle an HTTP request, response serialization included.",
+            ("method", "route"),
+        ),
+        in_flight=registry.gauge(
+            "instruction_server_requests_in_flight",
+            "HTTP requests currently being handled.",
+        ),
+        stage_seconds=registry.histogram(
+            "instruction_server_stage_duration_seconds",
+            "Time spent in one stage of target generation, submission or derived writes.",
+            ("stage",),
+        ),
+        lock_wait_seconds=registry.histogram(
+            "instruction_server_lock_wait_seconds",
+            "Time spent waiting to acquire a server lock.",
+            ("lock",),
+            buckets=LOCK_WAIT_BUCKETS,
+        ),
+    )
+
+
+def _timed_stage(stage: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    # For InstructionServerApp methods: the call duration goes to stage_seconds, and
+    # to a span when the request is traced.
+    def decorate(method: Callable[..., Any]) -> Callable[..., Any]:
+        @wraps(method)
+        def timed(self: InstructionServerApp, *args: Any, **kwargs: Any) -> Any:
+            with self.metrics.stage_seconds.time((stage,)), span(stage):
+                return method(self, *args, **kwargs)
+
+        return timed
+
+    return decorate
 
 
 def _utc_now() -> str:
@@ -687,67 +1045,24 @@ def _normalize_key(value: str) -> str:
     return "".join(char for char in normalized if unicodedata.category(char) != "Mn")
 
 
-def _decode_toon_with_cli(toon_text: str) -> Any:
-    # Validate TOON syntax using the official CLI in decode mode
-    # and return decoded JSON payload.
-    with tempfile.NamedTemporaryFile("w", suffix=".toon", encoding="utf-8", delete=False) as handle:
-        handle.write(toon_text)
-        temp_path = handle.name
-    try:
-        result = subprocess.run(
-            ["npx", "-y", "@toon-format/cli", temp_path],
-            check=False,
-            capture_output=True,
-            text=True,
-            timeout=20,
-        )
-    except subprocess.TimeoutExpired as exc:
-        raise ValueError("validation TOON expirée") from exc
-    finally:
-        Path(temp_path).unlink(missing_ok=True)
-
-    if result.returncode != 0:
-        error = (result.stderr or result.stdout or "").strip()
-        first_line = error.splitlines()[0] if error else "TOON invalide"
-        raise ValueError(f"target_toon invalide: {first_line}")
-
-    decoded_raw = (result.stdout or "").strip()
-    if not decoded_raw:
-        raise ValueError("target_toon invalide: sortie de décodage vide")
-    try:
-        return json.loads(decoded_raw)
-    except json.JSONDecodeError as exc:
-        raise ValueError("target_toon invalide: sortie de décodage illisible") from exc
-
+def _encode_json_to_toon(
+    payload: dict[str, Any],
+    *,
+    backend: str = TOON_BACKEND_PYTHON,
+) -> tuple[str, Any]:
+    if backend == TOON_BACKEND_CLI:
+        toon_text = encode_toon_with_cli(payload)
+    else:
+        toon_text = encode_toon(payload)
+    if not toon_text.strip():
+        raise ValueError("encodage TOON invalide: sortie vide")
 
-def _encode_json_to_toon(payload: dict[str, Any]) -> str:
-    with tempfile.NamedTemporaryFile("w", suffix=".json", encoding="utf-8", delete=False) as handle:
-        json.dump(payload, handle, ensure_ascii=False)
-        temp_path = handle.name
-    try:
-        result = subprocess.run(
-            ["npx", "-y", "@toon-format/cli", "--encode", temp_path],
-            check=False,
-            capture_output=True,
-            text=True,
-            timeout=20,
-        )
-    except subprocess.TimeoutExpired as exc:
-        raise ValueError("encodage TOON expiré") from exc
-    finally:
-        Path(temp_path).unlink(missing_ok=True)
+    return _normalize_target_toon(toon_text, backend=backend)
 
-    if result.returncode != 0:
-        error = (result.stderr or result.stdout or "").strip()
-        first_line = error.splitlines()[0] if error else "échec encodage TOON"
-        raise ValueError(f"encodage TOON invalide: {first_line}")
 
-    toon_text = (result.stdout or "").strip()
-    if not toon_text:
-        raise ValueError("encodage TOON invalide: sortie vide")
+def _toon_sha256(toon_text: str) -> str:
+    return hashlib.sha256(toon_text.encode("utf-8")).hexdigest()
 
-    normalized, _ = _normalize_target_toon(toon_text)
-    return normalized
 
 def _clean_name(value: str) -> str:
     normalized = _normalize_key(value)
@@ -830,23 +1145,10 @@ def _missing_names_from_case_text(case_text: str, decoded_target: Any) -> list[s
     return missing
 
 
-def _normalize_target_toon(value: Any) -> tuple[str, Any]:
-    if not isinstance(value, str):
-        raise ValueError("target_toon doit être une chaîne TOON")
-    raw_text = value.replace("\r\n", "\n").replace("\r", "\n").strip("\n")
-    toon_text = "\n".join(line.rstrip() for line in raw_text.splitlines())
-    if not toon_text:
-        raise ValueError("target_toon vide")
-
-    # Explicit guard: reject JSON-looking payloads.
-    raw = toon_text.strip()
-    if raw.startswith("{") or raw.startswith("["):
-        raise ValueError("target_toon semble être du JSON, TOON attendu")
-
-    decoded = _decode_toon_with_cli(toon_text)
-    if not isinstance(decoded, dict):
-        raise ValueError("target_toon invalide: la racine doit être un objet")
-    return toon_text, decoded
+def _normalize_target_toon(value: Any, *, backend: str = TOON_BACKEND_PYTHON) -> tuple[str, Any]:
+    decoder = decode_toon_with_cli if backend == TOON_BACKEND_CLI else decode_toon
+    with span("toon_decode", {"backend": backend}):
+        return normalize_toon(value, decoder=decoder)
 
 
 def _pair_training_record(case_text: str, target_toon: str) -> dict[str, Any]:
@@ -862,32 +1164,6 @@ def _pair_training_record(case_text: str, target_toon: str) -> dict[str, Any]:
     }
 
 
-def _load_jsonl(path: Path) -> list[dict[str, Any]]:
-    if not path.exists():
-        return []
-    rows: list[dict[str, Any]] = []
-    with path.open("r", encoding="utf-8") as handle:
-        for raw_line in handle:
-            line = raw_line.strip()
-            if not line:
-                continue
-            payload = json.loads(line)
-            if isinstance(payload, dict):
-                rows.append(payload)
-    return rows
-
-
-def _append_jsonl(path: Path, payload: dict[str, Any]) -> None:
-    with path.open("a", encoding="utf-8") as handle:
-        handle.write(json.dumps(payload, ensure_ascii=False) + "\n")
-
-
-def _rewrite_jsonl(path: Path, rows: list[dict[str, Any]]) -> None:
-    with path.open("w", encoding="utf-8") as handle:
-        for row in rows:
-            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
-
-
 def _is_schema_leaf(node: Any) -> bool:
     if not isinstance(node, dict):
         return False
@@ -928,33 +1204,87 @@ def _leaf_expected_type(node: dict[str, Any]) -> str:
     return "string"
 
 
+_LEAF_TYPE_CHECKS: dict[str, Callable[[Any], bool]] = {
+    "string": lambda value: isinstance(value, str),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+}
+
+
+def _schema_node_validator(path: tuple[str, ...], spec: dict[str, Any] | None) -> SchemaNodeValidator:
+    label = ".".join(path) if path else "<root>"
+    enum_listing = _enum_values_from_schema_leaf(spec) if spec is not None else []
+    expected_type = _leaf_expected_type(spec) if spec is not None else "string"
+    return SchemaNodeValidator(
+        label=label,
+        prefix=label + "." if path else "",
+        children={},
+        is_leaf=spec is not None,
+        expected_type=expected_type,
+        accepts=_LEAF_TYPE_CHECKS[expected_type],
+        enum_values=frozenset(enum_listing),
+        enum_listing=enum_listing,
+    )
+
+
+def _no_topic_paths(payload: dict[str, Any]) -> bool:
+    return False
+
+
+def _compile_topic_predicate(topic: str) -> Callable[[dict[str, Any]], bool]:
+    required = tuple(TOPIC_REQUIRED_LEAF_PATHS.get(topic, []))
+    if required:
+        return lambda payload: all(_path_exists_in_payload(payload, path) for path in required)
+    prefixes = tuple(TOPIC_SCHEMA_PREFIXES.get(topic, []))
+    return lambda payload: any(_path_exists_in_payload(payload, path) for path in prefixes)
+
+
 def _build_master_schema_index(schema: dict[str, Any]) -> MasterSchemaIndex:
     allowed_nodes: set[tuple[str, ...]] = {()}
     leaf_specs: dict[tuple[str, ...], dict[str, Any]] = {}
 
-    def walk(node: Any, path: tuple[str, ...]) -> None:
+    def walk(node: Any, path: tuple[str, ...]) -> SchemaNodeValidator:
         allowed_nodes.add(path)
         if _is_schema_leaf(node):
             leaf_specs[path] = node if isinstance(node, dict) else {}
-            return
+            return _schema_node_validator(path, leaf_specs[path])
+        validator = _schema_node_validator(path, None)
         if isinstance(node, dict):
             for key, child in node.items():
                 if isinstance(key, str):
-                    walk(child, path + (key,))
-            return
+                    validator.children[key] = walk(child, path + (key,))
+            return validator
         if isinstance(node, list):
             allowed_nodes.add(path + ("*",))
             if node:
-                walk(node[0], path + ("*",))
-
-    walk(schema, ())
-    return MasterSchemaIndex(allowed_nodes=allowed_nodes, leaf_specs=leaf_specs)
+                validator.children["*"] = walk(node[0], path + ("*",))
+            else:
+                validator.children["*"] = _schema_node_validator(path + ("*",), None)
+        return validator
+
+    validator = walk(schema, ())
+    topics = set(TOPIC_REQUIRED_LEAF_PATHS) | set(TOPIC_SCHEMA_PREFIXES)
+    leaf_paths = tuple(leaf_specs)
+    leaves_by_prefix: dict[tuple[str, ...], list[int]] = {}
+    for position, path in enumerate(leaf_paths):
+        for length in range(len(path) + 1):
+            leaves_by_prefix.setdefault(path[:length], []).append(position)
+    return MasterSchemaIndex(
+        allowed_nodes=allowed_nodes,
+        leaf_specs=leaf_specs,
+        validator=validator,
+        topic_predicates={topic: _compile_topic_predicate(topic) for topic in sorted(topics)},
+        leaf_paths=leaf_paths,
+        leaves_by_prefix={prefix: tuple(positions) for prefix, positions in leaves_by_prefix.items()},
+    )
 
 
 def _validate_target_payload_against_schema(
     payload: dict[str, Any],
     schema_index: MasterSchemaIndex,
 ) -> None:
+    # Reference implementation (see the `validation` benchmark); target generation goes
+    # through _validate_target_candidate.
     errors: list[str] = []
 
     def path_str(path: tuple[str, ...]) -> str:
@@ -1065,6 +1395,12 @@ def _parse_iso_date(value: Any) -> date | None:
     if not isinstance(value, str) or not value.strip():
         return None
     try:
+        # Zero-padded YYYY-MM-DD (what the generator writes) skips strptime, which
+        # dominated the business checks.
+        if len(value) == 10 and value[4] == "-" and value[7] == "-":
+            digits = value[:4] + value[5:7] + value[8:]
+            if digits.isascii() and digits.isdigit():
+                return date(int(value[:4]), int(value[5:7]), int(value[8:]))
         return datetime.strptime(value, "%Y-%m-%d").date()
     except ValueError:
         return None
@@ -1297,6 +1633,122 @@ def _validate_topic_alignment(
         raise ValueError("alignment topic/TOON invalide: " + "; ".join(errors))
 
 
+def _raise_error_preview(prefix: str, errors: list[str]) -> None:
+    if errors:
+        preview = "; ".join(errors[:3])
+        if len(errors) > 3:
+            preview += "; ..."
+        raise ValueError(prefix + preview)
+
+
+def _walk_target_payload(
+    payload: dict[str, Any],
+    root: SchemaNodeValidator,
+) -> tuple[list[str], list[str]]:
+    # One traversal for both _validate_sparse_payload and
+    # _validate_target_payload_against_schema, with the same messages in the same
+    # order. Below a key the schema rejects, only the sparse checks continue.
+    sparse_errors: list[str] = []
+    schema_errors: list[str] = []
+    trail: list[Any] = []
+
+    def trail_label() -> str:
+        if not trail:
+            return "<root>"
+        return ".".join(f"[{step}]" if isinstance(step, int) else step for step in trail)
+
+    def walk(value: Any, node: SchemaNodeValidator | None) -> None:
+        if isinstance(value, dict):
+            if not value:
+                sparse_errors.append(f"objet vide interdit à {trail_label()}")
+                return
+            for key, child_value in value.items():
+                if not isinstance(key, str) or not key:
+                    # Already a sparse error, which is raised first.
+                    sparse_errors.append(f"clé invalide à {trail_label()}")
+                    continue
+                child = None
+                if node is not None:
+                    child = node.children.get(key)
+                    if child is None:
+                        schema_errors.append(f"clé inconnue: {node.prefix}{key}")
+                trail.append(key)
+                walk(child_value, child)
+                trail.pop()
+            return
+        if isinstance(value, list):
+            if not value:
+                sparse_errors.append(f"liste vide interdite à {trail_label()}")
+                return
+            item = None
+            if node is not None:
+                item = node.children.get("*")
+                if item is None:
+                    schema_errors.append(f"liste non autorisée: {node.label}")
+            for index, element in enumerate(value):
+                trail.append(index)
+                walk(element, item)
+                trail.pop()
+            return
+        if value is None:
+            sparse_errors.append(f"null interdit à {trail_label()}")
+            return
+        if isinstance(value, str):
+            if not value.strip():
+                sparse_errors.append(f"string vide interdite à {trail_label()}")
+        elif not isinstance(value, (int, float, bool)):
+            sparse_errors.append(f"type non supporté à {trail_label()}: {type(value).__name__}")
+            return
+        if node is None:
+            return
+        if not node.is_leaf:
+            schema_errors.append(f"valeur scalaire à un chemin non-feuille: {node.label}")
+            return
+        if not node.accepts(value):
+            schema_errors.append(f"type attendu {node.expected_type} à {node.label}")
+        if node.enum_values and (not isinstance(value, str) or value not in node.enum_values):
+            schema_errors.append(
+                f"valeur hors enum à {node.label} (reçu={value!r}, attendu={node.enum_listing})"
+            )
+
+    walk(payload, root)
+    return sparse_errors, schema_errors
+
+
+def _validate_target_candidate(
+    payload: dict[str, Any],
+    schema_index: MasterSchemaIndex,
+    *,
+    dimensions: Any,
+    timings: StageTimings | None = None,
+) -> None:
+    # Same outcome as _validate_sparse_payload, _validate_business_coherence,
+    # _validate_target_payload_against_schema then _validate_topic_alignment (first
+    # failing check wins), with a single walk over the compiled schema. The walk
+    # covers the sparse and schema checks, hence one "validate_structure" lap.
+    timings = timings or StageTimings()
+    with timings.stage("validate_structure"):
+        sparse_errors, schema_errors = _walk_target_payload(payload, schema_index.validator)
+    _raise_error_preview("target généré non sparse: ", sparse_errors)
+    with timings.stage("validate_business"):
+        _validate_business_coherence(payload, dimensions=dimensions)
+    _raise_error_preview("target généré non conforme au schema.full: ", schema_errors)
+    if not isinstance(dimensions, dict):
+        return
+    primary_topic = str(dimensions.get("primary_topic") or "ordre_heritiers")
+    secondary_topic = dimensions.get("secondary_topic")
+    errors: list[str] = []
+    predicates = schema_index.topic_predicates
+    with timings.stage("validate_topic"):
+        if not predicates.get(primary_topic, _no_topic_paths)(payload):
+            errors.append(f"primary_topic={primary_topic} absent du TOON")
+        if isinstance(secondary_topic, str) and secondary_topic:
+            if not predicates.get(secondary_topic, _no_topic_paths)(payload):
+                errors.append(f"secondary_topic={secondary_topic} absent du TOON")
+    if errors:
+        raise ValueError("alignment topic/TOON invalide: " + "; ".join(errors))
+
+
 def _load_master_schema(path: Path) -> dict[str, Any]:
     if not path.exists():
         raise ValueError(f"master schema introuvable: {path}")
@@ -1306,17 +1758,23 @@ def _load_master_schema(path: Path) -> dict[str, Any]:
     return payload
 
 
-def _tokenize(text: str) -> set[str]:
+def _tokens_from_key(normalized_key: str) -> set[str]:
     return {
         token
-        for token in re.findall(r"[a-z0-9àâçéèêëîïôûùüÿñæœ]+", _normalize_key(text))
+        for token in re.findall(r"[a-z0-9àâçéèêëîïôûùüÿñæœ]+", normalized_key)
         if len(token) > 1
     }
 
 
+def _tokenize(text: str) -> set[str]:
+    return _tokens_from_key(_normalize_key(text))
+
+
 def _jaccard_similarity(left: str, right: str) -> float:
-    left_tokens = _tokenize(left)
-    right_tokens = _tokenize(right)
+    return _jaccard_from_tokens(_tokenize(left), _tokenize(right))
+
+
+def _jaccard_from_tokens(left_tokens: set[str], right_tokens: set[str]) -> float:
     if not left_tokens or not right_tokens:
         return 0.0
     intersection = len(left_tokens & right_tokens)
@@ -1328,7 +1786,7 @@ def _jaccard_similarity(left: str, right: str) -> float:
 
 def _load_seed_cases(path: Path) -> list[CorpusSeed]:
     seeds: list[CorpusSeed] = []
-    for row in _load_jsonl(path):
+    for row in load_jsonl(path):
         text = row.get("text")
         if not isinstance(text, str):
             continue
@@ -1343,6 +1801,35 @@ def _load_seed_cases(path: Path) -> list[CorpusSeed]:
     return seeds
 
 
+def _file_stamp(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _build_seed_index(path: Path) -> SeedIndex:
+    stamp = _file_stamp(path)
+    seeds = _load_seed_cases(path)
+    normalized_texts = [_normalize_key(seed.text) for seed in seeds]
+    seeds_by_topic: dict[str, tuple[int, ...]] = {}
+    for topic, template in TOPIC_TEMPLATES.items():
+        keywords = [_normalize_key(word) for word in template["keywords"]]
+        seeds_by_topic[topic] = tuple(
+            idx
+            for idx, seed_key in enumerate(normalized_texts)
+            if any(keyword in seed_key for keyword in keywords)
+        )
+    return SeedIndex(
+        source_file=path,
+        source_stamp=stamp,
+        seeds=seeds,
+        normalized_texts=normalized_texts,
+        seeds_by_topic=seeds_by_topic,
+    )
+
+
 def _pick_underrepresented(
     targets: dict[str, float],
     counts: dict[str, int],
@@ -1376,18 +1863,44 @@ class InstructionServerApp:
         target_total_cases: int,
         generation_target: int | None,
         seed: int,
+        toon_backend: str = TOON_BACKEND_PYTHON,
+        write_behind: bool = True,
+        summary_interval_ms: int = DEFAULT_SUMMARY_INTERVAL_MS,
+        prefill_depth: int = DEFAULT_PREFILL_DEPTH,
+        prefill_topic_depth: int = DEFAULT_PREFILL_TOPIC_DEPTH,
+        prefill_workers: int = DEFAULT_PREFILL_WORKERS,
+        target_workers: int = 0,
+        state_backend: str = STATE_BACKEND_JSONL,
+        snapshot_interval_s: float = DEFAULT_SNAPSHOT_INTERVAL_S,
+        trace_sample_rate: float = 0.0,
+        trace_slow_ms: float = 0.0,
     ) -> None:
-        self.lock = threading.Lock()
+        started_at = time.perf_counter()
+        self.metrics = _build_server_metrics()
+        self.lock = TimedLock(self.metrics.lock_wait_seconds, "state")
+        self.issue_lock = TimedLock(self.metrics.lock_wait_seconds, "issue")
+        self.decoded_lock = TimedLock(self.metrics.lock_wait_seconds, "decoded")
+        self.pending_submissions: set[str] = set()
+        self.generation_stats = TargetGenerationStats()
+        self.toon_backend = toon_backend
+        self.decoded_targets: OrderedDict[str, Any] = OrderedDict()
+        self.export_sizes: dict[Path, int] = {}
+        self.export_submitted = 0
+        self.summary_interval_s = max(0, summary_interval_ms) / 1000
         self.state_dir = state_dir
         self.state_dir.mkdir(parents=True, exist_ok=True)
-        self.instructions_dir = self.state_dir / "instructions"
-        self.submissions_dir = self.state_dir / "submissions"
-        self.instructions_dir.mkdir(parents=True, exist_ok=True)
-        self.submissions_dir.mkdir(parents=True, exist_ok=True)
+        self.profiler = RequestProfiler(self.state_dir / PROFILES_DIRNAME)
+        self.store = open_state_store(self.state_dir, state_backend, counted_dimensions=COUNTED_DIMENSIONS)
+        self.snapshot_path = self.state_dir / SNAPSHOT_FILENAME
+        self.snapshot_interval_s = snapshot_interval_s
+        self.tracer = Tracer(
+            self.state_dir / TRACE_FILENAME,
+            sample_rate=trace_sample_rate,
+            slow_ms=trace_slow_ms,
+        )
+        self.snapshot_taken_at = time.monotonic()
 
         self.config_path = self.state_dir / CONFIG_FILENAME
-        self.issued_path = self.state_dir / ISSUED_FILENAME
-        self.submitted_path = self.state_dir / SUBMITTED_FILENAME
         self.summary_json_path = self.state_dir / SUMMARY_JSON_FILENAME
         self.summary_md_path = self.state_dir / SUMMARY_MD_FILENAME
         self.generated_train_path = self.state_dir / GENERATED_TRAIN_FILENAME
@@ -1396,9 +1909,11 @@ class InstructionServerApp:
         self.master_schema_file = master_schema_file
         self.master_schema = _load_master_schema(master_schema_file)
         self.master_schema_index = _build_master_schema_index(self.master_schema)
+        self.leaf_generators = self._compile_leaf_generators()
         self.faker = Faker("fr_FR") if Faker is not None else None
 
-        self.seed_cases = _load_seed_cases(corpus_file)
+        self.seed_index = _build_seed_index(corpus_file)
+        self.seed_cases = self.seed_index.seeds
         self.config = self._load_or_create_config(
             target_total_cases=target_total_cases,
             generation_target=generation_target,
@@ -1406,107 +1921,65 @@ class InstructionServerApp:
             corpus_file=corpus_file,
         )
         if str(corpus_file) != str(self.config["corpus_file"]):
-            self.seed_cases = _load_seed_cases(Path(self.config["corpus_file"]))
-        self.issued = _load_jsonl(self.issued_path)
-        self.submitted = _load_jsonl(self.submitted_path)
-        self._sanitize_legacy_state()
-        self._refresh_training_exports()
+            self.seed_index = _build_seed_index(Path(self.config["corpus_file"]))
+            self.seed_cases = self.seed_index.seeds
+        # Legacy rewrites run once per state directory (see state_migrations), not at
+        # every startup.
+        self.migrations = migrate_state(self.store)
+        snapshot = self._usable_snapshot()
+        if snapshot is not None:
+            replayed = self._restore_from_snapshot(snapshot)
+        else:
+            self._load_full_state()
+            replayed = len(self.issued) + len(self.submitted)
         self._refresh_summary()
-
-    def _sanitize_legacy_state(self) -> None:
-        issued_changed = False
-        sanitized_issued: list[dict[str, Any]] = []
-        for row in self.issued:
-            if not isinstance(row, dict):
-                issued_changed = True
-                continue
-            updated = dict(row)
-
-            response_format = updated.get("response_format")
-            if isinstance(response_format, dict):
-                rf = dict(response_format)
-                required_keys = rf.get("required_keys")
-                if isinstance(required_keys, list) and "target_json" in required_keys:
-                    rf["required_keys"] = [
-                        "target_toon" if key == "target_json" else key
-                        for key in required_keys
-                    ]
-                    issued_changed = True
-                if "target_json_rule" in rf:
-                    toon_rule = rf.pop("target_json_rule")
-                    if "target_toon_rule" not in rf and isinstance(toon_rule, str):
-                        rf["target_toon_rule"] = toon_rule.replace("JSON", "TOON")
-                    issued_changed = True
-                updated["response_format"] = rf
-
-            submission_contract = updated.get("submission_contract")
-            if isinstance(submission_contract, dict):
-                sc = dict(submission_contract)
-                required_fields = sc.get("required_fields")
-                if isinstance(required_fields, list) and "target_json" in required_fields:
-                    sc["required_fields"] = [
-                        "target_toon" if key == "target_json" else key
-                        for key in required_fields
-                    ]
-                    issued_changed = True
-                if "target_json_rule" in sc:
-                    toon_rule = sc.pop("target_json_rule")
-                    if "target_toon_rule" not in sc and isinstance(toon_rule, str):
-                        sc["target_toon_rule"] = toon_rule.replace("JSON", "TOON")
-                    issued_changed = True
-                updated["submission_contract"] = sc
-
-            prompt = updated.get("prompt")
-            if isinstance(prompt, str) and "target_json" in prompt:
-                updated["prompt"] = prompt.replace("target_json", "target_toon").replace(
-                    "JSON cible rempli",
-                    "TOON cible valide",
-                )
-                issued_changed = True
-
-            sanitized_issued.append(updated)
-        self.issued = sanitized_issued
-        if issued_changed:
-            _rewrite_jsonl(self.issued_path, self.issued)
-
-        submitted_changed = False
-        sanitized_submitted: list[dict[str, Any]] = []
-        for row in self.submitted:
-            if not isinstance(row, dict):
-                submitted_changed = True
-                continue
-            updated = dict(row)
-            if "target_json" in updated:
-                updated.pop("target_json", None)
-                submitted_changed = True
-            target_toon = updated.get("target_toon")
-            if not isinstance(target_toon, str):
-                submitted_changed = True
-                continue
-            cleaned = "\n".join(
-                line.rstrip()
-                for line in target_toon.replace("\r\n", "\n").replace("\r", "\n").strip("\n").splitlines()
+        # Journals stay the synchronous source of truth; everything derived from them
+        # (summaries, archived records, training exports, the state snapshot) is written behind.
+        self.writer = WriteBehindWorker(name="instruction-writer", synchronous=not write_behind)
+        self.target_workers = target_workers
+        self.target_executor: ProcessPoolExecutor | None = None
+        if target_workers > 0:
+            # Each process compiles its own MasterSchemaIndex once (see _init_target_worker).
+            self.target_executor = ProcessPoolExecutor(
+                max_workers=target_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_target_worker,
+                initargs=(self.master_schema_file, int(self.config["seed"]), self.toon_backend),
             )
-            if not cleaned:
-                submitted_changed = True
-                continue
-            if cleaned != target_toon:
-                updated["target_toon"] = cleaned
-                submitted_changed = True
-            sanitized_submitted.append(updated)
-        self.submitted = sanitized_submitted
-        if submitted_changed:
-            _rewrite_jsonl(self.submitted_path, self.submitted)
-
-        legacy_instruction_file = self.state_dir / "_last_instruction.json"
-        if legacy_instruction_file.exists():
-            try:
-                payload = json.loads(legacy_instruction_file.read_text(encoding="utf-8"))
-                if isinstance(payload, dict) and "target_json" in json.dumps(payload, ensure_ascii=False):
-                    legacy_instruction_file.unlink(missing_ok=True)
-            except Exception:
-                # Keep startup robust even if this legacy file is malformed.
-                legacy_instruction_file.unlink(missing_ok=True)
+        self.pool: InstructionPool | None = None
+        if prefill_depth > 0:
+            # One prefill thread per target process, and enough depth to keep them all busy.
+            self.pool = InstructionPool(
+                depth=max(prefill_depth, target_workers),
+                topic_depth=prefill_topic_depth,
+                workers=max(prefill_workers, target_workers),
+                reserve=self._prefill_reserve,
+                generate=self._prefill_generate,
+            )
+            self.pool.rebase(self._prefill_cursor())
+        if snapshot is None:
+            # The next restart only replays what is appended from now on.
+            self._write_snapshot(self._snapshot_state())
+        self.startup = {
+            "mode": "snapshot" if snapshot is not None else "full_scan",
+            "replayed_rows": replayed,
+            "archive_recovered": self.archive_recovered,
+            "seconds": round(time.perf_counter() - started_at, 3),
+        }
+
+    def close(self) -> None:
+        # A running profiling session still gets its files written.
+        self.profiler.stop()
+        if self.pool is not None:
+            self.pool.close()
+        if self.target_executor is not None:
+            self.target_executor.shutdown(wait=True, cancel_futures=True)
+        self.writer.close()
+        self.tracer.close()
+        with self.lock:
+            state = self._snapshot_state()
+        self._write_snapshot(state)
+        self.store.close()
 
     def _collect_mandatory_elements(self, dimensions: dict[str, str | None]) -> list[str]:
         primary_topic = str(dimensions["primary_topic"])
@@ -1768,73 +2241,304 @@ class InstructionServerApp:
             "issued": len(self.issued),
             "submitted": len(self.submitted),
             "training_cases_current": len(self.submitted),
+            "write_behind": self.writer.stats(),
+            "prefill": self.pool.stats() if self.pool is not None else None,
+            "target_workers": self.target_workers,
+            "state_backend": self.store.backend,
+            "startup": self.startup,
+            "tracing": self.tracer.stats(),
         }
 
     def dashboard(self) -> dict[str, Any]:
-        if self.summary_json_path.exists():
-            return json.loads(self.summary_json_path.read_text(encoding="utf-8"))
-        return self._coverage_snapshot()
+        # summary.json may lag by up to summary_interval_ms: answer from memory.
+        return {**self.coverage, "target_generation": self.generation_stats.snapshot()}
+
+    def leaf_generator_table(self) -> dict[str, Any]:
+        # Which generator each schema leaf resolved to (see _compile_leaf_generator).
+        leaves = {".".join(path): generator.name for path, generator in self.leaf_generators.items()}
+        counts: dict[str, int] = {}
+        for name in leaves.values():
+            counts[name] = counts.get(name, 0) + 1
+        return {"leaves": leaves, "generators": dict(sorted(counts.items()))}
+
+    def profile(self, payload: dict[str, Any]) -> dict[str, Any]:
+        # Admin: profiles the next `requests` requests or `seconds` (see profiler.py) and
+        # answers right away; the report lands in GET /admin/profile. With `wait` true the
+        # answer waits for the report, at most MAX_PROFILE_WAIT_SECONDS, so an HTTP worker
+        # is never held for a whole window. `stop` ends the running session.
+        if payload.get("stop"):
+            return {"profile": self.profiler.stop()}
+        try:
+            requests = int(payload["requests"]) if payload.get("requests") is not None else None
+            seconds = float(payload["seconds"]) if payload.get("seconds") is not None else None
+            interval_ms = float(payload.get("interval_ms") or DEFAULT_SAMPLE_INTERVAL_MS)
+            top = int(payload.get("top") or DEFAULT_PROFILE_TOP)
+        except (TypeError, ValueError):
+            raise ValueError("requests, seconds, interval_ms et top doivent être numériques") from None
+        session = self.profiler.start(
+            mode=str(payload.get("mode") or PROFILE_MODE_CPROFILE),
+            requests=requests,
+            seconds=seconds,
+            interval_ms=interval_ms,
+            top=top,
+        )
+        if payload.get("wait") is not True:
+            return {"profile": session.progress()}
+        if not session.finished.wait(MAX_PROFILE_WAIT_SECONDS):
+            return {"profile": session.progress()}
+        return {"profile": session.report}
+
+    def instruction_record(self, instruction_id: str) -> dict[str, Any] | None:
+        # Same payload as the archived record, answered from the journals (the archive
+        # is written behind and may lag).
+        with self.lock:
+            instruction = self._find_instruction(instruction_id)
+            position = self.submitted_positions.get(instruction_id)
+            submission = self.submitted[position] if position is not None else None
+        if instruction is None:
+            return None
+        return instruction_record(instruction, submission)
 
     def next_instruction(self, payload: dict[str, Any]) -> dict[str, Any]:
         agent_id = str(payload.get("agent_id") or "").strip() or None
         force_topic = str(payload.get("topic") or "").strip() or None
 
-        with self.lock:
-            generation_target = int(self.config.get("generation_target") or 0)
-            if generation_target and len(self.submitted) >= generation_target:
-                return {
-                    "done": True,
-                    "message": "generation_target reached",
-                    "coverage": self._coverage_snapshot(),
-                }
+        if self._generation_target_reached():
+            return {
+                "done": True,
+                "message": "generation_target reached",
+                "coverage": self.coverage,
+            }
 
-            instruction = self._build_instruction(agent_id=agent_id, force_topic=force_topic)
-            sequence = len(self.issued) + 1
-            target_payload: dict[str, Any] | None = None
-            last_error: Exception | None = None
-            for attempt in range(1, 51):
-                rng = random.Random(int(self.config["seed"]) * 1000 + sequence * 100 + attempt)
+        issued, error, coverage = self._issue_instructions(agent_id=agent_id, force_topic=force_topic, count=1)
+        if error is not None:
+            raise error
+        return {
+            "instruction": self._public_instruction(issued[0]),
+            "coverage": coverage,
+        }
+
+    def next_instructions(self, payload: dict[str, Any]) -> dict[str, Any]:
+        agent_id = str(payload.get("agent_id") or "").strip() or None
+        force_topic = str(payload.get("topic") or "").strip() or None
+        count = _parse_count(payload.get("count"))
+        if count < 1 or count > MAX_BATCH_SIZE:
+            raise ValueError(f"count doit être compris entre 1 et {MAX_BATCH_SIZE}")
+
+        if self._generation_target_reached():
+            return {
+                "done": True,
+                "message": "generation_target reached",
+                "instructions": [],
+                "errors": [],
+                "coverage": self.coverage,
+            }
+
+        issued, error, coverage = self._issue_instructions(agent_id=agent_id, force_topic=force_topic, count=count)
+        if error is not None and not issued:
+            raise error
+        # Sequences are consecutive, so a failure ends the batch: the remaining slots
+        # are reported with the same error.
+        errors = [
+            {"index": index, "error": str(error)}
+            for index in range(len(issued), count)
+        ] if error is not None else []
+        return {
+            "instructions": [self._public_instruction(instruction) for instruction in issued],
+            "errors": errors,
+            "coverage": coverage,
+        }
+
+    def _generation_target_reached(self) -> bool:
+        generation_target = int(self.config.get("generation_target") or 0)
+        return bool(generation_target and len(self.submitted) >= generation_target)
+
+    def _issue_instructions(
+        self,
+        *,
+        agent_id: str | None,
+        force_topic: str | None,
+        count: int,
+    ) -> tuple[list[dict[str, Any]], Exception | None, dict[str, Any]]:
+        # issue_lock keeps INS-xxxx allocation strictly sequential (sequence N is built
+        # from the state after N-1); the state lock is only held to read the cursor and
+        # to commit, so submissions are never stuck behind target generation. A batch
+        # walks the same cursor chain as `count` single calls and commits once.
+        issued: list[dict[str, Any]] = []
+        error: Exception | None = None
+        with self.issue_lock:
+            with self.lock:
+                cursor = self._issue_cursor()
+            lane = force_topic if force_topic in TOPIC_TARGETS else None
+            last_prefilled = False
+            for _ in range(count):
                 try:
-                    candidate = self._build_target_payload_for_instruction(instruction, rng)
-                    _validate_sparse_payload(candidate)
-                    _validate_business_coherence(candidate, dimensions=instruction.get("dimensions", {}))
-                    _validate_target_payload_against_schema(candidate, self.master_schema_index)
-                    dims = instruction.get("dimensions", {})
-                    if isinstance(dims, dict):
-                        _validate_topic_alignment(
-                            candidate,
-                            primary_topic=str(dims.get("primary_topic") or "ordre_heritiers"),
-                            secondary_topic=(
-                                str(dims.get("secondary_topic"))
-                                if isinstance(dims.get("secondary_topic"), str) and dims.get("secondary_topic")
-                                else None
-                            ),
+                    prefilled = None
+                    if self.pool is not None:
+                        take_args: dict[str, Any] = {}
+                        with span("prefill_take", take_args):
+                            prefilled = self.pool.take(lane, cursor)
+                            if prefilled is not None:
+                                self._trace_prefilled(prefilled, take_args)
+                    if prefilled is not None:
+                        if prefilled.error is not None:
+                            raise prefilled.error
+                        instruction = prefilled.instruction
+                        instruction["agent_id"] = agent_id
+                        instruction["issued_at"] = _utc_now()
+                        server_target_toon, decoded_target = prefilled.target
+                    else:
+                        instruction = self._build_instruction(
+                            agent_id=agent_id,
+                            force_topic=force_topic,
+                            cursor=cursor,
                         )
-                    target_payload = candidate
-                    break
+                        (server_target_toon, decoded_target), _ = self._target_for(instruction, cursor.sequence)
                 except Exception as exc:
-                    last_error = exc
-            if target_payload is None:
-                message = str(last_error) if last_error else "unknown generation error"
-                raise ValueError(f"échec génération target schema-driven: {message}")
-            instruction["server_target_toon"] = _encode_json_to_toon(target_payload)
-            self.issued.append(instruction)
-            _append_jsonl(self.issued_path, instruction)
-            self._write_instruction_file(instruction)
-            self._refresh_summary()
-            server_target_toon = str(instruction.get("server_target_toon") or "").strip()
-            public_instruction = {
-                "instruction_id": instruction.get("instruction_id"),
-                "target_toon": server_target_toon,
-                "prompt": self._augment_prompt_with_target_toon(
-                    str(instruction.get("prompt") or ""),
-                    server_target_toon,
-                ),
-            }
-            return {
-                "instruction": public_instruction,
-                "coverage": self._coverage_snapshot(),
-            }
+                    error = exc
+                    last_prefilled = False
+                    break
+                instruction["server_target_toon"] = server_target_toon
+                instruction["server_target_sha256"] = _toon_sha256(server_target_toon)
+                self._remember_decoded_target(instruction["server_target_sha256"], decoded_target)
+                issued.append(instruction)
+                last_prefilled = prefilled is not None
+                cursor = cursor.advanced(instruction)
+
+            if not issued:
+                return issued, error, self.coverage
+            with self.lock:
+                with self.metrics.stage_seconds.time(("journal_append",)), span(
+                    "journal_append", {"journal": JOURNAL_ISSUED}, cat="write"
+                ):
+                    refs, journal_cursor = self.store.append(JOURNAL_ISSUED, issued)
+                for ref, instruction in zip(refs, issued):
+                    self._record_issued(ref, instruction)
+                self.issued.cursor = journal_cursor
+                coverage = self._publish_coverage()
+                for instruction in issued:
+                    self._schedule_instruction_record(instruction)
+                self._schedule_summary(coverage)
+                self._schedule_snapshot()
+                next_cursor = self._prefill_cursor() if self.pool is not None else None
+            if self.pool is not None:
+                # The consumed lane is still aligned only if its head served the last item.
+                self.pool.rebase(
+                    next_cursor,
+                    consumed=(lane or DEFAULT_LANE) if last_prefilled else None,
+                )
+        return issued, error, coverage
+
+    def _public_instruction(self, instruction: dict[str, Any]) -> dict[str, Any]:
+        server_target_toon = str(instruction.get("server_target_toon") or "").strip()
+        return {
+            "instruction_id": instruction.get("instruction_id"),
+            "target_toon": server_target_toon,
+            "prompt": self._augment_prompt_with_target_toon(
+                str(instruction.get("prompt") or ""),
+                server_target_toon,
+            ),
+        }
+
+    def _target_for(self, instruction: dict[str, Any], sequence: int) -> tuple[tuple[str, Any], TargetGeneration]:
+        dimensions = instruction.get("dimensions")
+        started = time.perf_counter()
+        try:
+            if self.target_executor is None:
+                target_toon, decoded_target, rejections, laps = self._generate_target(instruction, sequence)
+            else:
+                target_toon, decoded_target, rejections, laps = self.target_executor.submit(
+                    _generate_target_in_worker, instruction, sequence
+                ).result()
+        except TargetGenerationError as exc:
+            self.generation_stats.record(dimensions, exc.rejections, failed=True)
+            exc.generation = TargetGeneration(started, exc.rejections, exc.laps)
+            self._record_laps(exc.generation)
+            raise
+        self.generation_stats.record(dimensions, rejections)
+        generation = TargetGeneration(started, rejections, laps)
+        self._record_laps(generation)
+        return (target_toon, decoded_target), generation
+
+    def _record_laps(self, generation: TargetGeneration) -> None:
+        for stage, _, seconds in generation.laps:
+            self.metrics.stage_seconds.observe(seconds, (stage,))
+        self._trace_generation(generation)
+
+    def _trace_prefilled(self, slot: PrefillSlot, take_args: dict[str, Any]) -> None:
+        # The target was built on a prefill thread, outside any request: its attempts are
+        # added to the issuing request's trace, at the time they ran, marked prefilled.
+        generation = slot.generation if slot.error is None else getattr(slot.error, "generation", None)
+        if generation is None or current_trace() is None:
+            return
+        take_args["attempts"] = self._trace_generation(generation, prefilled=True)
+        take_args["rejections"] = len(generation.rejections)
+        if generation.rejections:
+            take_args["last_rejection"] = generation.rejections[-1]
+
+    def _trace_generation(self, generation: TargetGeneration, *, prefilled: bool = False) -> int:
+        # Returns the number of attempts (0 outside a traced request).
+        trace = current_trace()
+        if trace is None:
+            return 0
+        # Laps are offsets from the start of the generation (maybe in another process):
+        # they are placed from the call start. Each target_build opens an attempt.
+        started = generation.started
+        marker = {"prefilled": True} if prefilled else None
+        attempts: list[list[float]] = []
+        for stage, offset, seconds in generation.laps:
+            trace.add(stage, started + offset, seconds, marker, cat="target")
+            if stage == "target_build":
+                attempts.append([started + offset, started + offset + seconds])
+            elif stage != "toon_encode" and attempts:
+                attempts[-1][1] = started + offset + seconds
+        for index, (attempt_start, attempt_end) in enumerate(attempts):
+            args: dict[str, Any] = {"attempt": index + 1, "attempts": len(attempts)}
+            if index < len(generation.rejections):
+                args["rejection"] = generation.rejections[index]
+            if prefilled:
+                args["prefilled"] = True
+            trace.add("target_attempt", attempt_start, attempt_end - attempt_start, args, cat="target")
+        return len(attempts)
+
+    def _generate_target(
+        self,
+        instruction: dict[str, Any],
+        sequence: int,
+    ) -> tuple[str, Any, list[str], list[tuple[str, float, float]]]:
+        # Pure function of (instruction, sequence): runs inline, on the prefill threads
+        # or in a --target-workers process. Also returns the reason of every rejected
+        # attempt, for TargetGenerationStats, and the stage laps, for /metrics.
+        target_payload: dict[str, Any] | None = None
+        last_error: Exception | None = None
+        rejections: list[str] = []
+        timings = StageTimings()
+        for attempt in range(1, MAX_TARGET_ATTEMPTS + 1):
+            rng = random.Random(int(self.config["seed"]) * 1000 + sequence * 100 + attempt)
+            try:
+                with timings.stage("target_build"):
+                    candidate = self._build_target_payload_for_instruction(instruction, rng)
+                _validate_target_candidate(
+                    candidate,
+                    self.master_schema_index,
+                    dimensions=instruction.get("dimensions", {}),
+                    timings=timings,
+                )
+                target_payload = candidate
+                break
+            except Exception as exc:
+                last_error = exc
+                rejections.append(_rejection_reason(exc))
+        if target_payload is None:
+            message = str(last_error) if last_error else "unknown generation error"
+            raise TargetGenerationError(
+                f"échec génération target schema-driven: {message}",
+                rejections,
+                timings.laps,
+            )
+        with timings.stage("toon_encode"):
+            target_toon, decoded_target = _encode_json_to_toon(target_payload, backend=self.toon_backend)
+        return target_toon, decoded_target, rejections, timings.laps
 
     def _synth_name(self, rng: random.Random, used: set[str]) -> str:
         if self.faker is not None:
@@ -1888,11 +2592,6 @@ class InstructionServerApp:
                 paths.add(path)
         return paths
 
-    def _path_matches_prefix(self, path: tuple[str, ...], prefix: tuple[str, ...]) -> bool:
-        if len(path) < len(prefix):
-            return False
-        return path[: len(prefix)] == prefix
-
     def _set_path_value(self, payload: dict[str, Any], path: tuple[str, ...], value: Any) -> None:
         node: Any = payload
         for idx, token in enumerate(path):
@@ -1936,91 +2635,108 @@ class InstructionServerApp:
     def _path_contains(self, path: tuple[str, ...], token: str) -> bool:
         return token in path
 
-    def _known_name_for_path(
-        self,
-        path: tuple[str, ...],
-        *,
-        rng: random.Random,
-        context: dict[str, Any],
-    ) -> str:
-        defunt_name = str(context["defunt_name"])
-        partner_name = str(context["partner_name"])
-        child_names = list(context["child_names"])
-        used_names = context["used_names"]
+    def _compile_leaf_generators(self) -> dict[tuple[str, ...], LeafGenerator]:
+        return {
+            path: self._compile_leaf_generator(path, spec)
+            for path, spec in self.master_schema_index.leaf_specs.items()
+            if isinstance(spec, dict)
+        }
+
+    def _name_generator(self, path: tuple[str, ...]) -> LeafGenerator:
+        # Names already in the story (défunt, partenaire, enfants) are reused by path.
         if self._path_contains(path, "defunt"):
-            return defunt_name
+            return LeafGenerator("nom_defunt", lambda rng, context: str(context["defunt_name"]))
         if self._path_contains(path, "partenaire"):
-            return partner_name
+            return LeafGenerator("nom_partenaire", lambda rng, context: str(context["partner_name"]))
         if self._path_contains(path, "enfants"):
-            return child_names[0]
+            return LeafGenerator("nom_enfant", lambda rng, context: list(context["child_names"])[0])
         if self._path_contains(path, "petits_enfants"):
-            return child_names[1]
+            return LeafGenerator("nom_petit_enfant", lambda rng, context: list(context["child_names"])[1])
         if self._path_contains(path, "beneficiaires") or self._path_contains(path, "beneficiaire"):
-            pool = [partner_name, child_names[0], child_names[1], defunt_name]
-            return rng.choice(pool)
-        return self._synth_name(rng, used_names)
-
-    def _generate_leaf_value(
-        self,
-        path: tuple[str, ...],
-        spec: dict[str, Any],
-        *,
-        rng: random.Random,
-        context: dict[str, Any],
-    ) -> Any:
+            def beneficiary_name(rng: random.Random, context: dict[str, Any]) -> str:
+                child_names = list(context["child_names"])
+                pool = [str(context["partner_name"]), child_names[0], child_names[1], str(context["defunt_name"])]
+                return rng.choice(pool)
+
+            return LeafGenerator("nom_beneficiaire", beneficiary_name)
+        return LeafGenerator("nom_synthetique", lambda rng, context: self._synth_name(rng, context["used_names"]))
+
+    def _compile_leaf_generator(self, path: tuple[str, ...], spec: dict[str, Any]) -> LeafGenerator:
+        # Resolves once per schema leaf what the value generation used to decide at every
+        # call (enum, type, key/path substrings); the returned callables draw from the
+        # RNG exactly as before, so targets are unchanged for a given seed.
         key = self._leaf_key(path)
         enum_values = _enum_values_from_schema_leaf(spec)
         if enum_values:
             if key == "statut_matrimonial":
-                statut = str(context["statut_matrimonial"])
-                if statut in enum_values:
-                    return statut
+                def statut_value(rng: random.Random, context: dict[str, Any]) -> str:
+                    statut = str(context["statut_matrimonial"])
+                    return statut if statut in enum_values else rng.choice(enum_values)
+
+                return LeafGenerator("enum_statut_matrimonial", statut_value)
             if key == "type" and self._path_contains(path, "lien"):
-                statut = str(context["statut_matrimonial"])
-                if statut == "MARIE" and "CONJOINT" in enum_values:
-                    return "CONJOINT"
-                if statut == "PACSE" and "PARTENAIRE_PACS" in enum_values:
-                    return "PARTENAIRE_PACS"
-                if "CONCUBIN" in enum_values:
-                    return "CONCUBIN"
-            return rng.choice(enum_values)
+                # Any link but the conjugal ones, which the business check rejects
+                # without a marriage or PACS.
+                non_conjugal = [value for value in enum_values if value not in {"CONJOINT", "PARTENAIRE_PACS"}]
+
+                def link_value(rng: random.Random, context: dict[str, Any]) -> str:
+                    statut = str(context["statut_matrimonial"])
+                    if statut == "MARIE" and "CONJOINT" in enum_values:
+                        return "CONJOINT"
+                    if statut == "PACSE" and "PARTENAIRE_PACS" in enum_values:
+                        return "PARTENAIRE_PACS"
+                    if "CONCUBIN" in enum_values:
+                        return "CONCUBIN"
+                    if non_conjugal and statut not in {"MARIE", "PACSE"}:
+                        return rng.choice(non_conjugal)
+                    return rng.choice(enum_values)
+
+                return LeafGenerator("enum_lien_type", link_value)
+            return LeafGenerator("enum", lambda rng, context: rng.choice(enum_values))
 
         expected_type = _leaf_expected_type(spec)
         if expected_type == "boolean":
             if key == "existe":
-                return True if rng.random() < 0.78 else False
-            return bool(rng.random() < 0.55)
+                return LeafGenerator("bool_existe", lambda rng, context: True if rng.random() < 0.78 else False)
+            return LeafGenerator("bool", lambda rng, context: bool(rng.random() < 0.55))
 
         if expected_type == "number":
             key_norm = key.lower()
             path_norm = "/".join(path).lower()
+
+            def randint(name: str, low: int, high: int) -> LeafGenerator:
+                return LeafGenerator(name, lambda rng, context: rng.randint(low, high))
+
+            def uniform(name: str, low: float, high: float) -> LeafGenerator:
+                return LeafGenerator(name, lambda rng, context: round(rng.uniform(low, high), 2))
+
             if "age" in key_norm:
                 if self._path_contains(path, "defunt"):
-                    return rng.randint(55, 94)
-                return rng.randint(18, 92)
+                    return randint("age_defunt", 55, 94)
+                return randint("age", 18, 92)
             if "esperance_de_vie" in key_norm:
-                return rng.randint(5, 40)
+                return randint("esperance_de_vie", 5, 40)
             if "quote" in key_norm or "quotite" in key_norm or "part" in key_norm:
-                return round(rng.uniform(0.1, 1.0), 2)
+                return uniform("quote_part", 0.1, 1.0)
             if "taux" in key_norm or "decote" in key_norm:
-                return round(rng.uniform(0.01, 0.15), 2)
+                return uniform("taux", 0.01, 0.15)
             if "duree" in key_norm or "anciennete" in key_norm:
-                return rng.randint(1, 25)
+                return randint("duree", 1, 25)
             # Many duration blocks are `{ valeur, unite }` where the leaf key is just `valeur`.
             if key_norm == "valeur" and ("duree" in path_norm or "anciennete" in path_norm or "soins" in path_norm):
-                return rng.randint(1, 36)
+                return randint("valeur_duree", 1, 36)
             if "mois" in key_norm:
-                return rng.randint(1, 48)
+                return randint("mois", 1, 48)
             if "patrimoine_" in key_norm or "patrimoine" in key_norm:
-                return int(rng.randint(50_000, 5_000_000))
+                return randint("patrimoine", 50_000, 5_000_000)
             if "montant_mensuel" in key_norm and "indemnite_occupation" in path_norm:
-                return int(rng.randint(200, 5_000))
+                return randint("indemnite_occupation", 200, 5_000)
             if "revenus_mensuels" in key_norm or "charges_mensuelles" in key_norm:
-                return int(rng.randint(500, 15_000))
+                return randint("revenus_charges_mensuels", 500, 15_000)
             if "loyers_encaisses" in key_norm or "charges_reglees" in key_norm:
-                return int(rng.randint(0, 250_000))
+                return randint("loyers_charges", 0, 250_000)
             if "valeurs" in path_norm:
-                return int(rng.randint(1_000, 900_000))
+                return randint("valeurs", 1_000, 900_000)
             if (
                 "valeur" in key_norm
                 or "montant" in key_norm
@@ -2030,58 +2746,72 @@ class InstructionServerApp:
                 or "revenus" in key_norm
                 or "charges" in key_norm
             ):
-                return int(rng.randint(1_000, 900_000))
-            return int(rng.randint(1, 1000))
+                return randint("montant", 1_000, 900_000)
+            return randint("nombre", 1, 1000)
 
         # string
         key_norm = key.lower()
         if key_norm == "nom" or key_norm.endswith("_nom") or key_norm.endswith("_noms"):
-            return self._known_name_for_path(path, rng=rng, context=context)
-        if "date" in key_norm:
-            return self._random_iso_date(rng, 2005, 2026)
-        if key_norm in {"debut", "fin"} and self._path_contains(path, "periode"):
-            return self._random_iso_date(rng, 2005, 2026)
+            return self._name_generator(path)
+        if "date" in key_norm or (key_norm in {"debut", "fin"} and self._path_contains(path, "periode")):
+            return LeafGenerator("date", lambda rng, context: self._random_iso_date(rng, 2005, 2026))
         if "residence_fiscale" in key_norm:
-            return "France"
+            return LeafGenerator("residence_fiscale", lambda rng, context: "France")
         if "residence_habituelle" in key_norm:
-            return rng.choice(["France", "Belgique", "Espagne", "Suisse"])
+            return LeafGenerator(
+                "residence_habituelle",
+                lambda rng, context: rng.choice(["France", "Belgique", "Espagne", "Suisse"]),
+            )
         if "nationalite" in key_norm:
-            return rng.choice(["Française", "Belge", "Espagnole", "Suisse"])
+            return LeafGenerator(
+                "nationalite",
+                lambda rng, context: rng.choice(["Française", "Belge", "Espagnole", "Suisse"]),
+            )
         if "loi_designee" in key_norm or "loi_applicable" in key_norm:
-            return "Loi française"
+            return LeafGenerator("loi", lambda rng, context: "Loi française")
         if "libelle" in key_norm or "description" in key_norm:
             if self._path_contains(path, "actifs"):
-                return rng.choice(
+                return LeafGenerator(
+                    "libelle_actif",
+                    lambda rng, context: rng.choice(
+                        [
+                            f"Maison à {rng.choice(SYNTH_CITIES)}",
+                            f"Appartement à {rng.choice(SYNTH_CITIES)}",
+                            f"Terrain à {rng.choice(SYNTH_CITIES)}",
+                            f"Résidence secondaire à {rng.choice(SYNTH_CITIES)}",
+                            f"Compte bancaire (banque {rng.choice(['BNP', 'SG', 'CA', 'BP'])})",
+                            f"Parts {rng.choice(SYNTH_COMPANIES)}",
+                        ]
+                    ),
+                )
+            if self._path_contains(path, "passifs"):
+                return LeafGenerator(
+                    "libelle_passif",
+                    lambda rng, context: rng.choice(["Emprunt bancaire", "Impôt", "Facture prestataire"]),
+                )
+            if self._path_contains(path, "contrats") or "contrat_libelle" in key_norm:
+                return LeafGenerator("libelle_contrat", lambda rng, context: f"Contrat {rng.choice(SYNTH_INSURERS)}")
+            # Generic fallback for any other `libelle`/`description` leaf.
+            return LeafGenerator(
+                "libelle",
+                lambda rng, context: rng.choice(
                     [
                         f"Maison à {rng.choice(SYNTH_CITIES)}",
                         f"Appartement à {rng.choice(SYNTH_CITIES)}",
-                        f"Terrain à {rng.choice(SYNTH_CITIES)}",
-                        f"Résidence secondaire à {rng.choice(SYNTH_CITIES)}",
-                        f"Compte bancaire (banque {rng.choice(['BNP', 'SG', 'CA', 'BP'])})",
+                        f"Bien à {rng.choice(SYNTH_CITIES)}",
                         f"Parts {rng.choice(SYNTH_COMPANIES)}",
                     ]
-                )
-            if self._path_contains(path, "passifs"):
-                return rng.choice(["Emprunt bancaire", "Impôt", "Facture prestataire"])
-            if self._path_contains(path, "contrats"):
-                return f"Contrat {rng.choice(SYNTH_INSURERS)}"
-            if "contrat_libelle" in key_norm:
-                return f"Contrat {rng.choice(SYNTH_INSURERS)}"
-            # Generic fallback for any other `libelle`/`description` leaf.
-            return rng.choice(
-                [
-                    f"Maison à {rng.choice(SYNTH_CITIES)}",
-                    f"Appartement à {rng.choice(SYNTH_CITIES)}",
-                    f"Bien à {rng.choice(SYNTH_CITIES)}",
-                    f"Parts {rng.choice(SYNTH_COMPANIES)}",
-                ]
+                ),
             )
         if "localisation" in key_norm:
-            return rng.choice(SYNTH_CITIES)
+            return LeafGenerator("localisation", lambda rng, context: rng.choice(SYNTH_CITIES))
         if "creancier_nom" in key_norm:
-            return rng.choice(["Trésor Public", "Banque Populaire", "URSSAF", "EDF"])
+            return LeafGenerator(
+                "creancier",
+                lambda rng, context: rng.choice(["Trésor Public", "Banque Populaire", "URSSAF", "EDF"]),
+            )
         # Last resort: produce a concrete (but not too specific) string rather than a placeholder.
-        return rng.choice(SYNTH_CITIES)
+        return LeafGenerator("ville", lambda rng, context: rng.choice(SYNTH_CITIES))
 
     def _repair_business_integrity(
         self,
@@ -2113,12 +2843,14 @@ class InstructionServerApp:
             max_age: int,
             can_be_minor: bool = False,
         ) -> None:
+            if not can_be_minor:
+                min_age = max(min_age, 18)
             age = _int_between(person.get("age_au_deces"), default=default_age, min_value=min_age, max_value=max_age)
             birth = _birth_from_age(ref_date, age)
             person["age_au_deces"] = age
             person["date_naissance"] = birth.isoformat()
             if "est_mineur" in person:
-                person["est_mineur"] = bool(can_be_minor and age < 18)
+                person["est_mineur"] = age < 18
 
             option = person.get("option_successorale")
             est_decede = person.get("est_decede")
@@ -2148,8 +2880,13 @@ class InstructionServerApp:
 
         # Regime matrimonial coherence: only keep it when the case actually presents a marriage context.
         regime = defunt.get("regime_matrimonial")
+        # A topic that requires the regime keeps it whatever the status (forced topic
+        # with a PACS or concubin persona).
+        regime_required = any(
+            path[:3] == ("famille", "defunt", "regime_matrimonial") for path in context["required_paths"]
+        )
         if isinstance(regime, dict):
-            if statut in {"CELIBATAIRE", "PACSE", "DIVORCE"}:
+            if statut in {"CELIBATAIRE", "PACSE", "DIVORCE"} and not regime_required:
                 defunt.pop("regime_matrimonial", None)
                 regime = None
             else:
@@ -2195,7 +2932,14 @@ class InstructionServerApp:
                 lien = partenaire.get("lien")
                 if isinstance(lien, dict):
                     if lien.get("type") in {"CONJOINT", "PARTENAIRE_PACS"}:
-                        lien["type"] = "CONCUBIN"
+                        # CONCUBIN, or the first non-conjugal link the schema allows.
+                        link_spec = self.master_schema_index.leaf_specs.get(("famille", "partenaire", "lien", "type"))
+                        allowed = _enum_values_from_schema_leaf(link_spec) if isinstance(link_spec, dict) else []
+                        non_conjugal = [value for value in allowed if value not in {"CONJOINT", "PARTENAIRE_PACS"}]
+                        if "CONCUBIN" in allowed or not non_conjugal:
+                            lien["type"] = "CONCUBIN"
+                        else:
+                            lien["type"] = non_conjugal[0]
                 _harmonize_person(
                     partenaire,
                     ref_date=raw_death,
@@ -2377,8 +3121,18 @@ class InstructionServerApp:
                 first.setdefault("donateur_nom", context["defunt_name"])
                 first.setdefault("beneficiaire_nom", context["child_names"][0])
                 first.setdefault("type", "DONATION_SIMPLE")
-                if first.get("beneficiaire_nom") == first.get("donateur_nom"):
-                    first["beneficiaire_nom"] = context["child_names"][0]
+
+        liberalites = payload.get("liberalites")
+        donations = liberalites.get("donations") if isinstance(liberalites, dict) else None
+        if isinstance(donations, list):
+            for donation in donations:
+                if not isinstance(donation, dict):
+                    continue
+                donateur = donation.get("donateur_nom")
+                if isinstance(donateur, str) and donation.get("beneficiaire_nom") == donateur:
+                    donation["beneficiaire_nom"] = next(
+                        name for name in context["child_names"] if name != donateur
+                    )
 
         patrimoine = payload.get("patrimoine")
         if isinstance(patrimoine, dict):
@@ -2401,6 +3155,13 @@ class InstructionServerApp:
                         if valeur <= 0:
                             passif["valeur"] = abs(valeur) + 1
 
+        # Topic-required leaves dropped by the passes above are generated again, so
+        # the topic alignment check cannot fail on them.
+        for path in sorted(context["required_paths"]):
+            generator = self.leaf_generators.get(path)
+            if generator is not None and not _path_exists_in_payload(payload, path):
+                self._set_path_value(payload, path, generator.generate(rng, context))
+
     def _build_target_payload_for_instruction(
         self,
         instruction: dict[str, Any],
@@ -2456,10 +3217,11 @@ class InstructionServerApp:
             "child_names": child_names,
             "used_names": used_names,
             "statut_matrimonial": statut,
+            "required_paths": self._required_leaf_paths_for_dimensions(dimensions),
         }
 
         prefixes = self._topic_prefixes_for_dimensions(dimensions)
-        leaf_specs = self.master_schema_index.leaf_specs
+        leaf_generators = self.leaf_generators
 
         mandatory_paths: set[tuple[str, ...]] = {
             ("famille", "defunt", "nom"),
@@ -2505,15 +3267,14 @@ class InstructionServerApp:
             )
 
         selected_paths: set[tuple[str, ...]] = set(mandatory_paths)
-        selected_paths.update(self._required_leaf_paths_for_dimensions(dimensions))
-        for path in leaf_specs:
-            if any(self._path_matches_prefix(path, prefix) for prefix in prefixes):
-                if rng.random() <= include_proba:
-                    selected_paths.add(path)
+        selected_paths.update(context["required_paths"])
+        for path in self.master_schema_index.leaves_under(prefixes):
+            if rng.random() <= include_proba:
+                selected_paths.add(path)
         for extra_prefix in SPARSE_COVERAGE_PREFIXES:
             if rng.random() <= 0.16:
-                for path in leaf_specs:
-                    if self._path_matches_prefix(path, extra_prefix) and rng.random() <= 0.45:
+                for path in self.master_schema_index.leaves_under([extra_prefix]):
+                    if rng.random() <= 0.45:
                         selected_paths.add(path)
 
         payload: dict[str, Any] = {}
@@ -2521,11 +3282,10 @@ class InstructionServerApp:
         # Step 1: identities and core legal context
         stage1_paths = [p for p in selected_paths if p[:2] in {("famille", "defunt"), ("famille", "partenaire")}]
         for path in sorted(stage1_paths):
-            spec = leaf_specs.get(path)
-            if not isinstance(spec, dict):
+            generator = leaf_generators.get(path)
+            if generator is None:
                 continue
-            value = self._generate_leaf_value(path, spec, rng=rng, context=context)
-            self._set_path_value(payload, path, value)
+            self._set_path_value(payload, path, generator.generate(rng, context))
 
         # Step 2: thematic payload blocks
         stage2_paths = [p for p in selected_paths if p not in stage1_paths]
@@ -2540,11 +3300,10 @@ class InstructionServerApp:
         ]:
             root_paths = [p for p in stage2_paths if p and p[0] == root]
             for path in sorted(root_paths):
-                spec = leaf_specs.get(path)
-                if not isinstance(spec, dict):
+                generator = leaf_generators.get(path)
+                if generator is None:
                     continue
-                value = self._generate_leaf_value(path, spec, rng=rng, context=context)
-                self._set_path_value(payload, path, value)
+                self._set_path_value(payload, path, generator.generate(rng, context))
 
         # Step 3: repair and harmonize business invariants
         self._repair_business_integrity(
@@ -2557,6 +3316,137 @@ class InstructionServerApp:
         return payload
 
     def submit_case(self, payload: dict[str, Any]) -> dict[str, Any]:
+        instruction_id, case_text, agent_id = self._parse_submission(payload)
+
+        with self.lock:
+            instruction = self._reserve_submission(instruction_id)
+            near_duplicates = self.near_duplicates
+            reference_texts = self.reference_texts
+            indexed = len(near_duplicates)
+
+        # Validation runs outside the lock; the pending marker keeps two concurrent
+        # submissions of the same instruction from both being stored.
+        try:
+            record, target_toon = self._build_submission_record(
+                instruction,
+                case_text=case_text,
+                agent_id=agent_id,
+                near_duplicates=near_duplicates,
+                reference_texts=reference_texts,
+            )
+            with self.lock:
+                coverage = self._commit_submissions([(instruction, record)], since=(near_duplicates, indexed))
+        except BaseException:
+            with self.lock:
+                self.pending_submissions.discard(instruction_id)
+            raise
+        return {
+            "stored": True,
+            "validation": record["validation"],
+            "target_toon_lines": len(target_toon.splitlines()),
+            "coverage": coverage,
+        }
+
+    def submit_cases(self, payload: dict[str, Any]) -> dict[str, Any]:
+        cases = payload.get("cases")
+        if not isinstance(cases, list) or not cases:
+            raise ValueError("cases doit être une liste non vide")
+        if len(cases) > MAX_BATCH_SIZE:
+            raise ValueError(f"au plus {MAX_BATCH_SIZE} cas par lot")
+        default_agent_id = str(payload.get("agent_id") or "").strip() or None
+
+        results: list[dict[str, Any]] = [{} for _ in cases]
+        parsed: list[tuple[int, str, str, str | None]] = []
+        for index, item in enumerate(cases):
+            try:
+                if not isinstance(item, dict):
+                    raise ValueError("chaque cas doit être un objet {instruction_id, case_text}")
+                instruction_id, case_text, agent_id = self._parse_submission(item)
+                parsed.append((index, instruction_id, case_text, agent_id or default_agent_id))
+            except ValueError as exc:
+                results[index] = {"index": index, "stored": False, "error": str(exc)}
+
+        reserved: list[tuple[int, dict[str, Any], str, str | None]] = []
+        with self.lock:
+            for index, instruction_id, case_text, agent_id in parsed:
+                try:
+                    instruction = self._reserve_submission(instruction_id)
+                except ValueError as exc:
+                    results[index] = {
+                        "index": index,
+                        "instruction_id": instruction_id,
+                        "stored": False,
+                        "error": str(exc),
+                    }
+                    continue
+                reserved.append((index, instruction, case_text, agent_id))
+            near_duplicates = self.near_duplicates
+            reference_texts = self.reference_texts
+            indexed = len(near_duplicates)
+
+        accepted: list[tuple[dict[str, Any], dict[str, Any]]] = []
+        try:
+            # The shared index only learns this batch at commit time, so earlier items of
+            # the batch are indexed here and each item is also checked against them.
+            batch_index = NearDuplicateIndex()
+            batch_texts: dict[str, str] = {}
+            for index, instruction, case_text, agent_id in reserved:
+                instruction_id = str(instruction["instruction_id"])
+                try:
+                    record, target_toon = self._build_submission_record(
+                        instruction,
+                        case_text=case_text,
+                        agent_id=agent_id,
+                        near_duplicates=near_duplicates,
+                        reference_texts=reference_texts,
+                    )
+                except ValueError as exc:
+                    results[index] = {
+                        "index": index,
+                        "instruction_id": instruction_id,
+                        "stored": False,
+                        "error": str(exc),
+                    }
+                    continue
+                validation = record["validation"]
+                self._recheck_duplicates(
+                    validation,
+                    case_text,
+                    near_duplicates=batch_index,
+                    reference_texts=batch_texts,
+                )
+                normalized = _normalize_key(case_text)
+                batch_index.add(instruction_id, normalized_key=normalized, tokens=_tokens_from_key(normalized))
+                batch_texts[instruction_id] = case_text
+                accepted.append((instruction, record))
+                results[index] = {
+                    "index": index,
+                    "instruction_id": instruction_id,
+                    "stored": True,
+                    "validation": validation,
+                    "target_toon_lines": len(target_toon.splitlines()),
+                }
+            with self.lock:
+                for _, instruction, _, _ in reserved:
+                    self.pending_submissions.discard(str(instruction["instruction_id"]))
+                coverage = (
+                    self._commit_submissions(accepted, since=(near_duplicates, indexed))
+                    if accepted
+                    else self.coverage
+                )
+        except BaseException:
+            with self.lock:
+                for _, instruction, _, _ in reserved:
+                    self.pending_submissions.discard(str(instruction["instruction_id"]))
+            raise
+        return {
+            "stored": len(accepted),
+            "rejected": len(cases) - len(accepted),
+            "results": results,
+            "coverage": coverage,
+        }
+
+    def _parse_submission(self, payload: dict[str, Any]) -> tuple[str, str, str | None]:
         instruction_id = str(payload.get("instruction_id") or "").strip()
         if not instruction_id:
             raise ValueError("instruction_id manquant")
@@ -2567,141 +3457,383 @@ class InstructionServerApp:
         if "target_toon" in payload:
             raise ValueError("target_toon non attendu: soumettre uniquement instruction_id + case_text")
         agent_id = str(payload.get("agent_id") or "").strip() or None
+        return instruction_id, case_text, agent_id
+
+    def _reserve_submission(self, instruction_id: str) -> dict[str, Any]:
+        # Called under self.lock.
+        instruction = self._find_instruction(instruction_id)
+        if instruction is None:
+            raise ValueError(f"instruction inconnue: {instruction_id}")
+        if instruction_id in self.submitted_positions:
+            raise ValueError(f"instruction déjà soumise: {instruction_id}")
+        if instruction_id in self.pending_submissions:
+            raise ValueError(f"soumission déjà en cours pour cette instruction: {instruction_id}")
+        self.pending_submissions.add(instruction_id)
+        return instruction
+
+    def _build_submission_record(
+        self,
+        instruction: dict[str, Any],
+        *,
+        case_text: str,
+        agent_id: str | None,
+        near_duplicates: NearDuplicateIndex,
+        reference_texts: ReferenceTexts,
+    ) -> tuple[dict[str, Any], str]:
+        instruction_id = str(instruction["instruction_id"])
+        target_toon, decoded_target = self._decoded_target_for(instruction)
+
+        missing_names = _missing_names_from_case_text(case_text, decoded_target)
+        if missing_names:
+            preview = ", ".join(missing_names[:3])
+            if len(missing_names) > 3:
+                preview += ", …"
+            raise ValueError(
+                "incohérence texte/target_toon: noms absents de l'énoncé "
+                f"({preview})"
+            )
 
-        with self.lock:
-            instruction = self._find_instruction(instruction_id)
-            if instruction is None:
-                raise ValueError(f"instruction inconnue: {instruction_id}")
-            if any(row.get("instruction_id") == instruction_id for row in self.submitted):
-                raise ValueError(f"instruction déjà soumise: {instruction_id}")
-
-            instruction_target_toon = instruction.get("server_target_toon")
-            if not isinstance(instruction_target_toon, str) or not instruction_target_toon.strip():
-                raise ValueError("cible TOON serveur introuvable pour cette instruction")
-            target_toon, decoded_target = _normalize_target_toon(instruction_target_toon)
-
-            missing_names = _missing_names_from_case_text(case_text, decoded_target)
-            if missing_names:
-                preview = ", ".join(missing_names[:3])
-                if len(missing_names) > 3:
-                    preview += ", …"
-                raise ValueError(
-                    "incohérence texte/target_toon: noms absents de l'énoncé "
-                    f"({preview})"
-                )
+        validation = self._validate_submission(
+            case_text,
+            near_duplicates=near_duplicates,
+            reference_texts=reference_texts,
+        )
+        if re.search(r"\b[a-z]+_[a-z_]+\b", case_text):
+            raise ValueError(
+                "format invalide: ne pas inclure de clés internes en snake_case dans l'énoncé "
+                "(ex: statut_matrimonial, option_successorale)"
+            )
+        caps_match = FORBIDDEN_CAPS_UNDERSCORE_RE.search(case_text)
+        if caps_match:
+            token = caps_match.group(0)
+            raise ValueError(
+                "format invalide: ne pas inclure de codes en MAJUSCULES_AVEC_UNDERSCORE dans l'énoncé "
+                f"(ex: PARTENAIRE_PACS, NEVEU_NIECE). Reçu: {token!r}. "
+                "Traduire en français naturel (sans underscores)."
+            )
+        if FORBIDDEN_PYTHON_BOOL_RE.search(case_text):
+            raise ValueError(
+                "format invalide: ne pas inclure de booléens Python ('True'/'False') dans l'énoncé. "
+                "Utiliser une formulation française (oui/non)."
+            )
+        if FORBIDDEN_PATH_DUMP_RE.search(case_text):
+            raise ValueError(
+                "format invalide: ne pas inclure de chemins type 'famille > defunt > ...' dans l'énoncé. "
+                "Reformuler en phrases françaises."
+            )
+        if FORBIDDEN_ENUM_BASIC_RE.search(case_text):
+            raise ValueError(
+                "format invalide: ne pas inclure de tokens d'énumération en majuscules (ex: CELIBATAIRE, "
+                "JOURS, MOIS). Traduire en français naturel."
+            )
+        if FORBIDDEN_SCHEMAISH_PHRASES_RE.search(case_text) or FORBIDDEN_SCHEMAISH_DEFUNT_FIELDS_RE.search(
+            case_text
+        ):
+            raise ValueError(
+                "format invalide: l'énoncé ressemble à un dump de champs (ex: 'famille defunt ...', "
+                "'defunt date deces ...'). Reformuler en français naturel."
+            )
+        if case_text.count(";") > MAX_SEMICOLONS_IN_CASE_TEXT:
+            raise ValueError(
+                "format invalide: trop de séparateurs ';' (probable dump de champs). "
+                f"Limite: {MAX_SEMICOLONS_IN_CASE_TEXT}."
+            )
+        if case_text.count(":") > MAX_COLONS_IN_CASE_TEXT:
+            raise ValueError(
+                "format invalide: trop de séparateurs ':' (probable dump de champs). "
+                f"Limite: {MAX_COLONS_IN_CASE_TEXT}."
+            )
+        record = {
+            "instruction_id": instruction_id,
+            "agent_id": agent_id or instruction.get("agent_id"),
+            "submitted_at": _utc_now(),
+            "case_text": case_text,
+            "target_toon": target_toon,
+            "target_source": "server_instruction",
+            "validation": validation,
+            "dimensions": instruction.get("dimensions", {}),
+        }
+        return record, target_toon
 
-            validation = self._validate_submission(case_text)
-            if re.search(r"\b[a-z]+_[a-z_]+\b", case_text):
-                raise ValueError(
-                    "format invalide: ne pas inclure de clés internes en snake_case dans l'énoncé "
-                    "(ex: statut_matrimonial, option_successorale)"
-                )
-            caps_match = FORBIDDEN_CAPS_UNDERSCORE_RE.search(case_text)
-            if caps_match:
-                token = caps_match.group(0)
-                raise ValueError(
-                    "format invalide: ne pas inclure de codes en MAJUSCULES_AVEC_UNDERSCORE dans l'énoncé "
-                    f"(ex: PARTENAIRE_PACS, NEVEU_NIECE). Reçu: {token!r}. "
-                    "Traduire en français naturel (sans underscores)."
-                )
-            if FORBIDDEN_PYTHON_BOOL_RE.search(case_text):
-                raise ValueError(
-                    "format invalide: ne pas inclure de booléens Python ('True'/'False') dans l'énoncé. "
-                    "Utiliser une formulation française (oui/non)."
-                )
-            if FORBIDDEN_PATH_DUMP_RE.search(case_text):
-                raise ValueError(
-                    "format invalide: ne pas inclure de chemins type 'famille > defunt > ...' dans l'énoncé. "
-                    "Reformuler en phrases françaises."
-                )
-            if FORBIDDEN_ENUM_BASIC_RE.search(case_text):
-                raise ValueError(
-                    "format invalide: ne pas inclure de tokens d'énumération en majuscules (ex: CELIBATAIRE, "
-                    "JOURS, MOIS). Traduire en français naturel."
-                )
-            if FORBIDDEN_SCHEMAISH_PHRASES_RE.search(case_text) or FORBIDDEN_SCHEMAISH_DEFUNT_FIELDS_RE.search(
-                case_text
-            ):
-                raise ValueError(
-                    "format invalide: l'énoncé ressemble à un dump de champs (ex: 'famille defunt ...', "
-                    "'defunt date deces ...'). Reformuler en français naturel."
-                )
-            if case_text.count(";") > MAX_SEMICOLONS_IN_CASE_TEXT:
-                raise ValueError(
-                    "format invalide: trop de séparateurs ';' (probable dump de champs). "
-                    f"Limite: {MAX_SEMICOLONS_IN_CASE_TEXT}."
-                )
-            if case_text.count(":") > MAX_COLONS_IN_CASE_TEXT:
-                raise ValueError(
-                    "format invalide: trop de séparateurs ':' (probable dump de champs). "
-                    f"Limite: {MAX_COLONS_IN_CASE_TEXT}."
+    def _commit_submissions(
+        self,
+        accepted: list[tuple[dict[str, Any], dict[str, Any]]],
+        *,
+        since: tuple[NearDuplicateIndex, int],
+    ) -> dict[str, Any]:
+        # Called under self.lock: one journal write and one summary refresh per batch.
+        # `since` is the (index, size) pair the records were validated against; anything
+        # committed meanwhile by a concurrent submission is checked here before the write.
+        validated_index, validated_size = since
+        if self.near_duplicates is not validated_index or len(self.near_duplicates) != validated_size:
+            min_ordinal = validated_size if self.near_duplicates is validated_index else 0
+            for _, record in accepted:
+                self._recheck_duplicates(
+                    record["validation"],
+                    str(record["case_text"]),
+                    near_duplicates=self.near_duplicates,
+                    reference_texts=self.reference_texts,
+                    min_ordinal=min_ordinal,
                 )
-            record = {
-                "instruction_id": instruction_id,
-                "agent_id": agent_id or instruction.get("agent_id"),
-                "submitted_at": _utc_now(),
-                "case_text": case_text,
-                "target_toon": target_toon,
-                "target_source": "server_instruction",
-                "validation": validation,
-                "dimensions": instruction.get("dimensions", {}),
-            }
-            self.submitted.append(record)
-            _append_jsonl(self.submitted_path, record)
-            self._write_submission_file(record)
-            self._write_instruction_file(instruction, submission=record)
-            self._refresh_training_exports()
-            self._refresh_summary()
-            return {
-                "stored": True,
-                "validation": validation,
-                "target_toon_lines": len(target_toon.splitlines()),
-                "coverage": self._coverage_snapshot(),
-            }
+        with self.metrics.stage_seconds.time(("journal_append",)), span(
+            "journal_append", {"journal": JOURNAL_SUBMITTED}, cat="write"
+        ):
+            refs, journal_cursor = self.store.append(JOURNAL_SUBMITTED, [record for _, record in accepted])
+        for ref, (instruction, record) in zip(refs, accepted):
+            self.pending_submissions.discard(str(record["instruction_id"]))
+            self._record_submitted(ref, record)
+            self._index_reference(str(record["instruction_id"]), str(record["case_text"]))
+        self.submitted.cursor = journal_cursor
+        coverage = self._publish_coverage()
+        first_position = len(self.submitted) - len(accepted)
+        for offset, (instruction, record) in enumerate(accepted):
+            position = first_position + offset
+            self._write_behind(
+                ("submission", record["instruction_id"]),
+                lambda record=record: self.store.archive_submission(record),
+            )
+            self._schedule_instruction_record(instruction, submission=record)
+            self._write_behind(
+                ("training_export", position),
+                lambda record=record, position=position: self._append_training_export(record, position),
+            )
+        self._schedule_summary(coverage)
+        self._schedule_snapshot()
+        return coverage
+
+    def _remember_decoded_target(self, target_hash: str, decoded_target: Any) -> None:
+        with self.decoded_lock:
+            self.decoded_targets[target_hash] = decoded_target
+            self.decoded_targets.move_to_end(target_hash)
+            while len(self.decoded_targets) > DECODED_TARGET_CACHE_SIZE:
+                self.decoded_targets.popitem(last=False)
+
+    def _decoded_target_for(self, instruction: dict[str, Any]) -> tuple[str, Any]:
+        instruction_target_toon = instruction.get("server_target_toon")
+        if not isinstance(instruction_target_toon, str) or not instruction_target_toon.strip():
+            raise ValueError("cible TOON serveur introuvable pour cette instruction")
+
+        # Issued targets are already normalized and hashed; only legacy rows
+        # (no hash, or a hash over un-normalized text) fall back to a decode.
+        target_hash = instruction.get("server_target_sha256")
+        if isinstance(target_hash, str):
+            with self.decoded_lock:
+                decoded_target = self.decoded_targets.get(target_hash)
+                if decoded_target is not None:
+                    self.decoded_targets.move_to_end(target_hash)
+                    return instruction_target_toon, decoded_target
+
+        target_toon, decoded_target = _normalize_target_toon(
+            instruction_target_toon,
+            backend=self.toon_backend,
+        )
+        self._remember_decoded_target(_toon_sha256(target_toon), decoded_target)
+        return target_toon, decoded_target
 
     def _find_instruction(self, instruction_id: str) -> dict[str, Any] | None:
-        for row in self.issued:
-            if row.get("instruction_id") == instruction_id:
-                return row
-        return None
+        position = self.instruction_positions.get(instruction_id)
+        return self.issued[position] if position is not None else None
+
+    def _load_full_state(self) -> None:
+        # Cold path (no usable snapshot): scan both journals once and derive everything.
+        issued_entries, issued_cursor = self.store.scan(JOURNAL_ISSUED)
+        submitted_entries, submitted_cursor = self.store.scan(JOURNAL_SUBMITTED)
+        self.issued = JournalRows(
+            partial(self.store.read, JOURNAL_ISSUED),
+            [ref for ref, _ in issued_entries],
+            cursor=issued_cursor,
+        )
+        self.submitted = JournalRows(
+            partial(self.store.read, JOURNAL_SUBMITTED),
+            [ref for ref, _ in submitted_entries],
+            cursor=submitted_cursor,
+        )
+        issued_rows = [row for _, row in issued_entries]
+        submitted_rows = [row for _, row in submitted_entries]
+        self._rebuild_indexes(issued_rows, submitted_rows)
+        self._rebuild_near_duplicate_index(submitted_rows)
+        self._refresh_training_exports(submitted_rows)
+        # The snapshot written right after this scan vouches for the whole archive.
+        self.archive_recovered = self.store.recover_archive(issued_rows, submitted_rows, self._find_instruction)
+
+    def _rebuild_indexes(self, issued_rows: list[dict[str, Any]], submitted_rows: list[dict[str, Any]]) -> None:
+        stored_counts = self.store.load_dimension_counts(len(issued_rows))
+        if stored_counts is not None:
+            self.dimension_counters = DimensionCounters(counts=stored_counts)
+        else:
+            self.dimension_counters = DimensionCounters.from_rows(issued_rows)
+        self.instruction_positions: dict[str, int] = {}
+        for position, row in enumerate(issued_rows):
+            if row.get("instruction_id"):
+                self.instruction_positions.setdefault(str(row["instruction_id"]), position)
+        self.submitted_positions: dict[str, int] = {}
+        for position, row in enumerate(submitted_rows):
+            if row.get("instruction_id"):
+                self.submitted_positions.setdefault(str(row["instruction_id"]), position)
+
+    def _usable_snapshot(self) -> dict[str, Any] | None:
+        snapshot = read_snapshot(self.snapshot_path)
+        if (
+            snapshot is None
+            or snapshot.get("backend") != self.store.backend
+            or snapshot.get("state_version") != STATE_VERSION
+        ):
+            return None
+        journals = snapshot.get("journals")
+        if not isinstance(journals, dict):
+            return None
+        for journal in (JOURNAL_ISSUED, JOURNAL_SUBMITTED):
+            state = journals.get(journal)
+            # The journal must still start with exactly the rows the snapshot described.
+            if not isinstance(state, dict) or self.store.fingerprint(journal, state["cursor"]) != state.get(
+                "fingerprint"
+            ):
+                return None
+        return snapshot
+
+    def _restore_from_snapshot(self, snapshot: dict[str, Any]) -> int:
+        # Fast path: counters and id indexes come from the snapshot, and only the rows
+        # appended after it (the journal tail) are parsed. Returns the replayed row count.
+        issued_state = snapshot["journals"][JOURNAL_ISSUED]
+        submitted_state = snapshot["journals"][JOURNAL_SUBMITTED]
+        self.issued = JournalRows(
+            partial(self.store.read, JOURNAL_ISSUED),
+            issued_state["refs"],
+            cursor=issued_state["cursor"],
+        )
+        self.submitted = JournalRows(
+            partial(self.store.read, JOURNAL_SUBMITTED),
+            submitted_state["refs"],
+            cursor=submitted_state["cursor"],
+        )
+        self.instruction_positions = dict(issued_state["positions"])
+        self.submitted_positions = dict(submitted_state["positions"])
+        stored_counts = snapshot.get("dimension_counts") or {}
+        self.dimension_counters = DimensionCounters(
+            counts={key: dict(stored_counts.get(key) or {}) for key in COUNTED_DIMENSIONS}
+        )
 
-    def _dimension_counts(self) -> dict[str, dict[str, int]]:
-        counters = {
-            "persona": {},
-            "voice": {},
-            "format": {},
-            "length_band": {},
-            "noise": {},
-            "numeric_density": {},
-            "date_precision": {},
-            "complexity": {},
-            "primary_topic": {},
-            "hard_negative_mode": {},
-            "hard_negative_intensity": {},
-        }
-        for row in self.issued:
-            dimensions = row.get("dimensions", {})
-            if not isinstance(dimensions, dict):
+        issued_tail, issued_cursor = self.store.scan(JOURNAL_ISSUED, self.issued.cursor)
+        for ref, row in issued_tail:
+            self._record_issued(ref, row)
+        self.issued.cursor = issued_cursor
+        submitted_tail, submitted_cursor = self.store.scan(JOURNAL_SUBMITTED, self.submitted.cursor)
+        for ref, row in submitted_tail:
+            self._record_submitted(ref, row)
+        self.submitted.cursor = submitted_cursor
+        # Archive writes for rows before the snapshot cursors ran before the snapshot
+        # itself (same write-behind queue); only the tail can have lost them.
+        self.archive_recovered = self.store.recover_archive(
+            [row for _, row in issued_tail],
+            [row for _, row in submitted_tail],
+            self._find_instruction,
+        )
+
+        if snapshot.get("seed_source") == self._seed_source():
+            self._restore_near_duplicate_index()
+        else:
+            self._rebuild_near_duplicate_index()
+        self._restore_training_exports(snapshot.get("exports"))
+        return len(issued_tail) + len(submitted_tail)
+
+    def _record_issued(self, ref: Any, instruction: dict[str, Any]) -> None:
+        position = self.issued.append(ref, instruction)
+        if instruction.get("instruction_id"):
+            self.instruction_positions.setdefault(str(instruction["instruction_id"]), position)
+        self.dimension_counters.add(instruction.get("dimensions", {}))
+
+    def _record_submitted(self, ref: Any, record: dict[str, Any]) -> None:
+        position = self.submitted.append(ref, record)
+        if record.get("instruction_id"):
+            self.submitted_positions.setdefault(str(record["instruction_id"]), position)
+
+    def _seed_texts(self) -> dict[str, str]:
+        seed_texts: dict[str, str] = {}
+        for seed in self.seed_cases:
+            seed_texts.setdefault(seed.case_id, seed.text)
+        return seed_texts
+
+    def _seed_source(self) -> list[Any]:
+        stamp = self.seed_index.source_stamp
+        return [str(self.seed_index.source_file), list(stamp) if stamp is not None else None]
+
+    def _near_duplicate_references(self, submitted_rows: Any) -> list[tuple[str, str]]:
+        references: list[tuple[str, str]] = [(seed.case_id, seed.text) for seed in self.seed_cases]
+        for row in submitted_rows:
+            existing = row.get("case_text")
+            if isinstance(existing, str):
+                references.append((str(row.get("instruction_id") or ""), existing))
+        return references
+
+    def _rebuild_near_duplicate_index(self, submitted_rows: Any = None) -> None:
+        # Built aside and swapped in at the end: in-flight validations keep the old pair.
+        near_duplicates = NearDuplicateIndex(self.store.near_duplicate_store())
+        seen: set[str] = set()
+        keyed: list[tuple[str, str, Any]] = []
+        references = self._near_duplicate_references(self.submitted if submitted_rows is None else submitted_rows)
+        for ref_id, text in references:
+            if ref_id in seen:
                 continue
-            for key in list(counters):
-                value = dimensions.get(key)
-                if isinstance(value, str) and value:
-                    bucket = counters[key]
-                    bucket[value] = bucket.get(value, 0) + 1
-        return counters
+            seen.add(ref_id)
+            normalized = _normalize_key(text)
+            keyed.append((ref_id, normalized, lambda normalized=normalized: _tokens_from_key(normalized)))
+        near_duplicates.sync(keyed)
+        self.near_duplicates = near_duplicates
+        self.reference_texts = ReferenceTexts(self._seed_texts(), self.submitted_positions, self.submitted)
+
+    def _restore_near_duplicate_index(self) -> None:
+        # Persisted entries are trusted (the snapshot vouches for the journal prefix);
+        # only references missing from the index are hashed again.
+        near_duplicates = NearDuplicateIndex(self.store.near_duplicate_store())
+        reference_texts = ReferenceTexts(self._seed_texts(), self.submitted_positions, self.submitted)
+        near_duplicates.restore(reference_texts.__contains__)
+        for ref_id in [*reference_texts.seeds, *self.submitted_positions]:
+            if ref_id not in near_duplicates.ordinals:
+                normalized = _normalize_key(reference_texts[ref_id])
+                near_duplicates.add(ref_id, normalized_key=normalized, tokens=_tokens_from_key(normalized))
+        self.near_duplicates = near_duplicates
+        self.reference_texts = reference_texts
+
+    def _index_reference(self, ref_id: str, text: str) -> None:
+        if ref_id in self.near_duplicates.ordinals:
+            return
+        normalized = _normalize_key(text)
+        self.near_duplicates.add(ref_id, normalized_key=normalized, tokens=_tokens_from_key(normalized))
+
+    def _issue_cursor(self) -> IssueCursor:
+        return IssueCursor(
+            sequence=len(self.issued) + 1,
+            counters=self.dimension_counters,
+            recent_signatures=tuple(row.get("signature") for row in self.issued[-RECENT_SIGNATURE_WINDOW:]),
+            seed_index=self._current_seed_index(),
+        )
+
+    def _prefill_cursor(self) -> IssueCursor:
+        cursor = self._issue_cursor()
+        cursor.counters = cursor.counters.copy()
+        return cursor
 
-    def _recent_signatures(self, limit: int = 12) -> set[str]:
-        signatures: set[str] = set()
-        for row in self.issued[-limit:]:
-            signature = row.get("signature")
-            if isinstance(signature, str):
-                signatures.add(signature)
-        return signatures
+    def _prefill_generate(
+        self,
+        instruction: dict[str, Any],
+        cursor: IssueCursor,
+    ) -> tuple[tuple[str, Any], TargetGeneration]:
+        return self._target_for(instruction, cursor.sequence)
 
-    def _build_instruction(self, *, agent_id: str | None, force_topic: str | None) -> dict[str, Any]:
-        sequence = len(self.issued) + 1
+    def _prefill_reserve(self, cursor: IssueCursor, topic: str | None) -> tuple[dict[str, Any], IssueCursor]:
+        instruction = self._build_instruction(agent_id=None, force_topic=topic, cursor=cursor)
+        return instruction, cursor.advanced(instruction)
+
+    def _build_instruction(
+        self,
+        *,
+        agent_id: str | None,
+        force_topic: str | None,
+        cursor: IssueCursor,
+    ) -> dict[str, Any]:
+        sequence = cursor.sequence
         rng = random.Random(int(self.config["seed"]) + sequence)
-        counts = self._dimension_counts()
+        counts = cursor.counters
 
         persona = _pick_underrepresented(PERSONA_TARGETS, counts["persona"], rng)
         voice = _pick_underrepresented(VOICE_TARGETS, counts["voice"], rng)
@@ -2775,7 +3907,7 @@ class InstructionServerApp:
                 ),
             )
         )
-        if signature in self._recent_signatures():
+        if signature in {item for item in cursor.recent_signatures if isinstance(item, str)}:
             format_name = _pick_underrepresented(
                 FORMAT_TARGETS,
                 counts["format"],
@@ -2816,7 +3948,7 @@ class InstructionServerApp:
             "hard_negative_mode": hard_negative_mode,
             "hard_negative_intensity": hard_negative_intensity,
         }
-        examples = self._pick_reference_examples(primary_topic, secondary_topic, rng)
+        examples = self._pick_reference_examples(primary_topic, secondary_topic, rng, cursor.seed_index)
         must_include = self._collect_mandatory_elements(dimensions)
         must_avoid = self._collect_must_avoid(dimensions)
         style_brief = self._build_style_brief(dimensions)
@@ -2859,27 +3991,18 @@ class InstructionServerApp:
         primary_topic: str,
         secondary_topic: str | None,
         rng: random.Random,
+        seed_index: SeedIndex,
     ) -> list[dict[str, str]]:
-        if not self.seed_cases:
+        if not seed_index.seeds:
             return []
 
-        topics = [primary_topic]
+        matched = set(seed_index.seeds_by_topic.get(primary_topic, ()))
         if secondary_topic:
-            topics.append(secondary_topic)
-
-        keywords: list[str] = []
-        for topic in topics:
-            keywords.extend(TOPIC_TEMPLATES[topic]["keywords"])
-
-        candidates: list[CorpusSeed] = []
-        lowered_keywords = [_normalize_key(word) for word in keywords]
-        for seed in self.seed_cases:
-            seed_key = _normalize_key(seed.text)
-            if any(keyword in seed_key for keyword in lowered_keywords):
-                candidates.append(seed)
+            matched.update(seed_index.seeds_by_topic.get(secondary_topic, ()))
+        candidates = [seed_index.seeds[idx] for idx in sorted(matched)]
 
         if len(candidates) < 2:
-            candidates = list(self.seed_cases)
+            candidates = list(seed_index.seeds)
 
         rng.shuffle(candidates)
         selected = candidates[:2]
@@ -2893,6 +4016,15 @@ class InstructionServerApp:
             for item in selected
         ]
 
+    def _current_seed_index(self) -> SeedIndex:
+        # Cheap stat() per instruction; the corpus is only re-read when it changed on disk.
+        seed_index = self.seed_index
+        if _file_stamp(seed_index.source_file) != seed_index.source_stamp:
+            self.seed_index = _build_seed_index(seed_index.source_file)
+            self.seed_cases = self.seed_index.seeds
+            self._rebuild_near_duplicate_index()
+        return self.seed_index
+
     def _render_instruction_prompt(
         self,
         dimensions: dict[str, str | None],
@@ -2974,7 +4106,14 @@ class InstructionServerApp:
         )
         return "\n".join(lines).strip()
 
-    def _validate_submission(self, case_text: str) -> dict[str, Any]:
+    @_timed_stage("validate_submission")
+    def _validate_submission(
+        self,
+        case_text: str,
+        *,
+        near_duplicates: NearDuplicateIndex,
+        reference_texts: ReferenceTexts,
+    ) -> dict[str, Any]:
         normalized = _normalize_key(case_text)
         warnings: list[str] = []
 
@@ -2982,37 +4121,24 @@ class InstructionServerApp:
         max_similarity = 0.0
         closest_case_id: str | None = None
 
-        for seed in self.seed_cases:
-            seed_key = _normalize_key(seed.text)
-            if normalized == seed_key:
-                exact_duplicate = True
-                closest_case_id = seed.case_id
-                max_similarity = 1.0
-                break
-            score = _jaccard_similarity(case_text, seed.text)
-            if score > max_similarity:
-                max_similarity = score
-                closest_case_id = seed.case_id
-
-        if not exact_duplicate:
-            for row in self.submitted:
-                existing = row.get("case_text")
-                if not isinstance(existing, str):
-                    continue
-                existing_key = _normalize_key(existing)
-                if normalized == existing_key:
-                    exact_duplicate = True
-                    closest_case_id = str(row.get("instruction_id") or "")
-                    max_similarity = 1.0
-                    break
-                score = _jaccard_similarity(case_text, existing)
+        # Exact duplicates come from a hash set of normalized keys; near duplicates
+        # only get an exact Jaccard against the MinHash/LSH candidates.
+        exact_ref = near_duplicates.exact_match(normalized)
+        if exact_ref is not None:
+            exact_duplicate = True
+            closest_case_id = exact_ref
+            max_similarity = 1.0
+        else:
+            tokens = _tokens_from_key(normalized)
+            for ref_id in near_duplicates.candidates(tokens):
+                score = _jaccard_from_tokens(tokens, _tokenize(reference_texts[ref_id]))
                 if score > max_similarity:
                     max_similarity = score
-                    closest_case_id = str(row.get("instruction_id") or "")
+                    closest_case_id = ref_id
 
         if exact_duplicate:
             warnings.append("doublon exact détecté")
-        elif max_similarity >= 0.72:
+        elif max_similarity >= NEAR_DUPLICATE_THRESHOLD:
             warnings.append("cas très proche d'un cas existant")
 
         if len(case_text) < 60:
@@ -3035,8 +4161,51 @@ class InstructionServerApp:
             "warnings": warnings,
         }
 
+    def _recheck_duplicates(
+        self,
+        validation: dict[str, Any],
+        case_text: str,
+        *,
+        near_duplicates: NearDuplicateIndex,
+        reference_texts: Any,
+        min_ordinal: int = 0,
+    ) -> None:
+        # Upgrades a `_validate_submission` result with references it could not see
+        # (entries of `near_duplicates` from `min_ordinal` on), as a sequential submit would have.
+        if validation["exact_duplicate"]:
+            return
+        normalized = _normalize_key(case_text)
+        exact_ref = near_duplicates.exact_match(normalized)
+        if exact_ref is not None and near_duplicates.ordinals[exact_ref] >= min_ordinal:
+            validation["exact_duplicate"] = True
+            validation["max_similarity"] = 1.0
+            validation["closest_reference"] = exact_ref
+            if "cas très proche d'un cas existant" in validation["warnings"]:
+                validation["warnings"].remove("cas très proche d'un cas existant")
+            validation["warnings"].insert(0, "doublon exact détecté")
+            return
+        tokens = _tokens_from_key(normalized)
+        best_score = 0.0
+        best_ref: str | None = None
+        for ref_id in near_duplicates.candidates(tokens):
+            if near_duplicates.ordinals[ref_id] < min_ordinal:
+                continue
+            score = _jaccard_from_tokens(tokens, _tokenize(reference_texts[ref_id]))
+            if score > best_score:
+                best_score = score
+                best_ref = ref_id
+        if best_ref is None or round(best_score, 4) <= validation["max_similarity"]:
+            return
+        validation["max_similarity"] = round(best_score, 4)
+        validation["closest_reference"] = best_ref
+        if (
+            best_score >= NEAR_DUPLICATE_THRESHOLD
+            and "cas très proche d'un cas existant" not in validation["warnings"]
+        ):
+            validation["warnings"].insert(0, "cas très proche d'un cas existant")
+
     def _coverage_snapshot(self) -> dict[str, Any]:
-        counts = self._dimension_counts()
+        counts = self.dimension_counters
         generation_target = int(self.config["generation_target"])
         target_total_cases = int(self.config["target_total_cases"])
         hard_negative_base = generation_target * COMPLEXITY_TARGETS["hard_negative"]
@@ -3072,29 +4241,88 @@ class InstructionServerApp:
         }
         return summary
 
-    def _refresh_training_exports(self) -> None:
-        generated_rows: list[str] = []
-        for row in self.submitted:
-            case_text = row.get("case_text")
-            target_toon = row.get("target_toon")
-            if (
-                isinstance(case_text, str)
-                and case_text.strip()
-                and isinstance(target_toon, str)
-                and target_toon.strip()
-            ):
-                generated_rows.append(
-                    json.dumps(_pair_training_record(case_text, target_toon.strip()), ensure_ascii=False)
-                )
-
-        self.generated_train_path.write_text(
-            ("\n".join(generated_rows) + ("\n" if generated_rows else "")),
-            encoding="utf-8",
-        )
+    def _training_export_line(self, row: dict[str, Any]) -> str | None:
+        case_text = row.get("case_text")
+        target_toon = row.get("target_toon")
+        if (
+            isinstance(case_text, str)
+            and case_text.strip()
+            and isinstance(target_toon, str)
+            and target_toon.strip()
+        ):
+            return json.dumps(_pair_training_record(case_text, target_toon.strip()), ensure_ascii=False) + "\n"
+        return None
 
-        with self.full_train_path.open("w", encoding="utf-8") as handle:
-            for row_json in generated_rows:
-                handle.write(row_json + "\n")
+    @_timed_stage("refresh_training_exports")
+    def _refresh_training_exports(self, rows: list[dict[str, Any]] | None = None) -> None:
+        # Full rebuild: only used at startup or when the on-disk exports drifted
+        # from what this process last wrote (see _append_training_export).
+        if rows is None:
+            rows = self.submitted
+        generated_rows: list[str] = []
+        for row in rows:
+            line = self._training_export_line(row)
+            if line is not None:
+                generated_rows.append(line)
+        content = "".join(generated_rows).encode("utf-8")
+
+        self.export_sizes = {}
+        for path in (self.generated_train_path, self.full_train_path):
+            path.write_bytes(content)
+            self.export_sizes[path] = len(content)
+        self.export_submitted = len(rows)
+
+    def _restore_training_exports(self, exports: Any) -> None:
+        # Exports are trusted up to the sizes recorded in the snapshot (anything written
+        # after it is cut off), then the missing rows are appended. Any mismatch falls
+        # back to a full rebuild.
+        paths = (self.generated_train_path, self.full_train_path)
+        files = exports.get("files") if isinstance(exports, dict) else None
+        if (
+            not isinstance(files, dict)
+            or int(exports.get("submitted", -1)) > len(self.submitted)
+            or any(
+                not isinstance(files.get(path.name), list)
+                or file_fingerprint(path, int(files[path.name][0])) != files[path.name][1]
+                for path in paths
+            )
+        ):
+            self._refresh_training_exports()
+            return
+        self.export_sizes = {}
+        for path in paths:
+            size = int(files[path.name][0])
+            with path.open("ab") as handle:
+                handle.truncate(size)
+            self.export_sizes[path] = size
+        self.export_submitted = int(exports["submitted"])
+        for position in range(self.export_submitted, len(self.submitted)):
+            self._append_training_export(self.submitted[position], position)
+
+    @_timed_stage("append_training_export")
+    def _append_training_export(self, record: dict[str, Any], position: int) -> None:
+        # Runs on the write-behind thread; `position` is the record's index in
+        # self.submitted, so rows already covered by a rebuild are not appended twice.
+        if position < self.export_submitted:
+            return
+        self.export_submitted = position + 1
+        line = self._training_export_line(record)
+        if line is None:
+            return
+        encoded = line.encode("utf-8")
+        for path in (self.generated_train_path, self.full_train_path):
+            expected_size = self.export_sizes.get(path)
+            actual_size = path.stat().st_size if path.exists() else None
+            if expected_size is None or actual_size != expected_size:
+                # Someone touched the export behind our back: fall back to a full rebuild
+                # up to and including `record`. Only byte sizes are compared, which keeps
+                # the check O(1); an edit that preserves the size goes unnoticed.
+                self._refresh_training_exports(self.submitted[: position + 1])
+                return
+        for path in (self.generated_train_path, self.full_train_path):
+            with path.open("ab") as handle:
+                handle.write(encoded)
+            self.export_sizes[path] += len(encoded)
 
     def _dimension_progress(
         self,
@@ -3116,8 +4344,27 @@ class InstructionServerApp:
             }
         return progress
 
+    @_timed_stage("refresh_summary")
     def _refresh_summary(self) -> None:
-        snapshot = self._coverage_snapshot()
+        self._write_summary(self._publish_coverage())
+
+    def _publish_coverage(self) -> dict[str, Any]:
+        # Called under self.lock. The published dict is never mutated afterwards, so
+        # readers (dashboard, responses, summary writer) use it without locking.
+        self.coverage = self._coverage_snapshot()
+        return self.coverage
+
+    def _schedule_summary(self, snapshot: dict[str, Any]) -> None:
+        # A burst of requests only leaves the latest snapshot pending, and the files
+        # are rewritten at most once per summary_interval_s.
+        self._write_behind(
+            "summary",
+            lambda: self._write_summary(snapshot),
+            min_interval_s=self.summary_interval_s,
+        )
+
+    @_timed_stage("write_summary")
+    def _write_summary(self, snapshot: dict[str, Any]) -> None:
         self.summary_json_path.write_text(
             json.dumps(snapshot, ensure_ascii=False, indent=2),
             encoding="utf-8",
@@ -3145,85 +4392,338 @@ class InstructionServerApp:
                 )
         self.summary_md_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
 
-    def _write_instruction_file(
+    def _snapshot_state(self) -> dict[str, Any]:
+        # Called under self.lock (or before serving). Copies only locators and indexes,
+        # never rows; the export part is filled in by _write_snapshot.
+        return {
+            "backend": self.store.backend,
+            "state_version": STATE_VERSION,
+            "written_at": _utc_now(),
+            "journals": {
+                JOURNAL_ISSUED: {
+                    "cursor": self.issued.cursor,
+                    "refs": list(self.issued.refs),
+                    "positions": dict(self.instruction_positions),
+                },
+                JOURNAL_SUBMITTED: {
+                    "cursor": self.submitted.cursor,
+                    "refs": list(self.submitted.refs),
+                    "positions": dict(self.submitted_positions),
+                },
+            },
+            "dimension_counts": self.dimension_counters.copy().counts,
+            "seed_source": self._seed_source(),
+        }
+
+    def _schedule_snapshot(self) -> None:
+        # Called under self.lock after a journal commit; the copy is taken at most once
+        # per snapshot_interval_s and written behind (close() always writes a last one).
+        now = time.monotonic()
+        if self.snapshot_interval_s <= 0 or now - self.snapshot_taken_at < self.snapshot_interval_s:
+            return
+        self.snapshot_taken_at = now
+        state = self._snapshot_state()
+        self._write_behind("snapshot", lambda: self._write_snapshot(state))
+
+    @_timed_stage("write_snapshot")
+    def _write_snapshot(self, state: dict[str, Any]) -> None:
+        # Runs on the write-behind thread, after every export task queued before it, so
+        # the export sizes never cover more submissions than the journal state.
+        for journal, journal_state in state["journals"].items():
+            journal_state["fingerprint"] = self.store.fingerprint(journal, journal_state["cursor"])
+        state["exports"] = {
+            "submitted": self.export_submitted,
+            "files": {path.name: [size, file_fingerprint(path, size)] for path, size in self.export_sizes.items()},
+        }
+        write_snapshot(self.snapshot_path, state)
+
+    def _schedule_instruction_record(
         self,
         instruction: dict[str, Any],
         submission: dict[str, Any] | None = None,
     ) -> None:
-        payload = dict(instruction)
-        payload["status"] = "submitted" if submission is not None else "issued"
-        if submission is not None:
-            payload["submission"] = submission
-        target = self.instructions_dir / f"{instruction['instruction_id']}.json"
-        target.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        # Same key for the issued and submitted states: a pending "issued" write is
+        # simply superseded by the "submitted" one.
+        self._write_behind(
+            ("instruction", instruction["instruction_id"]),
+            lambda: self.store.archive_instruction(instruction, submission),
+        )
 
-    def _write_submission_file(self, submission: dict[str, Any]) -> None:
-        target = self.submissions_dir / f"{submission['instruction_id']}.json"
-        target.write_text(json.dumps(submission, ensure_ascii=False, indent=2), encoding="utf-8")
+    def _write_behind(self, key: Any, task: Callable[[], None], *, min_interval_s: float = 0.0) -> None:
+        # A traced request also gets a span for each derived write it queued.
+        name = f"write:{key if isinstance(key, str) else key[0]}"
+        self.writer.submit(key, self.tracer.bind(name, task), min_interval_s=min_interval_s)
 
 
-class InstructionRequestHandler(BaseHTTPRequestHandler):
-    server: "InstructionHTTPServer"
+_TARGET_WORKER: InstructionServerApp | None = None
 
-    def do_GET(self) -> None:  # noqa: N802
-        parsed = urlparse(self.path)
+
+def _init_target_worker(master_schema_file: Path, seed: int, toon_backend: str) -> None:
+    # Generation-only instance: _generate_target reads nothing but these attributes,
+    # so the worker skips journals, corpus and state directory entirely.
+    global _TARGET_WORKER
+    worker = InstructionServerApp.__new__(InstructionServerApp)
+    worker.config = {"seed": seed}
+    worker.toon_backend = toon_backend
+    worker.master_schema_file = master_schema_file
+    worker.master_schema = _load_master_schema(master_schema_file)
+    worker.master_schema_index = _build_master_schema_index(worker.master_schema)
+    worker.leaf_generators = worker._compile_leaf_generators()
+    worker.faker = Faker("fr_FR") if Faker is not None else None
+    _TARGET_WORKER = worker
+
+
+def _generate_target_in_worker(
+    instruction: dict[str, Any],
+    sequence: int,
+) -> tuple[str, Any, list[str], list[tuple[str, float, float]]]:
+    if _TARGET_WORKER is None:
+        raise RuntimeError("worker de génération non initialisé")
+    return _TARGET_WORKER._generate_target(instruction, sequence)
+
+
+def _json_response_body(payload: dict[str, Any]) -> bytes:
+    # Compact separators keep json.dumps on its C encoder (indent= falls back to the
+    # pure-Python one).
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _accepts_gzip(accept_encoding: str) -> bool:
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        if coding.strip().lower() != "gzip":
+            continue
+        quality = params.strip().lower()
+        return not (quality.startswith("q=") and quality[2:].strip() in {"0", "0.0", "0.00", "0.000"})
+    return False
+
+
+def _parse_response_fields(raw: Any) -> list[tuple[str, ...]] | None:
+    # `fields`: ["instruction.instruction_id", "instruction.target_toon"] or the same
+    # as one comma-separated string; a dotted key applies to every item of a list.
+    if raw is None or raw == "":
+        return None
+    if isinstance(raw, str):
+        items = raw.split(",")
+    elif isinstance(raw, list) and all(isinstance(item, str) for item in raw):
+        items = raw
+    else:
+        raise ValueError("fields doit être une liste de champs ou une chaîne séparée par des virgules")
+    paths = [tuple(item.strip().split(".")) for item in items if item.strip()]
+    for path in paths:
+        if "" in path:
+            raise ValueError(f"champ invalide dans fields: {'.'.join(path)}")
+    return paths or None
+
+
+def _parse_count(raw: Any) -> int:
+    # Absent means 1; 0 and negatives are left to the caller's range check, while
+    # booleans and non-integral numbers are rejected rather than coerced.
+    if raw is None:
+        return 1
+    if isinstance(raw, bool):
+        raise ValueError("count doit être un entier")
+    if isinstance(raw, int):
+        return raw
+    if isinstance(raw, float) and raw.is_integer():
+        return int(raw)
+    if isinstance(raw, str):
+        try:
+            return int(raw.strip())
+        except ValueError:
+            pass
+    raise ValueError("count doit être un entier")
+
+
+def _parse_flag(raw: Any, name: str) -> bool:
+    if raw is None:
+        return False
+    if isinstance(raw, bool):
+        return raw
+    if isinstance(raw, str) and raw.strip().lower() in {"1", "true", "oui", "yes"}:
+        return True
+    if isinstance(raw, str) and raw.strip().lower() in {"", "0", "false", "non", "no"}:
+        return False
+    raise ValueError(f"{name} doit être un booléen")
+
+
+def _select_fields(value: Any, paths: list[tuple[str, ...]]) -> Any:
+    if any(not path for path in paths):
+        return value
+    if isinstance(value, list):
+        return [_select_fields(item, paths) for item in value]
+    if not isinstance(value, dict):
+        return value
+    grouped: dict[str, list[tuple[str, ...]]] = {}
+    for path in paths:
+        grouped.setdefault(path[0], []).append(path[1:])
+    return {key: _select_fields(value[key], rest) for key, rest in grouped.items() if key in value}
+
+
+def _metric_method(method: str) -> str:
+    # Same idea as _metric_route: the asyncio front-end accepts any method token.
+    return method if method in ("GET", "POST") else "autre"
+
+
+def _metric_route(path: str) -> str:
+    if path in METRIC_ROUTES:
+        return path
+    if path.startswith("/instruction/"):
+        return "/instruction/{id}"
+    return "autre"
+
+
+def _parse_json_body(raw: bytes) -> dict[str, Any]:
+    if not raw:
+        return {}
+    payload = json.loads(raw.decode("utf-8"))
+    if not isinstance(payload, dict):
+        raise ValueError("JSON body must be an object")
+    return payload
+
+
+def _call_json_handler(handler: Any, payload: dict[str, Any]) -> tuple[HTTPStatus, dict[str, Any]]:
+    try:
+        return HTTPStatus.OK, handler(payload)
+    except ValueError as exc:
+        return HTTPStatus.BAD_REQUEST, {"error": str(exc)}
+    except Exception as exc:  # pragma: no cover - defensive runtime guard
+        return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)}
+
+
+def _call_agent_handler(handler: Any, payload: dict[str, Any]) -> tuple[HTTPStatus, dict[str, Any]]:
+    # Agent endpoints: the coverage snapshot (most of the bytes) is only sent with
+    # `include_coverage`, and `fields` keeps just the listed keys. Options are checked
+    # first, so a bad one issues or stores nothing.
+    try:
+        fields = _parse_response_fields(payload.get("fields"))
+        include_coverage = _parse_flag(payload.get("include_coverage"), "include_coverage")
+    except ValueError as exc:
+        return HTTPStatus.BAD_REQUEST, {"error": str(exc)}
+    status, response = _call_json_handler(handler, payload)
+    if status != HTTPStatus.OK:
+        return status, response
+    if fields is not None:
+        return status, _select_fields(response, fields)
+    if not include_coverage:
+        response = {key: value for key, value in response.items() if key != "coverage"}
+    return status, response
+
+
+def _dispatch_request(
+    app: InstructionServerApp,
+    method: str,
+    target: str,
+    raw_body: bytes,
+) -> tuple[HTTPStatus, dict[str, Any] | str]:
+    # Shared by the threaded and the asyncio front-ends. A str payload is sent as is
+    # (Prometheus text), a dict as JSON.
+    parsed = urlparse(target)
+    if method == "GET":
         if parsed.path == "/health":
-            self._send_json(HTTPStatus.OK, self.server.app.health())
-            return
+            return HTTPStatus.OK, app.health()
+        if parsed.path == "/metrics":
+            return HTTPStatus.OK, app.metrics.registry.render()
+        if parsed.path == "/admin/profile":
+            return HTTPStatus.OK, app.profiler.status()
         if parsed.path == "/dashboard":
-            self._send_json(HTTPStatus.OK, self.server.app.dashboard())
-            return
+            return HTTPStatus.OK, app.dashboard()
+        if parsed.path == "/debug/leaf-generators":
+            return HTTPStatus.OK, app.leaf_generator_table()
+        if parsed.path.startswith("/instruction/"):
+            instruction_id = unquote(parsed.path[len("/instruction/"):])
+            record = app.instruction_record(instruction_id)
+            if record is None:
+                return HTTPStatus.NOT_FOUND, {"error": f"instruction inconnue: {instruction_id}"}
+            return HTTPStatus.OK, record
         if parsed.path == "/next-instruction":
             params = parse_qs(parsed.query)
             payload = {
                 "agent_id": params.get("agent_id", [None])[0],
                 "topic": params.get("topic", [None])[0],
+                "fields": params.get("fields", [None])[0],
+                "include_coverage": params.get("include_coverage", [None])[0],
             }
-            self._handle_json_call(self.server.app.next_instruction, payload)
-            return
-        self._send_json(HTTPStatus.NOT_FOUND, {"error": "not_found"})
-
-    def do_POST(self) -> None:  # noqa: N802
-        parsed = urlparse(self.path)
-        body = self._read_json_body()
+            return _call_agent_handler(app.next_instruction, payload)
+        return HTTPStatus.NOT_FOUND, {"error": "not_found"}
+    if method == "POST":
+        try:
+            body = _parse_json_body(raw_body)
+        except ValueError as exc:
+            return HTTPStatus.BAD_REQUEST, {"error": str(exc)}
         if parsed.path == "/next-instruction":
-            self._handle_json_call(self.server.app.next_instruction, body)
-            return
+            return _call_agent_handler(app.next_instruction, body)
         if parsed.path == "/submit-case":
-            self._handle_json_call(self.server.app.submit_case, body)
-            return
-        self._send_json(HTTPStatus.NOT_FOUND, {"error": "not_found"})
+            return _call_agent_handler(app.submit_case, body)
+        if parsed.path == "/next-instructions":
+            return _call_agent_handler(app.next_instructions, body)
+        if parsed.path == "/submit-cases":
+            return _call_agent_handler(app.submit_cases, body)
+        if parsed.path == "/admin/profile":
+            return _call_json_handler(app.profile, body)
+        return HTTPStatus.NOT_FOUND, {"error": "not_found"}
+    return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "method_not_allowed"}
+
+
+def _handle_raw_request(
+    app: InstructionServerApp,
+    method: str,
+    target: str,
+    raw_body: bytes,
+    request_headers: dict[str, str] | None = None,
+) -> tuple[HTTPStatus, bytes, dict[str, str]]:
+    # request_headers: lower-cased names.
+    metrics = app.metrics
+    route = _metric_route(urlparse(target).path)
+    request_id = app.tracer.next_request_id()
+    trace = app.tracer.begin(request_id)
+    metrics.in_flight.add(1)
+    started = time.perf_counter()
+    status = HTTPStatus.INTERNAL_SERVER_ERROR
+    try:
+        if app.profiler.active and not route.startswith("/admin/"):
+            status, payload = app.profiler.run(_dispatch_request, app, method, target, raw_body)
+        else:
+            status, payload = _dispatch_request(app, method, target, raw_body)
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), PROMETHEUS_CONTENT_TYPE
+        else:
+            body, content_type = _json_response_body(payload), JSON_CONTENT_TYPE
+        headers = {"Content-Type": content_type, "X-Request-Id": request_id, "Vary": "Accept-Encoding"}
+        if len(body) >= GZIP_MIN_BYTES and _accepts_gzip((request_headers or {}).get("accept-encoding", "")):
+            with span("gzip", {"bytes": len(body)}):
+                body = gzip.compress(body, compresslevel=GZIP_COMPRESSLEVEL, mtime=0)
+            headers["Content-Encoding"] = "gzip"
+    finally:
+        metrics.in_flight.add(-1)
+        if trace is not None:
+            app.tracer.finish(trace, f"{method} {route}", {"path": target, "status": status.value})
+    metric_method = _metric_method(method)
+    metrics.request_seconds.observe(time.perf_counter() - started, (metric_method, route))
+    metrics.requests.inc((metric_method, route, str(status.value)))
+    return status, body, headers
 
-    def log_message(self, format: str, *args: Any) -> None:
-        return
 
-    def _read_json_body(self) -> dict[str, Any]:
+class InstructionRequestHandler(BaseHTTPRequestHandler):
+    server: "InstructionHTTPServer"
+
+    def do_GET(self) -> None:  # noqa: N802
+        self._dispatch("GET", b"")
+
+    def do_POST(self) -> None:  # noqa: N802
         content_length = int(self.headers.get("Content-Length", "0"))
-        if content_length <= 0:
-            return {}
-        raw = self.rfile.read(content_length)
-        if not raw:
-            return {}
-        payload = json.loads(raw.decode("utf-8"))
-        if not isinstance(payload, dict):
-            raise ValueError("JSON body must be an object")
-        return payload
+        raw = self.rfile.read(content_length) if content_length > 0 else b""
+        self._dispatch("POST", raw)
 
-    def _handle_json_call(self, handler: Any, payload: dict[str, Any]) -> None:
-        try:
-            response = handler(payload)
-        except ValueError as exc:
-            self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(exc)})
-            return
-        except Exception as exc:  # pragma: no cover - defensive runtime guard
-            self._send_json(HTTPStatus.INTERNAL_SERVER_ERROR, {"error": str(exc)})
-            return
-        self._send_json(HTTPStatus.OK, response)
+    def log_message(self, format: str, *args: Any) -> None:
+        return
 
-    def _send_json(self, status: HTTPStatus, payload: dict[str, Any]) -> None:
-        body = json.dumps(payload, ensure_ascii=False, indent=2).encode("utf-8")
+    def _dispatch(self, method: str, raw_body: bytes) -> None:
+        request_headers = {name.lower(): value for name, value in self.headers.items()}
+        status, body, headers = _handle_raw_request(self.server.app, method, self.path, raw_body, request_headers)
         self.send_response(status)
-        self.send_header("Content-Type", "application/json; charset=utf-8")
+        for name, value in headers.items():
+            self.send_header(name, value)
         self.send_header("Content-Length", str(len(body)))
         self.end_headers()
         self.wfile.write(body)
@@ -3237,6 +4737,10 @@ class InstructionHTTPServer(ThreadingHTTPServer):
         self.app = app
 
 
+def _raise_keyboard_interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
         description="Serveur de consignes pour génération manuelle de cas de succession."
@@ -3250,6 +4754,106 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--generation-target", type=int, default=None)
     parser.add_argument("--campaign-size", type=int, default=None)
     parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument(
+        "--summary-interval-ms",
+        type=int,
+        default=DEFAULT_SUMMARY_INTERVAL_MS,
+        help="Intervalle minimal entre deux réécritures de summary.json/summary.md.",
+    )
+    parser.add_argument(
+        "--no-write-behind",
+        dest="write_behind",
+        action="store_false",
+        help="Écrire les fichiers dérivés (résumés, fichiers par instruction, exports) dans la requête.",
+    )
+    parser.add_argument(
+        "--prefill-depth",
+        type=int,
+        default=DEFAULT_PREFILL_DEPTH,
+        help="Nombre d'instructions pré-générées d'avance (0 = génération dans la requête).",
+    )
+    parser.add_argument(
+        "--prefill-topic-depth",
+        type=int,
+        default=DEFAULT_PREFILL_TOPIC_DEPTH,
+        help="Profondeur des files par thème, pour les requêtes avec `topic`.",
+    )
+    parser.add_argument("--prefill-workers", type=int, default=DEFAULT_PREFILL_WORKERS)
+    parser.add_argument(
+        "--target-workers",
+        type=int,
+        default=0,
+        help="Processus dédiés à la génération des targets (0 = dans le processus du serveur).",
+    )
+    parser.add_argument(
+        "--state-backend",
+        choices=[STATE_BACKEND_JSONL, STATE_BACKEND_SQLITE],
+        default=STATE_BACKEND_JSONL,
+        help="Stockage de l'état : journaux JSONL + fichiers par id (défaut) ou base SQLite (WAL).",
+    )
+    parser.add_argument(
+        "--snapshot-interval-s",
+        type=float,
+        default=DEFAULT_SNAPSHOT_INTERVAL_S,
+        help="Intervalle minimal entre deux snapshots d'état (0 = uniquement à l'arrêt).",
+    )
+    parser.add_argument(
+        "--server",
+        choices=[SERVER_THREADING, SERVER_ASYNCIO],
+        default=SERVER_THREADING,
+        help="Front-end HTTP : un thread par connexion (défaut) ou asyncio avec keep-alive HTTP/1.1.",
+    )
+    parser.add_argument(
+        "--http-workers",
+        type=int,
+        default=DEFAULT_HTTP_WORKERS,
+        help="Threads qui exécutent les requêtes en mode `--server asyncio`.",
+    )
+    parser.add_argument(
+        "--max-body-bytes",
+        type=int,
+        default=DEFAULT_MAX_BODY_BYTES,
+        help="Taille maximale d'un corps de requête en mode `--server asyncio` (413 au-delà).",
+    )
+    parser.add_argument(
+        "--toon-backend",
+        choices=[TOON_BACKEND_PYTHON, TOON_BACKEND_CLI],
+        default=TOON_BACKEND_PYTHON,
+        help="Codec TOON : implémentation Python en process (défaut) ou CLI officiel via npx.",
+    )
+    parser.add_argument(
+        "--profile-requests",
+        type=int,
+        default=None,
+        help="Profiler les N premières requêtes (rapport dans <state-dir>/profiles/, voir /admin/profile).",
+    )
+    parser.add_argument(
+        "--profile-seconds",
+        type=float,
+        default=None,
+        help="Profiler les S premières secondes (avec --profile-requests : la première limite atteinte).",
+    )
+    parser.add_argument(
+        "--profile-mode",
+        choices=list(PROFILE_MODES),
+        default=PROFILE_MODE_CPROFILE,
+        help=(
+            "cprofile : un seul cProfile pendant toute la fenêtre, sur tous les threads ; "
+            "sample : échantillonnage des piles de tous les threads."
+        ),
+    )
+    parser.add_argument(
+        "--trace-sample-rate",
+        type=float,
+        default=0.0,
+        help="Part des requêtes tracées dans <state-dir>/traces.jsonl (0 = aucune, 1 = toutes).",
+    )
+    parser.add_argument(
+        "--trace-slow-ms",
+        type=float,
+        default=0.0,
+        help="Tracer aussi toute requête plus lente que ce seuil, même hors échantillon (0 = désactivé).",
+    )
     return parser.parse_args()
 
 
@@ -3266,8 +4870,20 @@ def main() -> None:
         target_total_cases=args.target_total_cases,
         generation_target=generation_target,
         seed=args.seed,
+        toon_backend=args.toon_backend,
+        write_behind=args.write_behind,
+        summary_interval_ms=args.summary_interval_ms,
+        prefill_depth=args.prefill_depth,
+        prefill_topic_depth=args.prefill_topic_depth,
+        prefill_workers=args.prefill_workers,
+        target_workers=args.target_workers,
+        state_backend=args.state_backend,
+        snapshot_interval_s=args.snapshot_interval_s,
+        trace_sample_rate=args.trace_sample_rate,
+        trace_slow_ms=args.trace_slow_ms,
     )
-    server = InstructionHTTPServer((args.host, args.port), app)
+    if args.profile_requests is not None or args.profile_seconds is not None:
+        app.profiler.start(mode=args.profile_mode, requests=args.profile_requests, seconds=args.profile_seconds)
     print(
         json.dumps(
             {
@@ -3278,16 +4894,43 @@ def main() -> None:
                 "master_schema_file": str(Path(args.master_schema_file)),
                 "target_total_cases": app.config["target_total_cases"],
                 "generation_target": app.config["generation_target"],
+                "toon_backend": app.toon_backend,
+                "write_behind": args.write_behind,
+                "prefill_depth": args.prefill_depth,
+                "target_workers": args.target_workers,
+                "server": args.server,
+                "state_backend": args.state_backend,
+                "startup": app.startup,
+                "migrations": app.migrations["applied"],
+                "profile": app.profiler.status()["session"],
             },
             ensure_ascii=False,
         )
     )
+    if args.server == SERVER_ASYNCIO:
+        async_server = AsyncHTTPServer(
+            lambda method, target, raw_body, headers: _handle_raw_request(app, method, target, raw_body, headers),
+            workers=args.http_workers,
+            max_body_bytes=args.max_body_bytes,
+        )
+        try:
+            asyncio.run(async_server.serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            app.close()
+        return
+
+    server = InstructionHTTPServer((args.host, args.port), app)
+    # SIGTERM goes through the same path as Ctrl+C so pending derived files get flushed.
+    signal.signal(signal.SIGTERM, _raise_keyboard_interrupt)
     try:
         server.serve_forever()
     except KeyboardInterrupt:
         pass
     finally:
         server.server_close()
+        app.close()
 
 
 if __name__ == "__main__":
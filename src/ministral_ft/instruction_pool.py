@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Callable
+
+DEFAULT_LANE = "default"
+MAX_TOPIC_LANES = 4
+
+
+@dataclass(slots=True)
+class PrefillSlot:
+    cursor: Any
+    instruction: dict[str, Any]
+    ready: bool = False
+    target: tuple[str, Any] | None = None
+    # Opaque to the pool: whatever `generate` returned alongside the target.
+    generation: Any = None
+    error: Exception | None = None
+
+
+@dataclass(slots=True)
+class PrefillLane:
+    cursor: Any
+    depth: int
+    slots: deque[PrefillSlot] = field(default_factory=deque)
+    stalled: bool = False
+
+
+class InstructionPool:
+    # Speculative issuance chains, one per lane (the default lane plus one per recently
+    # forced topic). Each lane starts from the current issue cursor and assumes its own
+    # entries are issued in order, so a pooled entry is exactly what the inline path
+    # would have built for that sequence. Issuing from one lane rebases every other lane.
+    #
+    # `reserve(cursor, topic)` builds the instruction and returns the cursor after it;
+    # it runs under the pool condition and must be cheap. `generate(instruction, cursor)`
+    # returns (target, generation details) and runs unlocked on the worker threads. Neither may take the
+    # app lock: the app holds it while calling take() and rebase().
+
+    def __init__(
+        self,
+        *,
+        depth: int,
+        topic_depth: int,
+        workers: int,
+        reserve: Callable[[Any, str | None], tuple[dict[str, Any], Any]],
+        generate: Callable[[dict[str, Any], Any], tuple[tuple[str, Any], Any]],
+    ) -> None:
+        self.depth = depth
+        self.topic_depth = topic_depth
+        self.reserve = reserve
+        self.generate = generate
+        self.cond = threading.Condition()
+        self.lanes: dict[str, PrefillLane] = {}
+        self.wanted_topics: list[str] = []
+        self.closed = False
+        self.hits = 0
+        self.misses = 0
+        self.discarded = 0
+        self.wait_ms = 0.0
+        self.threads = [
+            threading.Thread(target=self._run, name=f"instruction-prefill-{index}", daemon=True)
+            for index in range(max(1, workers))
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def take(self, topic: str | None, cursor: Any) -> PrefillSlot | None:
+        lane_key = topic or DEFAULT_LANE
+        with self.cond:
+            if topic is not None:
+                self._want_topic(topic)
+            lane = self.lanes.get(lane_key)
+            if lane is None or not lane.slots or lane.slots[0].cursor.token != cursor.token:
+                self.misses += 1
+                return None
+            head = lane.slots[0]
+            if not head.ready:
+                started = time.perf_counter()
+                while not head.ready and self.lanes.get(lane_key) is lane:
+                    self.cond.wait()
+                self.wait_ms += (time.perf_counter() - started) * 1000
+                if not head.ready:
+                    self.misses += 1
+                    return None
+            self.hits += 1
+            if head.error is None:
+                lane.slots.popleft()
+                self.cond.notify_all()
+            return head
+
+    def rebase(self, cursor: Any, *, consumed: str | None = None) -> None:
+        # `consumed` is the lane the issued instruction came from (None if built inline).
+        with self.cond:
+            keys = [DEFAULT_LANE, *self.wanted_topics]
+            for key in list(self.lanes):
+                if key not in keys:
+                    self.discarded += len(self.lanes.pop(key).slots)
+            for key in keys:
+                if consumed is not None and key == consumed and key in self.lanes:
+                    continue
+                previous = self.lanes.get(key)
+                if previous is not None:
+                    self.discarded += len(previous.slots)
+                depth = self.depth if key == DEFAULT_LANE else self.topic_depth
+                self.lanes[key] = PrefillLane(cursor=cursor, depth=depth)
+            self.cond.notify_all()
+
+    def close(self) -> None:
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        for thread in self.threads:
+            thread.join()
+
+    def stats(self) -> dict[str, Any]:
+        with self.cond:
+            lanes = {
+                key: {
+                    "ready": sum(1 for slot in lane.slots if slot.ready and slot.error is None),
+                    "in_flight": sum(1 for slot in lane.slots if not slot.ready),
+                    "depth": lane.depth,
+                    "stalled": lane.stalled,
+                }
+                for key, lane in self.lanes.items()
+            }
+            return {
+                "depth": self.depth,
+                "topic_depth": self.topic_depth,
+                "workers": len(self.threads),
+                "lanes": lanes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "discarded": self.discarded,
+                "wait_ms": round(self.wait_ms, 1),
+            }
+
+    def _want_topic(self, topic: str) -> None:
+        if topic in self.wanted_topics:
+            self.wanted_topics.remove(topic)
+        self.wanted_topics.insert(0, topic)
+        del self.wanted_topics[MAX_TOPIC_LANES:]
+
+    def _next_lane(self) -> tuple[str, PrefillLane] | None:
+        for key in (DEFAULT_LANE, *self.wanted_topics):
+            lane = self.lanes.get(key)
+            if lane is not None and not lane.stalled and len(lane.slots) < lane.depth:
+                return key, lane
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                job = self._next_lane()
+                while job is None and not self.closed:
+                    self.cond.wait()
+                    job = self._next_lane()
+                if self.closed:
+                    return
+                key, lane = job
+                topic = None if key == DEFAULT_LANE else key
+                try:
+                    instruction, next_cursor = self.reserve(lane.cursor, topic)
+                except Exception:
+                    # The inline path will hit (and report) the same failure.
+                    lane.stalled = True
+                    continue
+                slot = PrefillSlot(cursor=lane.cursor, instruction=instruction)
+                lane.slots.append(slot)
+                lane.cursor = next_cursor
+            try:
+                slot.target, slot.generation = self.generate(instruction, slot.cursor)
+            except Exception as exc:
+                slot.error = exc
+            with self.cond:
+                slot.ready = True
+                if slot.error is not None:
+                    lane.stalled = True
+                self.cond.notify_all()
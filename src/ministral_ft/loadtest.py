@@ -0,0 +1,497 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import http.client
+import json
+import platform
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from ministral_ft.case_instruction_bench import _percentile
+from ministral_ft.case_instruction_server import (
+    DEFAULT_CORPUS_FILE,
+    DEFAULT_SEED,
+    SERVER_ASYNCIO,
+    SERVER_THREADING,
+    _collect_named_values,
+    _normalize_target_toon,
+)
+from ministral_ft.state_store import STATE_BACKEND_JSONL, STATE_BACKEND_SQLITE
+
+DEFAULT_LOADTEST_SCHEMA_FILE = Path("data/loadtest/master_schema.json")
+DEFAULT_RESULTS_DIR = Path("data/loadtest/results")
+DEFAULT_AGENTS = [10, 50, 200]
+DEFAULT_DURATION_S = 15.0
+DEFAULT_REQUEST_TIMEOUT_S = 30.0
+DEFAULT_STARTUP_TIMEOUT_S = 120.0
+# Pause after a failed call, so an agent does not spin on a refusing server.
+ERROR_BACKOFF_S = 0.05
+ENDPOINT_NEXT = "POST /next-instruction"
+ENDPOINT_SUBMIT = "POST /submit-case"
+# "instruction inconnue: INS-0042" and "...: INS-0043" are the same error.
+ERROR_DIGITS_RE = re.compile(r"\d+")
+
+
+class _HTTPConnection:
+    # Minimal HTTP/1.1 JSON client over asyncio streams: keeps the connection open
+    # when the server allows it (`--server asyncio`), reconnects otherwise (the
+    # threading front-end answers in HTTP/1.0 and closes).
+
+    def __init__(self, host: str, port: int, *, accept_gzip: bool = False) -> None:
+        self.host = host
+        self.port = port
+        self.accept_gzip = accept_gzip
+        self.reader: asyncio.StreamReader | None = None
+        self.writer: asyncio.StreamWriter | None = None
+
+    async def request(self, method: str, path: str, payload: dict[str, Any] | None) -> tuple[int, Any, int]:
+        reused = self.writer is not None
+        try:
+            return await self._exchange(method, path, payload)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if not reused:
+                raise
+        # A kept-alive connection the server closed in the meantime: one retry.
+        return await self._exchange(method, path, payload)
+
+    async def _exchange(self, method: str, path: str, payload: dict[str, Any] | None) -> tuple[int, Any, int]:
+        # -> (status, decoded JSON body, body bytes on the wire)
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        assert self.reader is not None
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else b""
+        lines = [
+            f"{method} {path} HTTP/1.1",
+            f"Host: {self.host}:{self.port}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+        ]
+        if self.accept_gzip:
+            lines.append("Accept-Encoding: gzip")
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("ascii") + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connexion fermée par le serveur")
+        version, status, *_ = status_line.decode("latin-1").split(" ", 2)
+        headers: dict[str, str] = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if "content-length" in headers:
+            raw = await self.reader.readexactly(int(headers["content-length"]))
+        else:
+            raw = await self.reader.read()
+        connection = headers.get("connection", "").lower()
+        if connection == "close" or (version != "HTTP/1.1" and connection != "keep-alive"):
+            await self.close()
+        wire_bytes = len(raw)
+        if headers.get("content-encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        try:
+            return int(status), json.loads(raw) if raw else None, wire_bytes
+        except json.JSONDecodeError:
+            return int(status), raw.decode("utf-8", errors="replace"), wire_bytes
+
+    async def close(self) -> None:
+        writer, self.reader, self.writer = self.writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+
+class _Recorder:
+    # Latencies per endpoint (connection setup included), response bytes and the
+    # error mix.
+
+    def __init__(self) -> None:
+        self.samples_ms: dict[str, list[float]] = {ENDPOINT_NEXT: [], ENDPOINT_SUBMIT: []}
+        self.statuses: dict[str, Counter[str]] = {ENDPOINT_NEXT: Counter(), ENDPOINT_SUBMIT: Counter()}
+        self.response_bytes: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+
+    def record(
+        self,
+        endpoint: str,
+        started: float,
+        status: str,
+        error: str | None = None,
+        *,
+        wire_bytes: int = 0,
+    ) -> None:
+        self.samples_ms[endpoint].append((time.perf_counter() - started) * 1000)
+        self.statuses[endpoint][status] += 1
+        self.response_bytes[endpoint] += wire_bytes
+        if error is not None:
+            self.errors[f"{endpoint} {status} {ERROR_DIGITS_RE.sub('#', error)[:160]}".rstrip()] += 1
+
+
+def _case_text(target_toon: str, label: str) -> str:
+    # Same shape as the micro-benchmark's cases: the target names, in a sentence long
+    # enough not to be flagged.
+    _, decoded = _normalize_target_toon(target_toon)
+    names = ", ".join(_collect_named_values(decoded))
+    return (
+        f"Dossier de charge {label} : le défunt laisse plusieurs proches ({names}) "
+        "et une maison familiale dont le partage n'est pas encore réglé."
+    )
+
+
+async def _call(
+    connection: _HTTPConnection,
+    recorder: _Recorder,
+    endpoint: str,
+    payload: dict[str, Any],
+    timeout_s: float,
+) -> Any | None:
+    method, path = endpoint.split(" ", 1)
+    started = time.perf_counter()
+    try:
+        status, body, wire_bytes = await asyncio.wait_for(connection.request(method, path, payload), timeout_s)
+    except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as exc:
+        await connection.close()
+        recorder.record(endpoint, started, type(exc).__name__, str(exc) or type(exc).__name__)
+        return None
+    if status != 200:
+        error = body.get("error") if isinstance(body, dict) else body
+        recorder.record(endpoint, started, str(status), str(error or ""), wire_bytes=wire_bytes)
+        return None
+    recorder.record(endpoint, started, str(status), wire_bytes=wire_bytes)
+    return body
+
+
+async def _agent_loop(
+    index: int,
+    host: str,
+    port: int,
+    deadline: float,
+    recorder: _Recorder,
+    args: argparse.Namespace,
+) -> None:
+    connection = _HTTPConnection(host, port, accept_gzip=args.gzip)
+    agent_id = f"loadtest-{index}"
+    # Response options (see _call_agent_handler in the server).
+    options = {"include_coverage": True} if args.include_coverage else {}
+    round_index = 0
+    try:
+        while time.perf_counter() < deadline:
+            request = {"agent_id": agent_id, **options}
+            response = await _call(connection, recorder, ENDPOINT_NEXT, request, args.timeout_s)
+            if response is None:
+                await asyncio.sleep(ERROR_BACKOFF_S)
+                continue
+            instruction = response["instruction"]
+            case = {
+                "instruction_id": instruction["instruction_id"],
+                "agent_id": agent_id,
+                "case_text": _case_text(str(instruction.get("target_toon") or ""), f"{index}-{round_index}"),
+                **options,
+            }
+            if await _call(connection, recorder, ENDPOINT_SUBMIT, case, args.timeout_s) is None:
+                await asyncio.sleep(ERROR_BACKOFF_S)
+            round_index += 1
+            if args.think_ms > 0:
+                await asyncio.sleep(args.think_ms / 1000)
+    finally:
+        await connection.close()
+
+
+async def _drive(agents: int, host: str, port: int, args: argparse.Namespace) -> tuple[_Recorder, float]:
+    recorder = _Recorder()
+    started = time.perf_counter()
+    deadline = started + args.duration_s
+    await asyncio.gather(*(_agent_loop(index, host, port, deadline, recorder, args) for index in range(agents)))
+    return recorder, time.perf_counter() - started
+
+
+def _free_port(host: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return int(sock.getsockname()[1])
+
+
+def _get_json(host: str, port: int, path: str) -> dict[str, Any]:
+    connection = http.client.HTTPConnection(host, port, timeout=10)
+    try:
+        connection.request("GET", path)
+        return json.loads(connection.getresponse().read())
+    finally:
+        connection.close()
+
+
+def _server_command(state_dir: Path, port: int, args: argparse.Namespace) -> list[str]:
+    command = [
+        sys.executable,
+        "-m",
+        "ministral_ft.case_instruction_server",
+        "--host",
+        args.host,
+        "--port",
+        str(port),
+        "--state-dir",
+        str(state_dir),
+        "--corpus-file",
+        str(Path(args.corpus_file).resolve()),
+        "--master-schema-file",
+        str(Path(args.master_schema_file).resolve()),
+        "--target-total-cases",
+        str(10**9),
+        "--seed",
+        str(args.seed),
+        "--server",
+        args.server,
+        "--state-backend",
+        args.state_backend,
+        "--target-workers",
+        str(args.target_workers),
+    ]
+    if args.http_workers is not None:
+        command += ["--http-workers", str(args.http_workers)]
+    if args.prefill_depth is not None:
+        command += ["--prefill-depth", str(args.prefill_depth)]
+    return command
+
+
+def _start_server(state_dir: Path, args: argparse.Namespace) -> tuple[subprocess.Popen[bytes], int]:
+    # A separate process, so the agents' event loop does not share the server's GIL.
+    port = _free_port(args.host)
+    log = (state_dir / "server.log").open("wb")
+    process = subprocess.Popen(_server_command(state_dir, port, args), stdout=log, stderr=subprocess.STDOUT)
+    log.close()
+    deadline = time.perf_counter() + args.startup_timeout_s
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            _get_json(args.host, port, "/health")
+            return process, port
+        except OSError:
+            time.sleep(0.2)
+    _stop_server(process)
+    tail = (state_dir / "server.log").read_text(encoding="utf-8", errors="replace")[-2000:]
+    raise SystemExit(f"le serveur n'a pas démarré (code {process.returncode}) :\n{tail}")
+
+
+def _stop_server(process: subprocess.Popen[bytes]) -> None:
+    # SIGTERM: both front-ends flush their pending writes before exiting.
+    process.terminate()
+    try:
+        process.wait(timeout=60)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _endpoint_summary(samples_ms: list[float], statuses: Counter[str], response_bytes: int) -> dict[str, Any]:
+    return {
+        "requests": len(samples_ms),
+        "ok": statuses.get("200", 0),
+        "mean_response_bytes": round(response_bytes / len(samples_ms)) if samples_ms else 0,
+        "p50_ms": round(_percentile(samples_ms, 0.50), 3),
+        "p95_ms": round(_percentile(samples_ms, 0.95), 3),
+        "p99_ms": round(_percentile(samples_ms, 0.99), 3),
+        "max_ms": round(max(samples_ms), 3) if samples_ms else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+    }
+
+
+def run_level(agents: int, args: argparse.Namespace) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="instruction-loadtest-") as tmp:
+        state_dir = Path(tmp)
+        process, port = _start_server(state_dir, args)
+        try:
+            recorder, elapsed = asyncio.run(_drive(agents, args.host, port, args))
+            health = _get_json(args.host, port, "/health")
+        finally:
+            _stop_server(process)
+
+    requests = sum(len(samples) for samples in recorder.samples_ms.values())
+    cases = recorder.statuses[ENDPOINT_SUBMIT].get("200", 0)
+    return {
+        "agents": agents,
+        "elapsed_s": round(elapsed, 3),
+        "requests": requests,
+        "requests_per_s": round(requests / elapsed, 1) if elapsed else 0.0,
+        "cases": cases,
+        "cases_per_s": round(cases / elapsed, 1) if elapsed else 0.0,
+        "endpoints": {
+            endpoint: _endpoint_summary(samples, recorder.statuses[endpoint], recorder.response_bytes[endpoint])
+            for endpoint, samples in recorder.samples_ms.items()
+        },
+        "errors": dict(recorder.errors.most_common()),
+        # Cross-check with the server's own counts.
+        "server": {"issued": health.get("issued"), "submitted": health.get("submitted")},
+    }
+
+
+def _git(*command: str) -> str | None:
+    try:
+        completed = subprocess.run(["git", *command], capture_output=True, text=True, timeout=10, check=True)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return completed.stdout.strip()
+
+
+def _run_metadata(args: argparse.Namespace) -> dict[str, Any]:
+    status = _git("status", "--porcelain", "--untracked-files=no")
+    return {
+        "started_at": datetime.now(UTC).replace(microsecond=0).isoformat(),
+        "commit": _git("rev-parse", "HEAD"),
+        "dirty": bool(status) if status is not None else None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            "server": args.server,
+            "http_workers": args.http_workers,
+            "target_workers": args.target_workers,
+            "prefill_depth": args.prefill_depth,
+            "state_backend": args.state_backend,
+            "duration_s": args.duration_s,
+            "think_ms": args.think_ms,
+            "gzip": args.gzip,
+            "include_coverage": args.include_coverage,
+            "seed": args.seed,
+            "master_schema_file": str(args.master_schema_file),
+            "corpus_file": str(args.corpus_file),
+        },
+    }
+
+
+def run(args: argparse.Namespace) -> dict[str, Any]:
+    report = {"loadtest": _run_metadata(args), "results": [run_level(agents, args) for agents in args.agents]}
+    if args.out:
+        out = Path(args.out)
+    else:
+        stamp = datetime.now(UTC).strftime("%Y%m%dT%H%M%S")
+        commit = (report["loadtest"]["commit"] or "nogit")[:10]
+        out = DEFAULT_RESULTS_DIR / f"loadtest-{stamp}-{commit}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    report["out"] = str(out)
+    return report
+
+
+def _change(before: float, after: float) -> float | None:
+    return round((after - before) / before, 4) if before else None
+
+
+def compare(base: dict[str, Any], head: dict[str, Any]) -> dict[str, Any]:
+    # Relative change of throughput and latency percentiles, per agent count present
+    # in both runs (negative latency change = faster).
+    base_levels = {level["agents"]: level for level in base["results"]}
+    levels: list[dict[str, Any]] = []
+    for level in head["results"]:
+        previous = base_levels.get(level["agents"])
+        if previous is None:
+            continue
+        endpoints = {}
+        for endpoint, summary in level["endpoints"].items():
+            before = previous["endpoints"].get(endpoint)
+            if before is None:
+                continue
+            endpoints[endpoint] = {
+                key: {"base": before[key], "head": summary[key], "change": _change(before[key], summary[key])}
+                for key in ("p50_ms", "p95_ms", "p99_ms")
+            }
+        levels.append(
+            {
+                "agents": level["agents"],
+                "requests_per_s": {
+                    "base": previous["requests_per_s"],
+                    "head": level["requests_per_s"],
+                    "change": _change(previous["requests_per_s"], level["requests_per_s"]),
+                },
+                "endpoints": endpoints,
+                "errors": {"base": sum(previous["errors"].values()), "head": sum(level["errors"].values())},
+            }
+        )
+    return {
+        "base": {key: base["loadtest"].get(key) for key in ("commit", "started_at")},
+        "head": {key: head["loadtest"].get(key) for key in ("commit", "started_at")},
+        "levels": levels,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Test de charge du serveur de consignes : N agents HTTP concurrents (consigne puis soumission)."
+    )
+    parser.add_argument(
+        "command",
+        choices=["run", "compare"],
+        help="run : lance le serveur sur un état temporaire et le met en charge ; compare : deux résultats JSON.",
+    )
+    parser.add_argument("results", nargs="*", default=[], help="Compare : résultat de référence puis nouveau résultat.")
+    parser.add_argument(
+        "--agents",
+        type=lambda raw: [int(item) for item in raw.split(",") if item.strip()],
+        default=DEFAULT_AGENTS,
+        help="Nombres d'agents concurrents, séparés par des virgules (un serveur neuf par palier).",
+    )
+    parser.add_argument("--duration-s", type=float, default=DEFAULT_DURATION_S, help="Durée de chaque palier.")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause de chaque agent entre deux cycles.")
+    parser.add_argument("--gzip", action="store_true", help="Envoyer `Accept-Encoding: gzip` (réponses compressées).")
+    parser.add_argument(
+        "--include-coverage",
+        action="store_true",
+        help="Demander la couverture complète dans chaque réponse (comportement d'avant les réponses allégées).",
+    )
+    parser.add_argument("--timeout-s", type=float, default=DEFAULT_REQUEST_TIMEOUT_S, help="Délai maximal par requête.")
+    parser.add_argument("--startup-timeout-s", type=float, default=DEFAULT_STARTUP_TIMEOUT_S)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--corpus-file", default=str(DEFAULT_CORPUS_FILE))
+    parser.add_argument(
+        "--master-schema-file",
+        default=str(DEFAULT_LOADTEST_SCHEMA_FILE),
+        help="Schéma maître (défaut : le petit schéma de test fourni dans data/loadtest/).",
+    )
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--server", choices=[SERVER_THREADING, SERVER_ASYNCIO], default=SERVER_THREADING)
+    parser.add_argument("--http-workers", type=int, default=None)
+    parser.add_argument("--target-workers", type=int, default=0)
+    parser.add_argument("--prefill-depth", type=int, default=None)
+    parser.add_argument(
+        "--state-backend",
+        choices=[STATE_BACKEND_JSONL, STATE_BACKEND_SQLITE],
+        default=STATE_BACKEND_JSONL,
+    )
+    parser.add_argument(
+        "--out",
+        default=None,
+        help=f"Run : fichier de résultats (défaut : {DEFAULT_RESULTS_DIR}/loadtest-<date>-<commit>.json).",
+    )
+    return parser.parse_intermixed_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if args.command == "compare":
+        if len(args.results) != 2:
+            raise SystemExit("compare : deux fichiers de résultats attendus (référence, nouveau)")
+        base, head = (json.loads(Path(path).read_text(encoding="utf-8")) for path in args.results)
+        report = compare(base, head)
+    else:
+        report = run(args)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Any
+
+from ministral_ft.tracing import record_span
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds. Stages (a validator, a TOON encode) sit in the tens of microseconds,
+# requests in the milliseconds, so the buckets start low.
+LATENCY_BUCKETS = (
+    0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+LOCK_WAIT_BUCKETS = (0.000001, 0.00001, 0.0001, 0.001, 0.01, 0.1, 1.0, 10.0)
+
+
+def _escape_label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels_text(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = labelnames
+        self.lock = threading.Lock()
+
+    def _check_labels(self, labels: tuple[str, ...]) -> None:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name}: {len(self.labelnames)} labels attendus, reçu {len(labels)}")
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}", *self._samples()]
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, labels: tuple[str, ...] = (), amount: float = 1.0) -> None:
+        self._check_labels(labels)
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def _samples(self) -> list[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        return [
+            f"{self.name}{_labels_text(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.values: dict[tuple[str, ...], float] = {} if labelnames else {(): 0.0}
+
+    def add(self, amount: float, labels: tuple[str, ...] = ()) -> None:
+        self._check_labels(labels)
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def set(self, value: float, labels: tuple[str, ...] = ()) -> None:
+        self._check_labels(labels)
+        with self.lock:
+            self.values[labels] = value
+
+    def _samples(self) -> list[str]:
+        with self.lock:
+            values = sorted(self.values.items())
+        return [
+            f"{self.name}{_labels_text(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        *,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (last one is +Inf), sum, count]; counts are
+        # stored per bucket and made cumulative when rendered.
+        self.series: dict[tuple[str, ...], list[Any]] = {}
+
+    def observe(self, value: float, labels: tuple[str, ...] = ()) -> None:
+        self._check_labels(labels)
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, labels: tuple[str, ...] = ()) -> "_Timer":
+        return _Timer(self, labels)
+
+    def _samples(self) -> list[str]:
+        with self.lock:
+            series = sorted(
+                (labels, (list(counts), total, count))
+                for labels, (counts, total, count) in self.series.items()
+            )
+        lines: list[str] = []
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = _labels_text(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            labels_text = _labels_text(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{labels_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels_text} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: tuple[str, ...]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, self.labels)
+
+
+class MetricsRegistry:
+    # Just enough of the Prometheus client for /metrics: counters, gauges and
+    # histograms with fixed label names, rendered in the text exposition format.
+
+    def __init__(self) -> None:
+        self.metrics: list[_Metric] = []
+
+    def _register(self, metric: Any) -> Any:
+        if any(existing.name == metric.name for existing in self.metrics):
+            raise ValueError(f"métrique déjà enregistrée: {metric.name}")
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: tuple[str, ...] = (),
+        *,
+        buckets: tuple[float, ...] = LATENCY_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets=buckets))
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimings:
+    # (stage, offset, seconds) laps of one unit of work, the offset counted from the
+    # creation of the StageTimings. Recorded where the work runs (possibly a
+    # --target-workers process) and replayed into a Histogram, and a trace, by the
+    # caller; the laps are plain tuples so they pickle with the result.
+
+    __slots__ = ("laps", "started")
+
+    def __init__(self) -> None:
+        self.laps: list[tuple[str, float, float]] = []
+        self.started = time.perf_counter()
+
+    def stage(self, name: str) -> "_Lap":
+        return _Lap(self, name)
+
+
+class _Lap:
+    __slots__ = ("timings", "name", "started")
+
+    def __init__(self, timings: StageTimings, name: str) -> None:
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        timings = self.timings
+        timings.laps.append((self.name, self.started - timings.started, time.perf_counter() - self.started))
+
+
+class TimedLock:
+    # Drop-in for threading.Lock in `with` blocks that records how long each
+    # acquisition waited; an uncontended acquisition is recorded as 0 without
+    # reading the clock. Contended waits also become a span of the current trace.
+
+    __slots__ = ("lock", "histogram", "labels", "span_args")
+
+    def __init__(self, histogram: Histogram, name: str) -> None:
+        self.lock = threading.Lock()
+        self.histogram = histogram
+        self.labels = (name,)
+        self.span_args = {"lock": name}
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self.lock.acquire(False):
+            self.histogram.observe(0.0, self.labels)
+            return True
+        if not blocking:
+            return False
+        started = time.perf_counter()
+        acquired = self.lock.acquire(True, timeout)
+        if acquired:
+            waited = time.perf_counter() - started
+            self.histogram.observe(waited, self.labels)
+            record_span("lock_wait", started, waited, self.span_args, cat="lock")
+        return acquired
+
+    def release(self) -> None:
+        self.lock.release()
+
+    def locked(self) -> bool:
+        return self.lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.lock.release()
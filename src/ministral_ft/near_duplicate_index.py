@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import struct
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+# 32 bands x 4 rows puts the LSH threshold around J=0.42: a pair at the 0.72
+# near-duplicate cut-off becomes a candidate with probability > 0.9999, while
+# pairs below ~0.3 are mostly never compared.
+MINHASH_NUM_PERM = 128
+MINHASH_BANDS = 32
+MINHASH_SEED = 1
+HASHES_PER_DIGEST = 16
+INDEX_FORMAT_VERSION = 1
+
+
+def _digest_keys(num_perm: int, seed: int) -> list[bytes]:
+    # One keyed 64-byte blake2b digest yields 16 independent 32-bit hash values,
+    # so a 128-permutation signature costs 8 C-level digests per token.
+    count = -(-num_perm // HASHES_PER_DIGEST)
+    return [f"minhash:{seed}:{index}".encode("ascii") for index in range(count)]
+
+
+def normalized_key_digest(normalized_key: str) -> str:
+    return hashlib.sha1(normalized_key.encode("utf-8")).hexdigest()
+
+
+class JsonlIndexStore:
+    # Default persistence: a header line followed by one JSON line per entry.
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def read(self, header: dict[str, Any]) -> dict[str, tuple[str, bytes]]:
+        if not self.path.exists():
+            return {}
+        persisted: dict[str, tuple[str, bytes]] = {}
+        with self.path.open("r", encoding="utf-8") as handle:
+            header_line = handle.readline().strip()
+            try:
+                stored_header = json.loads(header_line) if header_line else None
+            except json.JSONDecodeError:
+                return {}
+            if stored_header != header:
+                return {}
+            for raw_line in handle:
+                line = raw_line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                    persisted[str(row["ref"])] = (str(row["key"]), base64.b64decode(row["bands"]))
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    # A torn trailing line is recomputed by sync().
+                    continue
+        return persisted
+
+    def append(self, ref_id: str, key_digest: str, band_keys: bytes) -> None:
+        with self.path.open("a", encoding="utf-8") as handle:
+            handle.write(self._entry_line(ref_id, key_digest, band_keys))
+
+    def rewrite(self, header: dict[str, Any], entries: Iterable[tuple[str, str, bytes]]) -> None:
+        with self.path.open("w", encoding="utf-8") as handle:
+            handle.write(json.dumps(header) + "\n")
+            for ref_id, key_digest, band_keys in entries:
+                handle.write(self._entry_line(ref_id, key_digest, band_keys))
+
+    def _entry_line(self, ref_id: str, key_digest: str, band_keys: bytes) -> str:
+        return json.dumps(
+            {"ref": ref_id, "key": key_digest, "bands": base64.b64encode(band_keys).decode("ascii")},
+            ensure_ascii=False,
+        ) + "\n"
+
+
+class NearDuplicateIndex:
+    # `store` persists entries (JsonlIndexStore, or the SQLite state store's table);
+    # it needs read(header), append(ref_id, key_digest, band_keys) and
+    # rewrite(header, entries).
+
+    def __init__(
+        self,
+        store: Any | None = None,
+        *,
+        num_perm: int = MINHASH_NUM_PERM,
+        bands: int = MINHASH_BANDS,
+        seed: int = MINHASH_SEED,
+    ) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm doit être un multiple de bands")
+        self.store = store
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.seed = seed
+        self.digest_keys = _digest_keys(num_perm, seed)
+        self.unpack = struct.Struct(f"<{HASHES_PER_DIGEST}I").unpack
+        self.buckets: list[dict[bytes, list[str]]] = [{} for _ in range(bands)]
+        self.exact_keys: dict[str, str] = {}
+        self.ordinals: dict[str, int] = {}
+        self.entries: dict[str, tuple[str, bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self.ordinals)
+
+    def _header(self) -> dict[str, Any]:
+        return {
+            "version": INDEX_FORMAT_VERSION,
+            "num_perm": self.num_perm,
+            "bands": self.bands,
+            "seed": self.seed,
+        }
+
+    def signature(self, tokens: Iterable[str]) -> list[int]:
+        rows: list[tuple[int, ...]] = []
+        for token in tokens:
+            encoded = token.encode("utf-8")
+            row: tuple[int, ...] = ()
+            for key in self.digest_keys:
+                row += self.unpack(hashlib.blake2b(encoded, digest_size=64, key=key).digest())
+            rows.append(row)
+        if not rows:
+            return []
+        return list(map(min, zip(*rows)))[: self.num_perm]
+
+    def band_keys(self, tokens: Iterable[str]) -> bytes:
+        signature = self.signature(tokens)
+        if not signature:
+            return b""
+        keys = bytearray()
+        for band in range(self.bands):
+            start = band * self.rows_per_band
+            chunk = b"".join(
+                value.to_bytes(4, "little") for value in signature[start:start + self.rows_per_band]
+            )
+            keys.extend(hashlib.blake2b(chunk, digest_size=8).digest())
+        return bytes(keys)
+
+    def _insert(self, ref_id: str, key_digest: str, band_keys: bytes) -> None:
+        self.ordinals[ref_id] = len(self.ordinals)
+        self.entries[ref_id] = (key_digest, band_keys)
+        self.exact_keys.setdefault(key_digest, ref_id)
+        for band in range(len(band_keys) // 8):
+            self.buckets[band].setdefault(band_keys[band * 8:(band + 1) * 8], []).append(ref_id)
+
+    def add(self, ref_id: str, *, normalized_key: str, tokens: Iterable[str], persist: bool = True) -> None:
+        if ref_id in self.ordinals:
+            return
+        key_digest = normalized_key_digest(normalized_key)
+        band_keys = self.band_keys(tokens)
+        self._insert(ref_id, key_digest, band_keys)
+        if persist and self.store is not None:
+            self.store.append(ref_id, key_digest, band_keys)
+
+    def exact_match(self, normalized_key: str) -> str | None:
+        return self.exact_keys.get(normalized_key_digest(normalized_key))
+
+    def candidates(self, tokens: Iterable[str]) -> list[str]:
+        band_keys = self.band_keys(tokens)
+        found: set[str] = set()
+        for band in range(len(band_keys) // 8):
+            found.update(self.buckets[band].get(band_keys[band * 8:(band + 1) * 8], ()))
+        # Insertion order mirrors the former linear scan (seeds first, then submissions).
+        return sorted(found, key=self.ordinals.__getitem__)
+
+    def rewrite(self) -> None:
+        if self.store is None:
+            return
+        self.store.rewrite(
+            self._header(),
+            ((ref_id, *self.entries[ref_id]) for ref_id in self.ordinals),
+        )
+
+    def restore(self, known: Callable[[str], bool]) -> bool:
+        # Trusts the persisted entries without re-reading the texts (the caller vouches
+        # for them, e.g. through a state snapshot); entries whose ref is no longer
+        # `known` are dropped. Returns False when nothing usable was persisted.
+        persisted = self.store.read(self._header()) if self.store is not None else {}
+        stale = False
+        for ref_id, (key_digest, band_keys) in persisted.items():
+            if known(ref_id):
+                self._insert(ref_id, key_digest, band_keys)
+            else:
+                stale = True
+        if stale:
+            self.rewrite()
+        return bool(persisted)
+
+    def sync(self, references: Iterable[tuple[str, str, Any]]) -> None:
+        # `references` yields (ref_id, normalized_key, tokens_or_callable) in scan order.
+        # Persisted band keys are reused when the normalized text did not change;
+        # anything missing or stale is recomputed, and the file is compacted if needed.
+        persisted = self.store.read(self._header()) if self.store is not None else {}
+        dirty = not persisted
+        for ref_id, normalized_key, tokens in references:
+            if ref_id in self.ordinals:
+                continue
+            key_digest = normalized_key_digest(normalized_key)
+            cached = persisted.pop(ref_id, None)
+            if cached is not None and cached[0] == key_digest:
+                self._insert(ref_id, key_digest, cached[1])
+                continue
+            dirty = True
+            resolved = tokens() if callable(tokens) else tokens
+            self._insert(ref_id, key_digest, self.band_keys(resolved))
+        if persisted:
+            dirty = True
+        if dirty:
+            self.rewrite()
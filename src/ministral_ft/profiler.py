@@ -0,0 +1,269 @@
+from __future__ import annotations
+
+import cProfile
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Callable
+
+PROFILES_DIRNAME = "profiles"
+PROFILE_MODE_CPROFILE = "cprofile"
+PROFILE_MODE_SAMPLE = "sample"
+PROFILE_MODES = (PROFILE_MODE_CPROFILE, PROFILE_MODE_SAMPLE)
+DEFAULT_PROFILE_REQUESTS = 50
+# Upper bound of any session, so a window of N requests on an idle server still ends.
+DEFAULT_PROFILE_MAX_SECONDS = 300.0
+# Longest a POST /admin/profile with "wait": true holds its HTTP worker.
+MAX_PROFILE_WAIT_SECONDS = 60.0
+DEFAULT_SAMPLE_INTERVAL_MS = 10.0
+DEFAULT_PROFILE_TOP = 25
+# (module, function) of leaf frames of threads parked on a queue, a condition or a
+# selector: counted as idle and left out of the top functions (they stay in the
+# collapsed stacks).
+IDLE_LEAF_FRAMES = {
+    ("threading", "wait"),
+    ("threading", "_wait_for_tstate_lock"),
+    ("selectors", "select"),
+    ("queue", "get"),
+    ("thread", "_worker"),
+    ("connection", "wait"),
+}
+# "http-worker_3", "Thread-27 (process_request_thread)": one stack root per pool.
+THREAD_NUMBER_RE = re.compile(r"[-_]\d+")
+
+
+def _frame_label(code: Any) -> str:
+    return f"{Path(code.co_filename).stem}.{getattr(code, 'co_qualname', code.co_name)}"
+
+
+def _is_idle_frame(code: Any) -> bool:
+    return (Path(code.co_filename).stem, code.co_name) in IDLE_LEAF_FRAMES
+
+
+class ProfileSession:
+    # One profiling window: the next `requests` requests, or `seconds`, whichever
+    # comes first. Both modes are process-wide: cprofile enables one profiler for the
+    # whole window (since 3.12 it records every thread, so concurrent requests, the
+    # prefill threads and the write-behind thread all land in the same .pstats);
+    # sample reads the stacks of every thread every `interval_ms`.
+
+    def __init__(
+        self,
+        *,
+        mode: str,
+        requests: int | None,
+        seconds: float | None,
+        interval_ms: float,
+        top: int,
+    ) -> None:
+        self.mode = mode
+        self.requests = requests
+        self.seconds = seconds if seconds is not None else DEFAULT_PROFILE_MAX_SECONDS
+        self.interval_s = interval_ms / 1000
+        self.top = top
+        self.started_at = datetime.now(UTC)
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.done = threading.Event()
+        self.finished = threading.Event()
+        self.profiled = 0
+        self.stats: pstats.Stats | None = None
+        self.stacks: Counter[str] = Counter()
+        self.samples = 0
+        self.idle_samples = 0
+        self.self_samples: Counter[str] = Counter()
+        self.total_samples: Counter[str] = Counter()
+        self.report: dict[str, Any] | None = None
+
+    def _count_request(self) -> None:
+        with self.lock:
+            self.profiled += 1
+            if self.requests is not None and self.profiled >= self.requests:
+                self.done.set()
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        # Requests are only counted here; the profiler itself covers the whole process.
+        try:
+            return func(*args)
+        finally:
+            self._count_request()
+
+    def _profile_until_done(self) -> None:
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            self.done.wait(self.seconds)
+        finally:
+            profile.disable()
+        try:
+            self.stats = pstats.Stats(profile)
+        except TypeError:
+            # Nothing was recorded (pstats refuses an empty profile).
+            self.stats = None
+
+    def _sample_until_done(self) -> None:
+        own_ident = threading.get_ident()
+        deadline = self.started + self.seconds
+        while not self.done.wait(self.interval_s) and time.perf_counter() < deadline:
+            names = {thread.ident: THREAD_NUMBER_RE.sub("", thread.name) for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                idle = _is_idle_frame(frame.f_code)
+                labels: list[str] = []
+                while frame is not None:
+                    labels.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                if not labels:
+                    continue
+                labels.reverse()
+                self.samples += 1
+                self.stacks[";".join([names.get(ident, str(ident)), *labels])] += 1
+                if idle:
+                    self.idle_samples += 1
+                    continue
+                self.self_samples[labels[-1]] += 1
+                self.total_samples.update(set(labels))
+
+    def wait_window(self) -> None:
+        if self.mode == PROFILE_MODE_SAMPLE:
+            self._sample_until_done()
+        else:
+            self._profile_until_done()
+        self.done.set()
+
+    def progress(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "started_at": self.started_at.replace(microsecond=0).isoformat(),
+            "elapsed_s": round(time.perf_counter() - self.started, 3),
+            "requests": self.requests,
+            "seconds": self.seconds,
+            "scope": "process",
+            "profiled": self.profiled,
+            "samples": self.samples,
+        }
+
+    def write_report(self, out_dir: Path) -> dict[str, Any]:
+        # Called once the window is over and the profiler disabled.
+        out_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"profile-{self.started_at.strftime('%Y%m%dT%H%M%S')}-{self.mode}"
+        report = self.progress()
+        if self.mode == PROFILE_MODE_SAMPLE:
+            path = out_dir / f"{stem}.collapsed"
+            path.write_text(
+                "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items())),
+                encoding="utf-8",
+            )
+            busy = max(1, self.samples - self.idle_samples)
+            report["interval_ms"] = self.interval_s * 1000
+            report["idle_samples"] = self.idle_samples
+            report["top"] = [
+                {
+                    "function": function,
+                    "self": count,
+                    "total": self.total_samples[function],
+                    "self_share": round(count / busy, 4),
+                }
+                for function, count in self.self_samples.most_common(self.top)
+            ]
+        else:
+            path = out_dir / f"{stem}.pstats"
+            report["top"] = []
+            if self.stats is not None:
+                self.stats.dump_stats(path)
+                rows = sorted(self.stats.stats.items(), key=lambda item: -item[1][2])  # type: ignore[attr-defined]
+                report["total_s"] = round(self.stats.total_tt, 6)  # type: ignore[attr-defined]
+                report["top"] = [
+                    {
+                        "function": f"{Path(filename).name}:{line}({name})",
+                        "calls": calls,
+                        "tottime": round(tottime, 6),
+                        "cumtime": round(cumtime, 6),
+                    }
+                    for (filename, line, name), (_, calls, tottime, cumtime, _) in rows[: self.top]
+                ]
+        report["file"] = str(path) if path.exists() else None
+        return report
+
+
+class RequestProfiler:
+    # Entry point used by the server: `active` is the only thing read per request
+    # while no session runs.
+
+    def __init__(self, out_dir: Path) -> None:
+        self.out_dir = out_dir
+        self.lock = threading.Lock()
+        self.active = False
+        self.session: ProfileSession | None = None
+        self.last_report: dict[str, Any] | None = None
+
+    def start(
+        self,
+        *,
+        mode: str = PROFILE_MODE_CPROFILE,
+        requests: int | None = None,
+        seconds: float | None = None,
+        interval_ms: float = DEFAULT_SAMPLE_INTERVAL_MS,
+        top: int = DEFAULT_PROFILE_TOP,
+    ) -> ProfileSession:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"mode de profilage inconnu: {mode} (attendu: {', '.join(PROFILE_MODES)})")
+        if requests is not None and requests <= 0:
+            raise ValueError("requests doit être un entier positif")
+        if seconds is not None and seconds <= 0:
+            raise ValueError("seconds doit être positif")
+        if interval_ms <= 0:
+            raise ValueError("interval_ms doit être positif")
+        if requests is None and seconds is None:
+            requests = DEFAULT_PROFILE_REQUESTS
+        session = ProfileSession(
+            mode=mode,
+            requests=requests,
+            seconds=seconds,
+            interval_ms=interval_ms,
+            top=max(1, top),
+        )
+        with self.lock:
+            if self.session is not None:
+                raise ValueError("profilage déjà en cours")
+            self.session = session
+            self.active = True
+        threading.Thread(target=self._watch, args=(session,), name="profiler", daemon=True).start()
+        return session
+
+    def _watch(self, session: ProfileSession) -> None:
+        session.wait_window()
+        with self.lock:
+            self.active = False
+            self.session = None
+        session.report = session.write_report(self.out_dir)
+        self.last_report = session.report
+        session.finished.set()
+
+    def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        session = self.session
+        if session is None:
+            return func(*args)
+        return session.run(func, *args)
+
+    def stop(self, timeout: float | None = None) -> dict[str, Any] | None:
+        session = self.session
+        if session is None:
+            return self.last_report
+        session.done.set()
+        session.finished.wait(timeout)
+        return session.report
+
+    def status(self) -> dict[str, Any]:
+        session = self.session
+        return {
+            "active": session is not None,
+            "session": session.progress() if session is not None else None,
+            "last_report": self.last_report,
+        }
@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Iterator
+
+ARCHIVE_DIRNAME = "archive"
+ARCHIVE_INDEX_FILENAME = "index.jsonl"
+DEFAULT_SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+KIND_INSTRUCTION = "instruction"
+KIND_SUBMISSION = "submission"
+EXPANDED_DIRNAMES = {KIND_INSTRUCTION: "instructions", KIND_SUBMISSION: "submissions"}
+
+
+def _truncate_torn_tail(path: Path) -> None:
+    # A crash mid-append leaves a last line without its newline; cut it so the next
+    # append starts on a fresh line instead of being glued to the torn bytes.
+    if not path.exists():
+        return
+    with path.open("r+b") as handle:
+        size = handle.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            handle.seek(start)
+            newline = handle.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            handle.truncate(end)
+
+
+def _index_line(kind: str, record_id: str, entry: tuple[int, int, int]) -> str:
+    segment, offset, length = entry
+    payload = {"kind": kind, "id": record_id, "segment": segment, "offset": offset, "length": length}
+    return json.dumps(payload, ensure_ascii=False) + "\n"
+
+
+class SegmentArchive:
+    # Append-only replacement for the per-id JSON files: records go to rotating
+    # segment files (segment-000001.jsonl, ...) and an append-only index maps
+    # (kind, id) to (segment, offset, length). A record written again (an instruction
+    # issued, then submitted) simply gets a newer index entry; the latest one wins.
+    #
+    # The index is only loaded on the first lookup, so appending costs nothing at
+    # startup. Entries lost between a segment write and its index write are
+    # recovered from the segment tails; a torn last line is cut at startup.
+
+    def __init__(self, directory: Path, *, segment_max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.index_path = directory / ARCHIVE_INDEX_FILENAME
+        self.segment_max_bytes = segment_max_bytes
+        self.lock = threading.Lock()
+        self.offsets: dict[tuple[str, str], tuple[int, int, int]] | None = None
+        self.segment = max(self._segment_numbers(), default=1)
+        _truncate_torn_tail(self._segment_path(self.segment))
+        _truncate_torn_tail(self.index_path)
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"segment-{number:06d}.jsonl"
+
+    def _segment_numbers(self) -> list[int]:
+        return sorted(int(path.stem.split("-", 1)[1]) for path in self.directory.glob("segment-*.jsonl"))
+
+    def append(self, kind: str, record_id: str, record: dict[str, Any]) -> None:
+        line = (
+            json.dumps({"kind": kind, "id": record_id, "record": record}, ensure_ascii=False) + "\n"
+        ).encode("utf-8")
+        with self.lock:
+            path = self._segment_path(self.segment)
+            size = path.stat().st_size if path.exists() else 0
+            if size and size + len(line) > self.segment_max_bytes:
+                self.segment += 1
+                path = self._segment_path(self.segment)
+            with path.open("ab") as handle:
+                offset = handle.tell()
+                handle.write(line)
+            self._write_index_entry(kind, record_id, (self.segment, offset, len(line)))
+
+    def _write_index_entry(self, kind: str, record_id: str, entry: tuple[int, int, int]) -> None:
+        with self.index_path.open("a", encoding="utf-8") as handle:
+            handle.write(_index_line(kind, record_id, entry))
+        if self.offsets is not None:
+            self.offsets[(kind, record_id)] = entry
+
+    def _ensure_index(self) -> dict[tuple[str, str], tuple[int, int, int]]:
+        # Called under self.lock.
+        if self.offsets is not None:
+            return self.offsets
+        offsets: dict[tuple[str, str], tuple[int, int, int]] = {}
+        indexed_end: dict[int, int] = {}
+        torn = False
+        if self.index_path.exists():
+            with self.index_path.open("r", encoding="utf-8") as handle:
+                for raw_line in handle:
+                    try:
+                        row = json.loads(raw_line)
+                        entry = (int(row["segment"]), int(row["offset"]), int(row["length"]))
+                    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                        torn = True
+                        continue
+                    offsets[(str(row["kind"]), str(row["id"]))] = entry
+                    indexed_end[entry[0]] = max(indexed_end.get(entry[0], 0), entry[1] + entry[2])
+        if torn:
+            # Compacted, so the next append does not land on a torn line.
+            with self.index_path.open("w", encoding="utf-8") as handle:
+                for (kind, record_id), entry in offsets.items():
+                    handle.write(_index_line(kind, record_id, entry))
+        self.offsets = offsets
+        for number in self._segment_numbers():
+            path = self._segment_path(number)
+            if path.stat().st_size <= indexed_end.get(number, 0):
+                continue
+            torn_at: int | None = None
+            with path.open("rb") as handle:
+                offset = handle.seek(indexed_end.get(number, 0))
+                for raw_line in handle:
+                    try:
+                        row = json.loads(raw_line)
+                    except json.JSONDecodeError:
+                        torn_at = offset
+                        break
+                    self._write_index_entry(str(row["kind"]), str(row["id"]), (number, offset, len(raw_line)))
+                    offset += len(raw_line)
+            if torn_at is not None:
+                # Same as for the index: later appends must not follow the torn bytes.
+                with path.open("r+b") as handle:
+                    handle.truncate(torn_at)
+        return offsets
+
+    def _read_entry(self, entry: tuple[int, int, int]) -> dict[str, Any]:
+        segment, offset, length = entry
+        with self._segment_path(segment).open("rb") as handle:
+            handle.seek(offset)
+            return json.loads(handle.read(length))["record"]
+
+    def get(self, kind: str, record_id: str) -> dict[str, Any] | None:
+        with self.lock:
+            entry = self._ensure_index().get((kind, record_id))
+        return self._read_entry(entry) if entry is not None else None
+
+    def keys(self) -> list[tuple[str, str]]:
+        with self.lock:
+            return list(self._ensure_index())
+
+    def records(self) -> Iterator[tuple[str, str, dict[str, Any]]]:
+        # Latest version of every record, in first-written order.
+        for kind, record_id in self.keys():
+            record = self.get(kind, record_id)
+            if record is not None:
+                yield kind, record_id, record
+
+    def reset(self) -> None:
+        with self.lock:
+            for number in self._segment_numbers():
+                self._segment_path(number).unlink()
+            self.index_path.unlink(missing_ok=True)
+            self.offsets = {}
+            self.segment = 1
+
+    def stats(self) -> dict[str, Any]:
+        numbers = self._segment_numbers()
+        return {
+            "segments": len(numbers),
+            "bytes": sum(self._segment_path(number).stat().st_size for number in numbers),
+        }
+
+
+def expand_archive(archive: SegmentArchive, out_dir: Path) -> dict[str, int]:
+    # Back to the historical one-pretty-printed-file-per-id layout, for the manual
+    # review waves.
+    counts = {kind: 0 for kind in EXPANDED_DIRNAMES}
+    for kind, dirname in EXPANDED_DIRNAMES.items():
+        (out_dir / dirname).mkdir(parents=True, exist_ok=True)
+    for kind, record_id, record in archive.records():
+        dirname = EXPANDED_DIRNAMES.get(kind)
+        if dirname is None:
+            continue
+        target = out_dir / dirname / f"{record_id}.json"
+        target.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+        counts[kind] += 1
+    return counts
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Archive segmentée des instructions et soumissions du serveur de consignes."
+    )
+    parser.add_argument(
+        "command",
+        choices=["expand", "get", "stats"],
+        help="expand : un fichier JSON par id ; get : affiche un enregistrement ; stats : taille de l'archive.",
+    )
+    parser.add_argument("--state-dir", default="data/case_instruction_server")
+    parser.add_argument("--out", default=None, help="Expand : dossier cible (défaut : --state-dir).")
+    parser.add_argument("--kind", choices=sorted(EXPANDED_DIRNAMES), default=KIND_INSTRUCTION)
+    parser.add_argument("record_id", nargs="?", default=None, help="Get : identifiant (ex. INS-0001).")
+    return parser.parse_intermixed_args()
+
+
+def main() -> None:
+    args = parse_args()
+    state_dir = Path(args.state_dir)
+    archive = SegmentArchive(state_dir / ARCHIVE_DIRNAME)
+    if args.command == "expand":
+        out_dir = Path(args.out) if args.out else state_dir
+        report: Any = {"out": str(out_dir), **expand_archive(archive, out_dir)}
+    elif args.command == "get":
+        if not args.record_id:
+            raise SystemExit("get : identifiant manquant")
+        report = archive.get(args.kind, args.record_id)
+        if report is None:
+            raise SystemExit(f"{args.kind} introuvable : {args.record_id}")
+    else:
+        report = {**archive.stats(), "records": len(archive.keys())}
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import json
+from typing import Any, Callable
+
+from ministral_ft.segment_archive import EXPANDED_DIRNAMES
+from ministral_ft.state_snapshot import SNAPSHOT_FILENAME, discard_snapshot
+
+# Bump together with a new entry in MIGRATIONS. A state directory records the last
+# version applied (state_version.json, or `meta` for SQLite), so each migration runs
+# exactly once instead of rescanning the journals at every startup.
+STATE_VERSION = 2
+# Per-id files that could not be packed into the archive are moved here, not deleted.
+QUARANTINE_DIRNAME = "quarantine"
+
+
+def _sanitize_issued_row(row: dict[str, Any]) -> tuple[dict[str, Any], bool]:
+    changed = False
+    updated = dict(row)
+
+    response_format = updated.get("response_format")
+    if isinstance(response_format, dict):
+        rf = dict(response_format)
+        required_keys = rf.get("required_keys")
+        if isinstance(required_keys, list) and "target_json" in required_keys:
+            rf["required_keys"] = [
+                "target_toon" if key == "target_json" else key
+                for key in required_keys
+            ]
+            changed = True
+        if "target_json_rule" in rf:
+            toon_rule = rf.pop("target_json_rule")
+            if "target_toon_rule" not in rf and isinstance(toon_rule, str):
+                rf["target_toon_rule"] = toon_rule.replace("JSON", "TOON")
+            changed = True
+        updated["response_format"] = rf
+
+    submission_contract = updated.get("submission_contract")
+    if isinstance(submission_contract, dict):
+        sc = dict(submission_contract)
+        required_fields = sc.get("required_fields")
+        if isinstance(required_fields, list) and "target_json" in required_fields:
+            sc["required_fields"] = [
+                "target_toon" if key == "target_json" else key
+                for key in required_fields
+            ]
+            changed = True
+        if "target_json_rule" in sc:
+            toon_rule = sc.pop("target_json_rule")
+            if "target_toon_rule" not in sc and isinstance(toon_rule, str):
+                sc["target_toon_rule"] = toon_rule.replace("JSON", "TOON")
+            changed = True
+        updated["submission_contract"] = sc
+
+    prompt = updated.get("prompt")
+    if isinstance(prompt, str) and "target_json" in prompt:
+        updated["prompt"] = prompt.replace("target_json", "target_toon").replace(
+            "JSON cible rempli",
+            "TOON cible valide",
+        )
+        changed = True
+    return updated, changed
+
+
+def _sanitize_submitted_row(row: dict[str, Any]) -> tuple[dict[str, Any] | None, bool]:
+    changed = False
+    updated = dict(row)
+    if "target_json" in updated:
+        updated.pop("target_json", None)
+        changed = True
+    target_toon = updated.get("target_toon")
+    if not isinstance(target_toon, str):
+        return None, True
+    cleaned = "\n".join(
+        line.rstrip()
+        for line in target_toon.replace("\r\n", "\n").replace("\r", "\n").strip("\n").splitlines()
+    )
+    if not cleaned:
+        return None, True
+    if cleaned != target_toon:
+        updated["target_toon"] = cleaned
+        changed = True
+    return updated, changed
+
+
+def _migrate_target_json_to_toon(store: Any) -> dict[str, Any]:
+    # The former startup sanitization: target_json -> target_toon in issued prompts and
+    # contracts, normalized TOON in submissions, rows without a usable target dropped.
+    issued_changed = False
+    sanitized_issued: list[dict[str, Any]] = []
+    for row in store.load_issued():
+        updated, changed = _sanitize_issued_row(row)
+        issued_changed = issued_changed or changed
+        sanitized_issued.append(updated)
+    if issued_changed:
+        store.rewrite_issued(sanitized_issued)
+
+    submitted_changed = False
+    sanitized_submitted: list[dict[str, Any]] = []
+    submitted_rows = store.load_submitted()
+    for row in submitted_rows:
+        updated, changed = _sanitize_submitted_row(row)
+        submitted_changed = submitted_changed or changed
+        if updated is not None:
+            sanitized_submitted.append(updated)
+    if submitted_changed:
+        store.rewrite_submitted(sanitized_submitted)
+
+    legacy_instruction_file = store.state_dir / "_last_instruction.json"
+    if legacy_instruction_file.exists():
+        try:
+            payload = json.loads(legacy_instruction_file.read_text(encoding="utf-8"))
+            if isinstance(payload, dict) and "target_json" in json.dumps(payload, ensure_ascii=False):
+                legacy_instruction_file.unlink(missing_ok=True)
+        except Exception:
+            # Keep the migration robust even if this legacy file is malformed.
+            legacy_instruction_file.unlink(missing_ok=True)
+    return {
+        "issued_rewritten": issued_changed,
+        "submitted_rewritten": submitted_changed,
+        "submitted_dropped": len(submitted_rows) - len(sanitized_submitted),
+    }
+
+
+def _migrate_per_id_files_to_archive(store: Any) -> dict[str, Any]:
+    # instructions/*.json and submissions/*.json -> segmented archive, then removed.
+    # Stores without an archive (SQLite) keep whatever is on disk. Unreadable or
+    # non-object files must not stop the server from starting: they are moved to
+    # quarantine/<dirname>/ and listed in the report.
+    archive = getattr(store, "archive", None)
+    packed = {kind: 0 for kind in EXPANDED_DIRNAMES}
+    quarantined: list[str] = []
+    if archive is None:
+        return {"packed": packed, "quarantined": quarantined}
+    for kind, dirname in EXPANDED_DIRNAMES.items():
+        directory = store.state_dir / dirname
+        if not directory.is_dir():
+            continue
+        for path in sorted(directory.glob("*.json")):
+            try:
+                payload = json.loads(path.read_text(encoding="utf-8"))
+            except (json.JSONDecodeError, UnicodeDecodeError):
+                payload = None
+            if isinstance(payload, dict):
+                archive.append(kind, path.stem, payload)
+                packed[kind] += 1
+                path.unlink()
+                continue
+            quarantine = store.state_dir / QUARANTINE_DIRNAME / dirname
+            quarantine.mkdir(parents=True, exist_ok=True)
+            path.replace(quarantine / path.name)
+            quarantined.append(f"{dirname}/{path.name}")
+        if not any(directory.iterdir()):
+            directory.rmdir()
+    return {"packed": packed, "quarantined": quarantined}
+
+
+MIGRATIONS: tuple[tuple[int, str, Callable[[Any], dict[str, Any]]], ...] = (
+    (1, "target_json_to_toon", _migrate_target_json_to_toon),
+    (2, "per_id_files_to_archive", _migrate_per_id_files_to_archive),
+)
+
+
+def pending_migrations(store: Any) -> list[tuple[int, str, Callable[[Any], dict[str, Any]]]]:
+    current = store.state_version()
+    if current is None:
+        # A fresh state directory starts at the current version; journals written
+        # before versioning existed start at 0.
+        if store.is_empty():
+            store.set_state_version(STATE_VERSION)
+            return []
+        current = 0
+    return [migration for migration in MIGRATIONS if migration[0] > current]
+
+
+def migrate_state(store: Any) -> dict[str, Any]:
+    applied: list[dict[str, Any]] = []
+    for version, name, migration in pending_migrations(store):
+        report = migration(store)
+        store.set_state_version(version)
+        applied.append({"version": version, "name": name, **report})
+    if applied:
+        # Journals may have been rewritten: offsets in the snapshot are stale.
+        discard_snapshot(store.state_dir / SNAPSHOT_FILENAME)
+    return {"state_version": store.state_version(), "applied": applied}
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+SNAPSHOT_FILENAME = "state_snapshot.json"
+SNAPSHOT_FORMAT_VERSION = 1
+DEFAULT_SNAPSHOT_INTERVAL_S = 60.0
+JOURNAL_ROW_CACHE_SIZE = 4096
+
+
+class JournalRows:
+    # List-like view of a journal: only row locators (`refs`, see the state stores)
+    # stay in memory, rows are read back on access and kept in a small LRU. Rows
+    # appended by this process are cached, so recent lookups never hit the disk.
+
+    def __init__(
+        self,
+        read: Callable[[Any], dict[str, Any]],
+        refs: list[Any] | None = None,
+        *,
+        cursor: Any = 0,
+        cache_size: int = JOURNAL_ROW_CACHE_SIZE,
+    ) -> None:
+        self.read = read
+        self.refs: list[Any] = list(refs or [])
+        self.cursor = cursor
+        self.cache_size = cache_size
+        self.cache: OrderedDict[int, dict[str, Any]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.refs)
+
+    def __iter__(self) -> Iterator[dict[str, Any]]:
+        for position in range(len(self.refs)):
+            yield self[position]
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self.refs)))]
+        position = index + len(self.refs) if index < 0 else index
+        if not 0 <= position < len(self.refs):
+            raise IndexError(index)
+        with self.lock:
+            row = self.cache.get(position)
+            if row is not None:
+                self.cache.move_to_end(position)
+                return row
+        row = self.read(self.refs[position])
+        self._remember(position, row)
+        return row
+
+    def append(self, ref: Any, row: dict[str, Any]) -> int:
+        self.refs.append(ref)
+        position = len(self.refs) - 1
+        self._remember(position, row)
+        return position
+
+    def _remember(self, position: int, row: dict[str, Any]) -> None:
+        with self.lock:
+            self.cache[position] = row
+            self.cache.move_to_end(position)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+
+def read_snapshot(path: Path) -> dict[str, Any] | None:
+    # A missing, torn or foreign snapshot only costs a full rescan.
+    try:
+        payload = json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+        return None
+    if not isinstance(payload, dict) or payload.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+    return payload
+
+
+def write_snapshot(path: Path, payload: dict[str, Any]) -> None:
+    # Written aside and renamed, so a crash leaves either the old or the new snapshot.
+    payload = {"format_version": SNAPSHOT_FORMAT_VERSION, **payload}
+    staging = path.with_name(path.name + ".tmp")
+    staging.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    os.replace(staging, path)
+
+
+def discard_snapshot(path: Path) -> None:
+    path.unlink(missing_ok=True)
@@ -0,0 +1,630 @@
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Callable, Iterable
+
+from ministral_ft.near_duplicate_index import JsonlIndexStore
+from ministral_ft.segment_archive import ARCHIVE_DIRNAME, KIND_INSTRUCTION, KIND_SUBMISSION, SegmentArchive
+
+STATE_BACKEND_JSONL = "jsonl"
+STATE_BACKEND_SQLITE = "sqlite"
+ISSUED_FILENAME = "issued_instructions.jsonl"
+SUBMITTED_FILENAME = "generated_cases.jsonl"
+NEAR_DUPLICATE_INDEX_FILENAME = "near_duplicate_index.jsonl"
+SQLITE_FILENAME = "state.sqlite3"
+SQLITE_SCHEMA_VERSION = 1
+STATE_VERSION_FILENAME = "state_version.json"
+JOURNAL_ISSUED = "issued"
+JOURNAL_SUBMITTED = "submitted"
+FINGERPRINT_WINDOW_BYTES = 4096
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS instructions (
+    seq INTEGER PRIMARY KEY,
+    instruction_id TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS instructions_by_id ON instructions (instruction_id);
+CREATE TABLE IF NOT EXISTS submissions (
+    position INTEGER PRIMARY KEY,
+    instruction_id TEXT NOT NULL,
+    body TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_by_id ON submissions (instruction_id);
+CREATE TABLE IF NOT EXISTS dimension_counts (
+    dimension TEXT NOT NULL,
+    value TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (dimension, value)
+);
+CREATE TABLE IF NOT EXISTS near_duplicates (
+    ordinal INTEGER PRIMARY KEY,
+    ref_id TEXT NOT NULL UNIQUE,
+    key_digest TEXT NOT NULL,
+    bands BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS near_duplicates_by_key ON near_duplicates (key_digest);
+"""
+
+
+def load_jsonl(path: Path) -> list[dict[str, Any]]:
+    if not path.exists():
+        return []
+    rows: list[dict[str, Any]] = []
+    with path.open("r", encoding="utf-8") as handle:
+        for raw_line in handle:
+            line = raw_line.strip()
+            if not line:
+                continue
+            payload = json.loads(line)
+            if isinstance(payload, dict):
+                rows.append(payload)
+    return rows
+
+
+def rewrite_jsonl(path: Path, rows: list[dict[str, Any]]) -> None:
+    with path.open("w", encoding="utf-8") as handle:
+        for row in rows:
+            handle.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def file_fingerprint(path: Path, size: int) -> str | None:
+    # Cheap identity of the first `size` bytes of an append-only file: its length and
+    # a hash of the bytes just before that point. None when the file is shorter.
+    try:
+        with path.open("rb") as handle:
+            handle.seek(0, 2)
+            if handle.tell() < size:
+                return None
+            start = max(0, size - FINGERPRINT_WINDOW_BYTES)
+            handle.seek(start)
+            window = handle.read(size - start)
+    except FileNotFoundError:
+        return None if size else f"0:{hashlib.sha1(b'').hexdigest()}"
+    return f"{size}:{hashlib.sha1(window).hexdigest()}"
+
+
+def instruction_record(instruction: dict[str, Any], submission: dict[str, Any] | None) -> dict[str, Any]:
+    payload = dict(instruction)
+    payload["status"] = "submitted" if submission is not None else "issued"
+    if submission is not None:
+        payload["submission"] = submission
+    return payload
+
+
+def _dimension_pairs(rows: Iterable[dict[str, Any]], dimensions: tuple[str, ...]) -> dict[tuple[str, str], int]:
+    pairs: dict[tuple[str, str], int] = {}
+    for row in rows:
+        values = row.get("dimensions")
+        if not isinstance(values, dict):
+            continue
+        for dimension in dimensions:
+            value = values.get(dimension)
+            if isinstance(value, str) and value:
+                pairs[(dimension, value)] = pairs.get((dimension, value), 0) + 1
+    return pairs
+
+
+class JsonlStateStore:
+    # The historical layout: two append-only journals, plus the instruction and
+    # submission records for the manual review waves in a segmented archive (see
+    # segment_archive). Journal rows are located by byte offset; a journal cursor is
+    # the offset just past its last row.
+
+    backend = STATE_BACKEND_JSONL
+
+    def __init__(self, state_dir: Path) -> None:
+        self.state_dir = state_dir
+        self.issued_path = state_dir / ISSUED_FILENAME
+        self.submitted_path = state_dir / SUBMITTED_FILENAME
+        self.archive = SegmentArchive(state_dir / ARCHIVE_DIRNAME)
+        self.version_path = state_dir / STATE_VERSION_FILENAME
+        self.read_lock = threading.Lock()
+        self.readers: dict[str, Any] = {}
+
+    def _journal_path(self, journal: str) -> Path:
+        return self.issued_path if journal == JOURNAL_ISSUED else self.submitted_path
+
+    def load_issued(self) -> list[dict[str, Any]]:
+        return load_jsonl(self.issued_path)
+
+    def load_submitted(self) -> list[dict[str, Any]]:
+        return load_jsonl(self.submitted_path)
+
+    def load_dimension_counts(self, issued_count: int) -> dict[str, dict[str, int]] | None:
+        # Counters are not persisted in this layout; the caller recounts the journal.
+        return None
+
+    def scan(self, journal: str, cursor: int = 0) -> tuple[list[tuple[int, dict[str, Any]]], int]:
+        # Rows from `cursor` to the end of the journal, with their offsets.
+        path = self._journal_path(journal)
+        if not path.exists():
+            return [], cursor
+        entries: list[tuple[int, dict[str, Any]]] = []
+        with path.open("rb") as handle:
+            handle.seek(cursor)
+            offset = cursor
+            for raw_line in handle:
+                if raw_line.strip():
+                    payload = json.loads(raw_line)
+                    if isinstance(payload, dict):
+                        entries.append((offset, payload))
+                offset += len(raw_line)
+        return entries, offset
+
+    def read(self, journal: str, ref: int) -> dict[str, Any]:
+        with self.read_lock:
+            handle = self.readers.get(journal)
+            if handle is None:
+                handle = self.readers[journal] = self._journal_path(journal).open("rb")
+            handle.seek(ref)
+            return json.loads(handle.readline())
+
+    def fingerprint(self, journal: str, cursor: int) -> str | None:
+        return file_fingerprint(self._journal_path(journal), cursor)
+
+    def append(self, journal: str, rows: list[dict[str, Any]]) -> tuple[list[int], int]:
+        # One open and one write for a whole batch; returns the rows' offsets and the new cursor.
+        encoded = [(json.dumps(row, ensure_ascii=False) + "\n").encode("utf-8") for row in rows]
+        refs: list[int] = []
+        with self._journal_path(journal).open("ab") as handle:
+            offset = handle.tell()
+            for line in encoded:
+                refs.append(offset)
+                offset += len(line)
+            handle.write(b"".join(encoded))
+        return refs, offset
+
+    def rewrite_issued(self, rows: list[dict[str, Any]]) -> None:
+        self._close_readers()
+        rewrite_jsonl(self.issued_path, rows)
+
+    def rewrite_submitted(self, rows: list[dict[str, Any]]) -> None:
+        self._close_readers()
+        rewrite_jsonl(self.submitted_path, rows)
+
+    def state_version(self) -> int | None:
+        if not self.version_path.exists():
+            return None
+        payload = json.loads(self.version_path.read_text(encoding="utf-8"))
+        return int(payload.get("version", 0)) if isinstance(payload, dict) else 0
+
+    def set_state_version(self, version: int) -> None:
+        self.version_path.write_text(json.dumps({"version": version}) + "\n", encoding="utf-8")
+
+    def is_empty(self) -> bool:
+        return not any(path.exists() and path.stat().st_size for path in (self.issued_path, self.submitted_path))
+
+    def archive_instruction(self, instruction: dict[str, Any], submission: dict[str, Any] | None) -> None:
+        self.archive.append(
+            KIND_INSTRUCTION,
+            str(instruction["instruction_id"]),
+            instruction_record(instruction, submission),
+        )
+
+    def archive_submission(self, submission: dict[str, Any]) -> None:
+        self.archive.append(KIND_SUBMISSION, str(submission["instruction_id"]), submission)
+
+    def recover_archive(
+        self,
+        issued: list[dict[str, Any]],
+        submitted: list[dict[str, Any]],
+        instruction_for: Callable[[str], dict[str, Any] | None],
+    ) -> int:
+        # Archive records are written behind, so a crash can lose the ones for the last
+        # journal rows. Re-appends what is missing for the given rows (the journal tail
+        # after the snapshot, or everything after a full scan). Returns the records written.
+        if not issued and not submitted:
+            return 0
+        present = set(self.archive.keys())
+        submissions: dict[str, dict[str, Any]] = {}
+        for row in submitted:
+            if row.get("instruction_id"):
+                submissions.setdefault(str(row["instruction_id"]), row)
+        written = 0
+        for instruction in issued:
+            instruction_id = str(instruction.get("instruction_id") or "")
+            if instruction_id and (KIND_INSTRUCTION, instruction_id) not in present:
+                self.archive_instruction(instruction, submissions.get(instruction_id))
+                present.add((KIND_INSTRUCTION, instruction_id))
+                written += 1
+        for instruction_id, submission in submissions.items():
+            if (KIND_SUBMISSION, instruction_id) not in present:
+                self.archive_submission(submission)
+                written += 1
+            archived = self.archive.get(KIND_INSTRUCTION, instruction_id)
+            if archived is not None and archived.get("status") == "submitted":
+                continue
+            instruction = instruction_for(instruction_id)
+            if instruction is not None:
+                self.archive_instruction(instruction, submission)
+                written += 1
+        return written
+
+    def near_duplicate_store(self) -> JsonlIndexStore:
+        return JsonlIndexStore(self.state_dir / NEAR_DUPLICATE_INDEX_FILENAME)
+
+    def close(self) -> None:
+        self._close_readers()
+
+    def _close_readers(self) -> None:
+        with self.read_lock:
+            for handle in self.readers.values():
+                handle.close()
+            self.readers.clear()
+
+
+class SqliteStateStore:
+    # Instructions, submissions, dimension counters and the near-duplicate index in one
+    # WAL-mode database. Rows keep the exact JSON of the journals, so the JSONL layout
+    # can be regenerated at any time (see `export`). Nothing is archived: the tables
+    # already answer lookups by instruction_id. Journal rows are located by
+    # their rowid (seq / position); a journal cursor is the last rowid seen.
+
+    backend = STATE_BACKEND_SQLITE
+
+    def __init__(self, state_dir: Path, *, counted_dimensions: tuple[str, ...] = ()) -> None:
+        self.state_dir = state_dir
+        self.path = state_dir / SQLITE_FILENAME
+        self.counted_dimensions = counted_dimensions
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.executescript(SQLITE_SCHEMA)
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT OR IGNORE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(SQLITE_SCHEMA_VERSION),),
+            )
+
+    def _transaction(self) -> "_Transaction":
+        return _Transaction(self)
+
+    def _load_bodies(self, table: str, order: str) -> list[dict[str, Any]]:
+        with self.lock:
+            rows = self.connection.execute(f"SELECT body FROM {table} ORDER BY {order}").fetchall()
+        loaded: list[dict[str, Any]] = []
+        for (body,) in rows:
+            payload = json.loads(body)
+            if isinstance(payload, dict):
+                loaded.append(payload)
+        return loaded
+
+    def load_issued(self) -> list[dict[str, Any]]:
+        return self._load_bodies("instructions", "seq")
+
+    def load_submitted(self) -> list[dict[str, Any]]:
+        return self._load_bodies("submissions", "position")
+
+    def load_dimension_counts(self, issued_count: int) -> dict[str, dict[str, int]] | None:
+        # Only trusted when they were maintained against the same number of rows.
+        with self.lock:
+            stored = self.connection.execute(
+                "SELECT value FROM meta WHERE key = 'counted_instructions'"
+            ).fetchone()
+            if stored is None or int(stored[0]) != issued_count:
+                return None
+            rows = self.connection.execute("SELECT dimension, value, count FROM dimension_counts").fetchall()
+        counts: dict[str, dict[str, int]] = {dimension: {} for dimension in self.counted_dimensions}
+        for dimension, value, count in rows:
+            if dimension in counts:
+                counts[dimension][value] = int(count)
+        return counts
+
+    def scan(self, journal: str, cursor: int = 0) -> tuple[list[tuple[int, dict[str, Any]]], int]:
+        table, key = _JOURNAL_TABLES[journal]
+        with self.lock:
+            rows = self.connection.execute(
+                f"SELECT {key}, body FROM {table} WHERE {key} > ? ORDER BY {key}",
+                (cursor,),
+            ).fetchall()
+        entries: list[tuple[int, dict[str, Any]]] = []
+        for ref, body in rows:
+            payload = json.loads(body)
+            if isinstance(payload, dict):
+                entries.append((int(ref), payload))
+        return entries, int(rows[-1][0]) if rows else cursor
+
+    def read(self, journal: str, ref: int) -> dict[str, Any]:
+        table, key = _JOURNAL_TABLES[journal]
+        with self.lock:
+            (body,) = self.connection.execute(f"SELECT body FROM {table} WHERE {key} = ?", (ref,)).fetchone()
+        return json.loads(body)
+
+    def fingerprint(self, journal: str, cursor: int) -> str | None:
+        # Row count up to the cursor plus a hash of the row at the cursor: a rewrite
+        # (migration, import) renumbers or changes rows and invalidates it.
+        table, key = _JOURNAL_TABLES[journal]
+        with self.lock:
+            (count,) = self.connection.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE {key} <= ?", (cursor,)
+            ).fetchone()
+            row = self.connection.execute(f"SELECT body FROM {table} WHERE {key} = ?", (cursor,)).fetchone()
+        if cursor and row is None:
+            return None
+        body = row[0].encode("utf-8") if row is not None else b""
+        return f"{count}:{hashlib.sha1(body).hexdigest()}"
+
+    def append(self, journal: str, rows: list[dict[str, Any]]) -> tuple[list[int], int]:
+        table, _ = _JOURNAL_TABLES[journal]
+        refs: list[int] = []
+        with self._transaction() as cursor:
+            for row in rows:
+                cursor.execute(
+                    f"INSERT INTO {table} (instruction_id, body) VALUES (?, ?)",
+                    (str(row.get("instruction_id") or ""), json.dumps(row, ensure_ascii=False)),
+                )
+                refs.append(int(cursor.lastrowid))
+            if journal == JOURNAL_ISSUED:
+                self._add_dimension_counts(cursor, rows)
+        return refs, refs[-1] if refs else 0
+
+    def state_version(self) -> int | None:
+        with self.lock:
+            stored = self.connection.execute("SELECT value FROM meta WHERE key = 'state_version'").fetchone()
+        return int(stored[0]) if stored is not None else None
+
+    def set_state_version(self, version: int) -> None:
+        with self._transaction() as cursor:
+            cursor.execute(
+                "INSERT INTO meta (key, value) VALUES ('state_version', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (str(version),),
+            )
+
+    def is_empty(self) -> bool:
+        with self.lock:
+            issued = self.connection.execute("SELECT 1 FROM instructions LIMIT 1").fetchone()
+            submitted = self.connection.execute("SELECT 1 FROM submissions LIMIT 1").fetchone()
+        return issued is None and submitted is None
+
+    def rewrite_issued(self, rows: list[dict[str, Any]]) -> None:
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM instructions")
+            cursor.execute("DELETE FROM dimension_counts")
+            cursor.execute("DELETE FROM meta WHERE key = 'counted_instructions'")
+            cursor.executemany(
+                "INSERT INTO instructions (seq, instruction_id, body) VALUES (?, ?, ?)",
+                [
+                    (index, str(row.get("instruction_id") or ""), json.dumps(row, ensure_ascii=False))
+                    for index, row in enumerate(rows, start=1)
+                ],
+            )
+            self._add_dimension_counts(cursor, rows)
+
+    def rewrite_submitted(self, rows: list[dict[str, Any]]) -> None:
+        with self._transaction() as cursor:
+            cursor.execute("DELETE FROM submissions")
+            cursor.executemany(
+                "INSERT INTO submissions (position, instruction_id, body) VALUES (?, ?, ?)",
+                [
+                    (index, str(row.get("instruction_id") or ""), json.dumps(row, ensure_ascii=False))
+                    for index, row in enumerate(rows, start=1)
+                ],
+            )
+
+    def archive_instruction(self, instruction: dict[str, Any], submission: dict[str, Any] | None) -> None:
+        return
+
+    def archive_submission(self, submission: dict[str, Any]) -> None:
+        return
+
+    def recover_archive(
+        self,
+        issued: list[dict[str, Any]],
+        submitted: list[dict[str, Any]],
+        instruction_for: Callable[[str], dict[str, Any] | None],
+    ) -> int:
+        return 0
+
+    def near_duplicate_store(self) -> "SqliteIndexStore":
+        return SqliteIndexStore(self)
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
+
+    def _add_dimension_counts(self, cursor: sqlite3.Cursor, rows: list[dict[str, Any]]) -> None:
+        pairs = _dimension_pairs(rows, self.counted_dimensions)
+        cursor.executemany(
+            "INSERT INTO dimension_counts (dimension, value, count) VALUES (?, ?, ?) "
+            "ON CONFLICT (dimension, value) DO UPDATE SET count = count + excluded.count",
+            [(dimension, value, count) for (dimension, value), count in pairs.items()],
+        )
+        cursor.execute("SELECT COUNT(*) FROM instructions")
+        (total,) = cursor.fetchone()
+        cursor.execute(
+            "INSERT INTO meta (key, value) VALUES ('counted_instructions', ?) "
+            "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (str(total),),
+        )
+
+
+_JOURNAL_TABLES = {
+    JOURNAL_ISSUED: ("instructions", "seq"),
+    JOURNAL_SUBMITTED: ("submissions", "position"),
+}
+
+
+class _Transaction:
+    def __init__(self, store: SqliteStateStore) -> None:
+        self.store = store
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self.store.lock.acquire()
+        self.cursor = self.store.connection.cursor()
+        self.cursor.execute("BEGIN IMMEDIATE")
+        return self.cursor
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        try:
+            self.cursor.execute("COMMIT" if exc_type is None else "ROLLBACK")
+        finally:
+            self.cursor.close()
+            self.store.lock.release()
+
+
+class SqliteIndexStore:
+    # NearDuplicateIndex persistence on the `near_duplicates` table; the index header
+    # lives in `meta` so parameter changes invalidate the stored signatures.
+
+    def __init__(self, store: SqliteStateStore) -> None:
+        self.store = store
+
+    def read(self, header: dict[str, Any]) -> dict[str, tuple[str, bytes]]:
+        with self.store.lock:
+            stored = self.store.connection.execute(
+                "SELECT value FROM meta WHERE key = 'near_duplicate_header'"
+            ).fetchone()
+            if stored is None or json.loads(stored[0]) != header:
+                return {}
+            rows = self.store.connection.execute(
+                "SELECT ref_id, key_digest, bands FROM near_duplicates ORDER BY ordinal"
+            ).fetchall()
+        return {str(ref_id): (str(key_digest), bytes(bands)) for ref_id, key_digest, bands in rows}
+
+    def append(self, ref_id: str, key_digest: str, band_keys: bytes) -> None:
+        with self.store._transaction() as cursor:
+            cursor.execute(
+                "INSERT OR REPLACE INTO near_duplicates (ref_id, key_digest, bands) VALUES (?, ?, ?)",
+                (ref_id, key_digest, band_keys),
+            )
+
+    def rewrite(self, header: dict[str, Any], entries: Iterable[tuple[str, str, bytes]]) -> None:
+        with self.store._transaction() as cursor:
+            cursor.execute("DELETE FROM near_duplicates")
+            cursor.executemany(
+                "INSERT INTO near_duplicates (ref_id, key_digest, bands) VALUES (?, ?, ?)",
+                list(entries),
+            )
+            cursor.execute(
+                "INSERT INTO meta (key, value) VALUES ('near_duplicate_header', ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (json.dumps(header),),
+            )
+
+
+def open_state_store(
+    state_dir: Path,
+    backend: str,
+    *,
+    counted_dimensions: tuple[str, ...] = (),
+) -> JsonlStateStore | SqliteStateStore:
+    if backend == STATE_BACKEND_SQLITE:
+        return SqliteStateStore(state_dir, counted_dimensions=counted_dimensions)
+    if backend == STATE_BACKEND_JSONL:
+        return JsonlStateStore(state_dir)
+    raise ValueError(f"backend d'état inconnu: {backend}")
+
+
+def import_jsonl(state_dir: Path, *, counted_dimensions: tuple[str, ...] = ()) -> dict[str, Any]:
+    # JSONL journals -> state.sqlite3 (replaces the tables, journals are left untouched).
+    source = JsonlStateStore(state_dir)
+    issued = source.load_issued()
+    submitted = source.load_submitted()
+    target = SqliteStateStore(state_dir, counted_dimensions=counted_dimensions)
+    try:
+        target.rewrite_issued(issued)
+        target.rewrite_submitted(submitted)
+        state_version = source.state_version()
+        if state_version is not None:
+            target.set_state_version(state_version)
+        index_source = source.near_duplicate_store()
+        header_line = ""
+        if index_source.path.exists():
+            with index_source.path.open("r", encoding="utf-8") as handle:
+                header_line = handle.readline().strip()
+        if header_line:
+            header = json.loads(header_line)
+            entries = index_source.read(header)
+            target.near_duplicate_store().rewrite(
+                header,
+                [(ref_id, key_digest, bands) for ref_id, (key_digest, bands) in entries.items()],
+            )
+    finally:
+        target.close()
+    return {"database": str(target.path), "instructions": len(issued), "submissions": len(submitted)}
+
+
+def export_jsonl(state_dir: Path, *, archive: bool = True) -> dict[str, Any]:
+    # state.sqlite3 -> JSONL journals (and the archive used for manual review).
+    source = SqliteStateStore(state_dir)
+    try:
+        issued = source.load_issued()
+        submitted = source.load_submitted()
+        state_version = source.state_version()
+    finally:
+        source.close()
+    target = JsonlStateStore(state_dir)
+    target.rewrite_issued(issued)
+    target.rewrite_submitted(submitted)
+    if state_version is not None:
+        target.set_state_version(state_version)
+    if archive:
+        target.archive.reset()
+        submissions = {str(row.get("instruction_id")): row for row in submitted}
+        for instruction in issued:
+            target.archive_instruction(instruction, submissions.get(str(instruction.get("instruction_id"))))
+        for submission in submitted:
+            target.archive_submission(submission)
+    return {"state_dir": str(state_dir), "instructions": len(issued), "submissions": len(submitted)}
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Conversion et migration de l'état du serveur de consignes (JSONL / SQLite)."
+    )
+    parser.add_argument(
+        "command",
+        choices=["import", "export", "migrate"],
+        help="import : JSONL -> SQLite ; export : SQLite -> JSONL ; migrate : applique les migrations en attente.",
+    )
+    parser.add_argument("--state-dir", default="data/case_instruction_server")
+    parser.add_argument(
+        "--backend",
+        choices=[STATE_BACKEND_JSONL, STATE_BACKEND_SQLITE],
+        default=STATE_BACKEND_JSONL,
+        help="Migrate : backend d'état à migrer.",
+    )
+    parser.add_argument(
+        "--no-archive",
+        dest="archive",
+        action="store_false",
+        help="Export : ne pas régénérer l'archive des instructions et soumissions.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    state_dir = Path(args.state_dir)
+    if args.command == "import":
+        from ministral_ft.case_instruction_server import COUNTED_DIMENSIONS
+
+        report = import_jsonl(state_dir, counted_dimensions=COUNTED_DIMENSIONS)
+    elif args.command == "migrate":
+        from ministral_ft.case_instruction_server import COUNTED_DIMENSIONS
+        from ministral_ft.state_migrations import migrate_state
+
+        store = open_state_store(state_dir, args.backend, counted_dimensions=COUNTED_DIMENSIONS)
+        try:
+            report = migrate_state(store)
+        finally:
+            store.close()
+    else:
+        report = export_jsonl(state_dir, archive=args.archive)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
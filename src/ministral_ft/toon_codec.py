@@ -0,0 +1,644 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import re
+import shutil
+import subprocess
+import tempfile
+from decimal import Decimal
+from pathlib import Path
+from typing import Any, Callable
+
+TOON_INDENT = 2
+TOON_DELIMITER = ","
+TOON_CLI_COMMAND = ["npx", "-y", "@toon-format/cli"]
+UNQUOTED_KEY_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_.]*")
+NUMERIC_LIKE_RE = re.compile(r"^-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+LEADING_ZERO_RE = re.compile(r"^0\d+$")
+NUMBER_TOKEN_RE = re.compile(r"^-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+ARRAY_LENGTH_RE = re.compile(r"^\[(?P<count>\d+)(?P<delimiter>[|\t]?)\]")
+STRING_ESCAPES = {"\\": "\\\\", '"': '\\"', "\n": "\\n", "\r": "\\r", "\t": "\\t"}
+STRING_UNESCAPES = {"\\": "\\", '"': '"', "n": "\n", "r": "\r", "t": "\t"}
+
+
+def _is_primitive(value: Any) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+def _format_number(value: int | float) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, int):
+        return str(value)
+    if not math.isfinite(value):
+        return "null"
+    if value == 0:
+        return "0"
+    if value.is_integer():
+        return str(int(value))
+    text = repr(value)
+    if "e" in text or "E" in text:
+        text = format(Decimal(text), "f")
+        if "." in text:
+            text = text.rstrip("0").rstrip(".")
+    return text
+
+
+def _needs_quotes(value: str, delimiter: str) -> bool:
+    if not value or value != value.strip():
+        return True
+    if value in {"true", "false", "null"}:
+        return True
+    if NUMERIC_LIKE_RE.match(value) or LEADING_ZERO_RE.match(value):
+        return True
+    if value.startswith("-"):
+        return True
+    if any(char in value for char in (":", '"', "\\", "[", "]", "{", "}", "\n", "\r", "\t")):
+        return True
+    return delimiter in value
+
+
+def _quote(value: str) -> str:
+    return '"' + "".join(STRING_ESCAPES.get(char, char) for char in value) + '"'
+
+
+def _encode_primitive(value: Any, delimiter: str = TOON_DELIMITER) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return _format_number(value)
+    text = str(value)
+    return _quote(text) if _needs_quotes(text, delimiter) else text
+
+
+def _encode_key(key: str) -> str:
+    return key if UNQUOTED_KEY_RE.fullmatch(key) else _quote(key)
+
+
+def _tabular_fields(items: list[Any]) -> list[str] | None:
+    if not items or not all(isinstance(item, dict) and item for item in items):
+        return None
+    fields = list(items[0].keys())
+    field_set = set(fields)
+    for item in items:
+        if set(item.keys()) != field_set:
+            return None
+        if not all(_is_primitive(value) for value in item.values()):
+            return None
+    return fields
+
+
+def _array_header(key: str | None, items: list[Any], fields: list[str] | None = None) -> str:
+    prefix = _encode_key(key) if key is not None else ""
+    header = f"{prefix}[{len(items)}]"
+    if fields is not None:
+        header += "{" + TOON_DELIMITER.join(_encode_key(field) for field in fields) + "}"
+    return header + ":"
+
+
+class _ToonEncoder:
+    def __init__(self) -> None:
+        self.lines: list[str] = []
+
+    def emit(self, depth: int, text: str) -> None:
+        self.lines.append(" " * (TOON_INDENT * depth) + text)
+
+    def encode_object(self, node: dict[str, Any], depth: int) -> None:
+        for key, value in node.items():
+            self.encode_field(str(key), value, depth)
+
+    def encode_field(self, key: str, value: Any, depth: int) -> None:
+        if isinstance(value, dict):
+            self.emit(depth, f"{_encode_key(key)}:")
+            self.encode_object(value, depth + 1)
+            return
+        if isinstance(value, list):
+            self.encode_array(key, value, depth, depth + 1)
+            return
+        self.emit(depth, f"{_encode_key(key)}: {_encode_primitive(value)}")
+
+    def encode_array(
+        self,
+        key: str | None,
+        items: list[Any],
+        depth: int,
+        child_depth: int,
+        *,
+        line_prefix: str = "",
+    ) -> None:
+        if not items:
+            self.emit(depth, line_prefix + _array_header(key, items))
+            return
+        if all(_is_primitive(item) for item in items):
+            inline = TOON_DELIMITER.join(_encode_primitive(item) for item in items)
+            self.emit(depth, f"{line_prefix}{_array_header(key, items)} {inline}")
+            return
+        fields = _tabular_fields(items)
+        if fields is not None:
+            self.emit(depth, line_prefix + _array_header(key, items, fields))
+            for item in items:
+                row = TOON_DELIMITER.join(_encode_primitive(item[field]) for field in fields)
+                self.emit(child_depth, row)
+            return
+        self.emit(depth, line_prefix + _array_header(key, items))
+        for item in items:
+            self.encode_list_item(item, child_depth)
+
+    def encode_list_item(self, item: Any, depth: int) -> None:
+        if isinstance(item, list):
+            self.encode_array(None, item, depth, depth + 1, line_prefix="- ")
+            return
+        if not isinstance(item, dict):
+            self.emit(depth, f"- {_encode_primitive(item)}")
+            return
+        if not item:
+            self.emit(depth, "-")
+            return
+        entries = list(item.items())
+        first_key, first_value = str(entries[0][0]), entries[0][1]
+        if isinstance(first_value, dict):
+            self.emit(depth, f"- {_encode_key(first_key)}:")
+            self.encode_object(first_value, depth + 2)
+        elif isinstance(first_value, list):
+            self.encode_array(first_key, first_value, depth, depth + 2, line_prefix="- ")
+        else:
+            self.emit(depth, f"- {_encode_key(first_key)}: {_encode_primitive(first_value)}")
+        for key, value in entries[1:]:
+            self.encode_field(str(key), value, depth + 1)
+
+
+def encode_toon(payload: Any) -> str:
+    encoder = _ToonEncoder()
+    if isinstance(payload, dict):
+        encoder.encode_object(payload, 0)
+    elif isinstance(payload, list):
+        encoder.encode_array(None, payload, 0, 1)
+    else:
+        encoder.emit(0, _encode_primitive(payload))
+    return "\n".join(encoder.lines)
+
+
+def _invalid(message: str, line_no: int | None = None) -> ValueError:
+    where = f" (ligne {line_no})" if line_no is not None else ""
+    return ValueError(f"target_toon invalide: {message}{where}")
+
+
+def _read_quoted(text: str, start: int) -> tuple[str, int]:
+    # `start` points at the opening quote; returns (value, index after closing quote).
+    chars: list[str] = []
+    idx = start + 1
+    while idx < len(text):
+        char = text[idx]
+        if char == "\\":
+            if idx + 1 >= len(text) or text[idx + 1] not in STRING_UNESCAPES:
+                raise ValueError("séquence d'échappement invalide")
+            chars.append(STRING_UNESCAPES[text[idx + 1]])
+            idx += 2
+            continue
+        if char == '"':
+            return "".join(chars), idx + 1
+        chars.append(char)
+        idx += 1
+    raise ValueError("chaîne non terminée")
+
+
+def _parse_primitive(token: str) -> Any:
+    token = token.strip()
+    if token.startswith('"'):
+        value, end = _read_quoted(token, 0)
+        if end != len(token):
+            raise ValueError("contenu après une chaîne entre guillemets")
+        return value
+    if token == "true":
+        return True
+    if token == "false":
+        return False
+    if token == "null":
+        return None
+    if NUMBER_TOKEN_RE.match(token):
+        if "." not in token and "e" not in token and "E" not in token:
+            return int(token)
+        number = float(token)
+        # Mirror JSON.parse semantics of the reference CLI: integral numbers come back as ints.
+        return int(number) if number.is_integer() else number
+    return token
+
+
+def _split_delimited(text: str, delimiter: str) -> list[str]:
+    values: list[str] = []
+    current: list[str] = []
+    idx = 0
+    while idx < len(text):
+        char = text[idx]
+        if char == '"':
+            _, end = _read_quoted(text, idx)
+            current.append(text[idx:end])
+            idx = end
+            continue
+        if char == delimiter:
+            values.append("".join(current))
+            current = []
+            idx += 1
+            continue
+        current.append(char)
+        idx += 1
+    values.append("".join(current))
+    return values
+
+
+def _match_array_header(text: str) -> tuple[int, str, str | None, int] | None:
+    # Returns (count, delimiter, raw field list or None, index after ':'); field names may be quoted
+    # and contain '}' or the delimiter, so the field list is scanned with the same quote rules as values.
+    match = ARRAY_LENGTH_RE.match(text)
+    if match is None:
+        return None
+    count = int(match.group("count"))
+    delimiter = match.group("delimiter") or TOON_DELIMITER
+    idx = match.end()
+    fields: str | None = None
+    if idx < len(text) and text[idx] == "{":
+        start = idx + 1
+        idx = start
+        while idx < len(text) and text[idx] != "}":
+            if text[idx] == '"':
+                try:
+                    _, idx = _read_quoted(text, idx)
+                except ValueError:
+                    return None
+                continue
+            idx += 1
+        if idx >= len(text):
+            return None
+        fields = text[start:idx]
+        idx += 1
+    if idx >= len(text) or text[idx] != ":":
+        return None
+    return count, delimiter, fields, idx + 1
+
+
+def _split_key(content: str) -> tuple[str, str] | None:
+    # Returns (key, remainder starting at '[' or ':') when the line is a key/value or keyed array.
+    if content.startswith('"'):
+        key, end = _read_quoted(content, 0)
+        rest = content[end:]
+        if rest.startswith(":") or rest.startswith("["):
+            return key, rest
+        return None
+    for idx, char in enumerate(content):
+        if char in ":[":
+            if idx == 0:
+                return None
+            return content[:idx], content[idx:]
+        if char in "\"{}]":
+            return None
+    return None
+
+
+class _ToonDecoder:
+    def __init__(self, text: str) -> None:
+        self.lines: list[tuple[int, str, int]] = []
+        for line_no, raw in enumerate(text.split("\n"), start=1):
+            if not raw.strip():
+                continue
+            stripped = raw.lstrip(" ")
+            spaces = len(raw) - len(stripped)
+            if stripped.startswith("\t"):
+                raise _invalid("tabulation interdite dans l'indentation", line_no)
+            if spaces % TOON_INDENT:
+                raise _invalid("indentation non multiple de 2", line_no)
+            self.lines.append((spaces // TOON_INDENT, stripped.rstrip(), line_no))
+        self.pos = 0
+
+    def peek_depth(self) -> int | None:
+        if self.pos >= len(self.lines):
+            return None
+        return self.lines[self.pos][0]
+
+    def decode(self) -> Any:
+        if not self.lines:
+            return {}
+        depth, content, line_no = self.lines[0]
+        if depth != 0:
+            raise _invalid("indentation inattendue en racine", line_no)
+        if _match_array_header(content) is not None:
+            self.pos = 1
+            value = self.parse_array_header(content, None, child_depth=1, line_no=line_no)
+        elif len(self.lines) == 1 and _split_key(content) is None:
+            self.pos = 1
+            value = self.parse_scalar(content, line_no)
+        else:
+            value = self.parse_object(0)
+        if self.pos < len(self.lines):
+            raise _invalid("contenu inattendu", self.lines[self.pos][2])
+        return value
+
+    def parse_scalar(self, token: str, line_no: int) -> Any:
+        try:
+            return _parse_primitive(token)
+        except ValueError as exc:
+            raise _invalid(str(exc), line_no) from exc
+
+    def parse_object(self, depth: int) -> dict[str, Any]:
+        result: dict[str, Any] = {}
+        while self.pos < len(self.lines):
+            line_depth, content, line_no = self.lines[self.pos]
+            if line_depth < depth:
+                break
+            if line_depth > depth:
+                raise _invalid("indentation inattendue", line_no)
+            self.pos += 1
+            key, value = self.parse_field(content, line_no, child_depth=depth + 1)
+            if key in result:
+                raise _invalid(f"clé dupliquée {key!r}", line_no)
+            result[key] = value
+        return result
+
+    def parse_field(self, content: str, line_no: int, *, child_depth: int) -> tuple[str, Any]:
+        try:
+            split = _split_key(content)
+        except ValueError as exc:
+            raise _invalid(str(exc), line_no) from exc
+        if split is None:
+            raise _invalid("ligne clé/valeur attendue", line_no)
+        key, rest = split
+        if rest.startswith("["):
+            return key, self.parse_array_header(rest, key, child_depth=child_depth, line_no=line_no)
+        value_text = rest[1:]
+        if value_text.strip():
+            if not value_text.startswith(" "):
+                raise _invalid("espace attendu après ':'", line_no)
+            return key, self.parse_scalar(value_text[1:], line_no)
+        if self.peek_depth() == child_depth:
+            return key, self.parse_object(child_depth)
+        return key, {}
+
+    def parse_array_header(self, header: str, key: str | None, *, child_depth: int, line_no: int) -> list[Any]:
+        parsed = _match_array_header(header)
+        if parsed is None:
+            raise _invalid("en-tête de tableau invalide", line_no)
+        count, delimiter, raw_fields, end = parsed
+        inline = header[end:]
+        label = key if key is not None else "<liste>"
+        try:
+            fields = (
+                [_parse_primitive(field) for field in _split_delimited(raw_fields, delimiter)]
+                if raw_fields is not None
+                else None
+            )
+        except ValueError as exc:
+            raise _invalid(str(exc), line_no) from exc
+
+        if fields is not None:
+            if inline.strip():
+                raise _invalid("contenu inattendu après un en-tête tabulaire", line_no)
+            rows: list[Any] = []
+            while self.peek_depth() == child_depth and len(rows) < count:
+                _, row_text, row_line = self.lines[self.pos]
+                self.pos += 1
+                try:
+                    cells = [_parse_primitive(cell) for cell in _split_delimited(row_text, delimiter)]
+                except ValueError as exc:
+                    raise _invalid(str(exc), row_line) from exc
+                if len(cells) != len(fields):
+                    raise _invalid(f"ligne tabulaire de {label} de largeur incorrecte", row_line)
+                rows.append({str(field): cell for field, cell in zip(fields, cells)})
+            if len(rows) != count:
+                raise _invalid(f"{label}: {count} lignes annoncées, {len(rows)} trouvées", line_no)
+            return rows
+
+        if inline.strip():
+            if not inline.startswith(" "):
+                raise _invalid("espace attendu après ':'", line_no)
+            try:
+                values = [_parse_primitive(cell) for cell in _split_delimited(inline[1:], delimiter)]
+            except ValueError as exc:
+                raise _invalid(str(exc), line_no) from exc
+            if len(values) != count:
+                raise _invalid(f"{label}: {count} valeurs annoncées, {len(values)} trouvées", line_no)
+            return values
+
+        items: list[Any] = []
+        while self.peek_depth() == child_depth and len(items) < count:
+            items.append(self.parse_list_item(child_depth))
+        if len(items) != count:
+            raise _invalid(f"{label}: {count} éléments annoncés, {len(items)} trouvés", line_no)
+        return items
+
+    def parse_list_item(self, depth: int) -> Any:
+        _, content, line_no = self.lines[self.pos]
+        self.pos += 1
+        if content == "-":
+            return {}
+        if not content.startswith("- "):
+            raise _invalid("élément de liste attendu ('- ')", line_no)
+        body = content[2:]
+        if _match_array_header(body) is not None:
+            return self.parse_array_header(body, None, child_depth=depth + 1, line_no=line_no)
+        try:
+            split = _split_key(body)
+        except ValueError as exc:
+            raise _invalid(str(exc), line_no) from exc
+        if split is None:
+            return self.parse_scalar(body, line_no)
+        first_key, first_value = self.parse_field(body, line_no, child_depth=depth + 2)
+        item = {first_key: first_value}
+        if self.peek_depth() == depth + 1:
+            for key, value in self.parse_object(depth + 1).items():
+                if key in item:
+                    raise _invalid(f"clé dupliquée {key!r}", line_no)
+                item[key] = value
+        return item
+
+
+def decode_toon(toon_text: str) -> Any:
+    return _ToonDecoder(toon_text).decode()
+
+
+def normalize_toon(value: Any, *, decoder: Callable[[str], Any] = decode_toon) -> tuple[str, Any]:
+    if not isinstance(value, str):
+        raise ValueError("target_toon doit être une chaîne TOON")
+    raw_text = value.replace("\r\n", "\n").replace("\r", "\n").strip("\n")
+    toon_text = "\n".join(line.rstrip() for line in raw_text.splitlines())
+    if not toon_text:
+        raise ValueError("target_toon vide")
+
+    # Explicit guard: reject JSON-looking payloads.
+    raw = toon_text.strip()
+    if raw.startswith("{") or raw.startswith("["):
+        raise ValueError("target_toon semble être du JSON, TOON attendu")
+
+    decoded = decoder(toon_text)
+    if not isinstance(decoded, dict):
+        raise ValueError("target_toon invalide: la racine doit être un objet")
+    return toon_text, decoded
+
+
+def toon_cli_available() -> bool:
+    return shutil.which(TOON_CLI_COMMAND[0]) is not None
+
+
+def decode_toon_with_cli(toon_text: str, *, timeout: float = 20) -> Any:
+    # Validate TOON syntax using the official CLI in decode mode
+    # and return decoded JSON payload.
+    with tempfile.NamedTemporaryFile("w", suffix=".toon", encoding="utf-8", delete=False) as handle:
+        handle.write(toon_text)
+        temp_path = handle.name
+    try:
+        result = subprocess.run(
+            [*TOON_CLI_COMMAND, temp_path],
+            check=False,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired as exc:
+        raise ValueError("validation TOON expirée") from exc
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
+
+    if result.returncode != 0:
+        error = (result.stderr or result.stdout or "").strip()
+        first_line = error.splitlines()[0] if error else "TOON invalide"
+        raise ValueError(f"target_toon invalide: {first_line}")
+
+    decoded_raw = (result.stdout or "").strip()
+    if not decoded_raw:
+        raise ValueError("target_toon invalide: sortie de décodage vide")
+    try:
+        return json.loads(decoded_raw)
+    except json.JSONDecodeError as exc:
+        raise ValueError("target_toon invalide: sortie de décodage illisible") from exc
+
+
+def encode_toon_with_cli(payload: dict[str, Any], *, timeout: float = 20) -> str:
+    with tempfile.NamedTemporaryFile("w", suffix=".json", encoding="utf-8", delete=False) as handle:
+        json.dump(payload, handle, ensure_ascii=False)
+        temp_path = handle.name
+    try:
+        result = subprocess.run(
+            [*TOON_CLI_COMMAND, "--encode", temp_path],
+            check=False,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except subprocess.TimeoutExpired as exc:
+        raise ValueError("encodage TOON expiré") from exc
+    finally:
+        Path(temp_path).unlink(missing_ok=True)
+
+    if result.returncode != 0:
+        error = (result.stderr or result.stdout or "").strip()
+        first_line = error.splitlines()[0] if error else "échec encodage TOON"
+        raise ValueError(f"encodage TOON invalide: {first_line}")
+
+    toon_text = (result.stdout or "").strip()
+    if not toon_text:
+        raise ValueError("encodage TOON invalide: sortie vide")
+    return toon_text
+
+
+def check_conformance(payload: dict[str, Any], *, use_cli: bool = True) -> list[str]:
+    # Round-trip through the in-process codec, then compare with the reference CLI if requested.
+    issues: list[str] = []
+    encoded = encode_toon(payload)
+    try:
+        _, decoded = normalize_toon(encoded)
+    except ValueError as exc:
+        return [f"python decode: {exc}"]
+    if decoded != payload:
+        issues.append("python round-trip différent du payload d'origine")
+    if not use_cli:
+        return issues
+
+    try:
+        cli_encoded = "\n".join(line.rstrip() for line in encode_toon_with_cli(payload).splitlines())
+    except ValueError as exc:
+        issues.append(f"cli encode: {exc}")
+    else:
+        if cli_encoded != encoded:
+            issues.append("encodage python différent de l'encodage CLI")
+    try:
+        cli_decoded = decode_toon_with_cli(encoded)
+    except ValueError as exc:
+        issues.append(f"cli decode: {exc}")
+    else:
+        if cli_decoded != decoded:
+            issues.append("décodage python différent du décodage CLI")
+    return issues
+
+
+# Hand-written payloads that exercise quoting corners absent from typical journals.
+EDGE_CASE_PAYLOADS: list[tuple[str, dict[str, Any]]] = [
+    ("edge:tabular-field-brace", {"rows": [{"a}b": 1, "c,d": "x"}, {"a}b": 2, "c,d": "y}"}]}),
+    ("edge:root-key-brace", {"k}": [{"x": 1}], "list": [[{"f}": True}]]}),
+    ("edge:control-char-keys", {"c\n": 1, "d\t": {"e\r": "x"}, "rows": [{"f\n": 1}, {"f\n": 2}]}),
+]
+
+
+def _iter_conformance_payloads(path: Path) -> list[tuple[str, dict[str, Any]]]:
+    payloads: list[tuple[str, dict[str, Any]]] = []
+    with path.open("r", encoding="utf-8") as handle:
+        for line_no, raw_line in enumerate(handle, start=1):
+            line = raw_line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            if not isinstance(row, dict):
+                continue
+            label = str(row.get("instruction_id") or f"ligne {line_no}")
+            toon_text = row.get("server_target_toon") or row.get("target_toon")
+            if not isinstance(toon_text, str) or not toon_text.strip():
+                continue
+            _, decoded = normalize_toon(toon_text)
+            payloads.append((label, decoded))
+    return payloads
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Vérifie la conformité du codec TOON Python sur un journal JSONL "
+            "(issued_instructions.jsonl ou generated_cases.jsonl), contre le CLI officiel s'il est disponible."
+        )
+    )
+    parser.add_argument("input", help="Fichier JSONL contenant des champs target_toon / server_target_toon.")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--no-cli", action="store_true", help="Ne vérifie que l'aller-retour Python.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    payloads = _iter_conformance_payloads(Path(args.input))
+    if args.limit is not None:
+        payloads = payloads[: args.limit]
+    payloads = [*EDGE_CASE_PAYLOADS, *payloads]
+    use_cli = not args.no_cli and toon_cli_available()
+    failures: dict[str, list[str]] = {}
+    for label, payload in payloads:
+        issues = check_conformance(payload, use_cli=use_cli)
+        if issues:
+            failures[label] = issues
+    print(
+        json.dumps(
+            {
+                "checked": len(payloads),
+                "cli_checked": use_cli,
+                "failed": len(failures),
+                "failures": failures,
+            },
+            ensure_ascii=False,
+            indent=2,
+        )
+    )
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
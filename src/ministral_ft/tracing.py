@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+TRACE_FILENAME = "traces.jsonl"
+DEFAULT_TRACE_MAX_BYTES = 64 * 1024 * 1024
+# perf_counter() -> microseconds since the epoch, as trace viewers expect in `ts`.
+_EPOCH_OFFSET_US = (time.time() - time.perf_counter()) * 1_000_000
+_local = threading.local()
+
+
+def _event(name: str, cat: str, started: float, seconds: float, args: dict[str, Any] | None) -> dict[str, Any]:
+    event: dict[str, Any] = {
+        "name": name,
+        "cat": cat,
+        "ph": "X",
+        "ts": round(started * 1_000_000 + _EPOCH_OFFSET_US, 1),
+        "dur": round(seconds * 1_000_000, 1),
+        "pid": os.getpid(),
+        "tid": threading.get_native_id(),
+    }
+    if args:
+        event["args"] = args
+    return event
+
+
+class RequestTrace:
+    # Spans of one request, as Chrome trace events ("ph": "X", microseconds). The
+    # thread handling the request adds to it (see span()/record_span()); write-behind
+    # tasks that end before finish() add theirs under `lock` (see Tracer.bind).
+
+    __slots__ = ("request_id", "started", "sampled", "kept", "finished", "lock", "events", "threads")
+
+    def __init__(self, request_id: str, *, sampled: bool) -> None:
+        self.request_id = request_id
+        self.started = time.perf_counter()
+        self.sampled = sampled
+        self.kept = False
+        self.finished = False
+        self.lock = threading.Lock()
+        self.events: list[dict[str, Any]] = []
+        self.threads: dict[int, str] = {}
+
+    def add(
+        self,
+        name: str,
+        started: float,
+        seconds: float,
+        args: dict[str, Any] | None = None,
+        *,
+        cat: str = "span",
+    ) -> None:
+        event = _event(name, cat, started, seconds, args)
+        if event["tid"] not in self.threads:
+            self.threads[event["tid"]] = threading.current_thread().name
+        self.events.append(event)
+
+
+def current_trace() -> RequestTrace | None:
+    return getattr(_local, "trace", None)
+
+
+def record_span(
+    name: str,
+    started: float,
+    seconds: float,
+    args: dict[str, Any] | None = None,
+    *,
+    cat: str = "span",
+) -> None:
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        trace.add(name, started, seconds, args, cat=cat)
+
+
+class _Span:
+    __slots__ = ("trace", "name", "args", "cat", "started")
+
+    def __init__(self, trace: RequestTrace, name: str, args: dict[str, Any] | None, cat: str) -> None:
+        self.trace = trace
+        self.name = name
+        self.args = args
+        self.cat = cat
+
+    def __enter__(self) -> None:
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.trace.add(self.name, self.started, time.perf_counter() - self.started, self.args, cat=self.cat)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(name: str, args: dict[str, Any] | None = None, *, cat: str = "span") -> _Span | _NoSpan:
+    # A no-op outside a traced request.
+    trace = getattr(_local, "trace", None)
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name, args, cat)
+
+
+class Tracer:
+    # Every request gets an id; when tracing is on, its spans are collected and the
+    # trace is appended to the log if the request was sampled (`sample_rate`) or
+    # took at least `slow_ms`. One Chrome trace event per line; `python -m
+    # ministral_ft.tracing export` wraps them into a file trace viewers open.
+
+    def __init__(
+        self,
+        path: Path,
+        *,
+        sample_rate: float = 0.0,
+        slow_ms: float = 0.0,
+        max_bytes: int = DEFAULT_TRACE_MAX_BYTES,
+    ) -> None:
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate doit être compris entre 0 et 1")
+        self.path = path
+        self.sample_rate = sample_rate
+        self.slow_s = max(0.0, slow_ms) / 1000
+        self.max_bytes = max_bytes
+        self.enabled = sample_rate > 0 or self.slow_s > 0
+        self.boot_id = format(int(time.time()), "x")
+        self.counter = itertools.count(1)
+        self.lock = threading.Lock()
+        self.handle: Any = None
+        self.named_threads: set[tuple[int, int]] = set()
+        self.traces_written = 0
+        self.events_written = 0
+
+    def next_request_id(self) -> str:
+        return f"{self.boot_id}-{next(self.counter):06d}"
+
+    def begin(self, request_id: str) -> RequestTrace | None:
+        if not self.enabled:
+            return None
+        trace = RequestTrace(request_id, sampled=random.random() < self.sample_rate)
+        _local.trace = trace
+        return trace
+
+    def finish(self, trace: RequestTrace, name: str, args: dict[str, Any]) -> None:
+        _local.trace = None
+        seconds = time.perf_counter() - trace.started
+        with trace.lock:
+            trace.finished = True
+            trace.kept = trace.sampled or bool(self.slow_s and seconds >= self.slow_s)
+        if not trace.kept:
+            return
+        for event in trace.events:
+            event.setdefault("args", {})["request_id"] = trace.request_id
+        root = _event(name, "request", trace.started, seconds, {"request_id": trace.request_id, **args})
+        trace.events.insert(0, root)
+        trace.threads.setdefault(root["tid"], threading.current_thread().name)
+        self._write(trace.events, trace.threads)
+
+    def bind(self, name: str, task: Callable[[], None]) -> Callable[[], None]:
+        # For write-behind tasks: the write is traced under the request that queued it,
+        # on the thread that runs it. A write done before the request finishes joins its
+        # trace (the keep decision is not made yet); a later one is written on its own
+        # if the trace was kept.
+        trace = getattr(_local, "trace", None)
+        if trace is None:
+            return task
+
+        def traced() -> None:
+            started = time.perf_counter()
+            try:
+                task()
+            finally:
+                seconds = time.perf_counter() - started
+                with trace.lock:
+                    if not trace.finished:
+                        trace.add(name, started, seconds, cat="write")
+                        return
+                if trace.kept:
+                    event = _event(name, "write", started, seconds, {"request_id": trace.request_id})
+                    self._write([event], {event["tid"]: threading.current_thread().name})
+
+        return traced
+
+    def _write(self, events: list[dict[str, Any]], threads: dict[int, str]) -> None:
+        pid = os.getpid()
+        lines: list[str] = []
+        with self.lock:
+            if self.handle is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self.handle = self.path.open("a", encoding="utf-8")
+            elif self.handle.tell() >= self.max_bytes:
+                # One previous file is kept; thread names are repeated in the new one.
+                self.handle.close()
+                self.path.replace(self.path.with_name(self.path.name + ".1"))
+                self.handle = self.path.open("a", encoding="utf-8")
+                self.named_threads.clear()
+            for tid, thread_name in threads.items():
+                if (pid, tid) not in self.named_threads:
+                    self.named_threads.add((pid, tid))
+                    lines.append(json.dumps(
+                        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}},
+                        ensure_ascii=False,
+                    ))
+            lines.extend(json.dumps(event, ensure_ascii=False) for event in events)
+            self.handle.write("\n".join(lines) + "\n")
+            self.handle.flush()
+            self.traces_written += 1
+            self.events_written += len(events)
+
+    def close(self) -> None:
+        with self.lock:
+            if self.handle is not None:
+                self.handle.close()
+                self.handle = None
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "slow_ms": self.slow_s * 1000,
+            "file": str(self.path),
+            "traces_written": self.traces_written,
+            "events_written": self.events_written,
+        }
+
+
+def load_trace_events(path: Path, request_id: str | None = None) -> list[dict[str, Any]]:
+    # Every span carries args.request_id; thread-name metadata ("ph": "M") is kept.
+    events: list[dict[str, Any]] = []
+    with path.open("r", encoding="utf-8") as handle:
+        for raw_line in handle:
+            try:
+                event = json.loads(raw_line)
+            except json.JSONDecodeError:
+                continue
+            if request_id is not None and event.get("ph") != "M":
+                if (event.get("args") or {}).get("request_id") != request_id:
+                    continue
+            events.append(event)
+    return events
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Traces par requête du serveur de consignes.")
+    parser.add_argument(
+        "command",
+        choices=["export"],
+        help="export : fichier JSON (format Chrome trace-event) lisible par Perfetto ou chrome://tracing.",
+    )
+    parser.add_argument("--state-dir", default="data/case_instruction_server")
+    parser.add_argument("--out", default=None, help="Fichier de sortie (défaut : <state-dir>/traces.json).")
+    parser.add_argument("--request-id", default=None, help="Ne garder que les spans de cette requête.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    state_dir = Path(args.state_dir)
+    events = load_trace_events(state_dir / TRACE_FILENAME, args.request_id)
+    out = Path(args.out) if args.out else state_dir / "traces.json"
+    out.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}, ensure_ascii=False), encoding="utf-8")
+    print(json.dumps({"out": str(out), "events": len(events)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
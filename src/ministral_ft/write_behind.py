@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable
+
+
+class WriteBehindWorker:
+    # Background writer for derived artifacts (summaries, per-id JSON files, exports).
+    #
+    # Tasks are keyed: submitting a key that is still pending replaces its callable
+    # and moves it to the back of the queue, so bursts collapse into one write that
+    # still runs after everything queued before it. `min_interval_s` additionally
+    # rate-limits a key (e.g. the summary is written at most every N ms). Tasks run
+    # in submission order on a single thread, which keeps append-only files ordered.
+
+    def __init__(self, *, name: str = "write-behind", synchronous: bool = False) -> None:
+        self.synchronous = synchronous
+        self.cond = threading.Condition()
+        self.pending: OrderedDict[Any, Callable[[], None]] = OrderedDict()
+        self.not_before: dict[Any, float] = {}
+        self.last_run: dict[Any, float] = {}
+        self.running = False
+        self.flush_waiters = 0
+        self.closed = False
+        self.completed = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.last_error: str | None = None
+        self.thread: threading.Thread | None = None
+        if not synchronous:
+            self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+            self.thread.start()
+
+    def submit(self, key: Any, task: Callable[[], None], *, min_interval_s: float = 0.0) -> None:
+        if self.synchronous:
+            self._execute(key, task)
+            return
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("write-behind worker fermé")
+            if key in self.pending:
+                self.coalesced += 1
+                self.pending.move_to_end(key)
+            else:
+                last = self.last_run.get(key)
+                self.not_before[key] = (last + min_interval_s) if last is not None else 0.0
+            self.pending[key] = task
+            self.cond.notify_all()
+
+    def flush(self) -> None:
+        # Block until everything submitted so far is on disk, ignoring rate limits.
+        if self.synchronous:
+            return
+        with self.cond:
+            self.flush_waiters += 1
+            self.cond.notify_all()
+            try:
+                while self.pending or self.running:
+                    self.cond.wait()
+            finally:
+                self.flush_waiters -= 1
+
+    def close(self) -> None:
+        if self.synchronous:
+            return
+        self.flush()
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+
+    def stats(self) -> dict[str, Any]:
+        with self.cond:
+            return {
+                "mode": "synchronous" if self.synchronous else "background",
+                "pending": len(self.pending),
+                "completed": self.completed,
+                "coalesced": self.coalesced,
+                "errors": self.errors,
+                "last_error": self.last_error,
+            }
+
+    def _execute(self, key: Any, task: Callable[[], None]) -> None:
+        try:
+            task()
+        except Exception as exc:  # pragma: no cover - defensive runtime guard
+            # Synchronous mode stands in for the baseline inline writes: the caller sees the failure.
+            if self.synchronous:
+                raise
+            with self.cond:
+                self.errors += 1
+                self.last_error = f"{key!r}: {exc}"
+        with self.cond:
+            self.completed += 1
+            self.last_run[key] = time.monotonic()
+
+    def _take_ready(self) -> list[tuple[Any, Callable[[], None]]]:
+        now = time.monotonic()
+        force = self.flush_waiters > 0 or self.closed
+        ready = [
+            key
+            for key in self.pending
+            if force or self.not_before.get(key, 0.0) <= now
+        ]
+        batch = [(key, self.pending.pop(key)) for key in ready]
+        for key in ready:
+            self.not_before.pop(key, None)
+        return batch
+
+    def _next_deadline(self) -> float | None:
+        if not self.pending:
+            return None
+        return max(0.0, min(self.not_before.get(key, 0.0) for key in self.pending) - time.monotonic())
+
+    def _run(self) -> None:
+        while True:
+            with self.cond:
+                batch = self._take_ready()
+                while not batch:
+                    if self.closed and not self.pending:
+                        return
+                    self.cond.wait(timeout=self._next_deadline())
+                    batch = self._take_ready()
+                self.running = True
+            for key, task in batch:
+                self._execute(key, task)
+            with self.cond:
+                self.running = False
+                self.cond.notify_all()